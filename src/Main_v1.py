@@ -1,13 +1,6 @@
 from src.utils.folder_creator import create_folders
 from src.data.load_config import load_config
-from src.domain.point import Point
-from src.network.network import generate_nodes_and_links_dict
-from src.network.core_class import get_boundary_nodes_of_network
-from src.plan.plan import generate_people_acts_coord_dict
-from src.plan.core_class import get_boundary_nodes_of_plans
-from src.transit.transit_schedule import generate_bus_routes_and_stops_dict
-from src.transit.transit_vehicle import get_transit_type_dict
-from src.od_mask.generator import ZoneGeneratorByGrid
+from src.data.scenario_inputs import ScenarioInputs
 from src.events.person_trip import generate_personTrip_df
 from src.events.person_enter_bus import generate_personEnterBus_df
 from src.events.travel_time import generate_travelTimeVehicle_df
@@ -31,8 +24,6 @@ def main():
     #param
     scenario_name = path.scenario
     bus_route_hint_str = param.bus_route_hint_str
-    cols = param.zone.cols
-    rows = param.zone.rows
     radia_m = param.zone.radia_m
     act_coveraged = param.service_coveraged.act_coveraged
     max_delay = param.otp.max_delay
@@ -44,10 +35,6 @@ def main():
 
     #input
     events = path.paths.events
-    plan = path.paths.plan
-    network = path.paths.network
-    schedule = path.paths.transit_schedule
-    vehicle = path.paths.transit_vehicle
 
     #output interim
     bus_delay_at_facilities = path.data.interim.event.bus_delay_at_facilities
@@ -64,19 +51,16 @@ def main():
     create_folders(kpi_result, busroute_heatmap_image_path, od_heatmap_image_path, person_trip_analysis_output_folder)
 
 
-    #dict necessary for caculating performance measurement
-    nodes_dict, links_dict = generate_nodes_and_links_dict(network)
-    people_dict = generate_people_acts_coord_dict(plan)
-    bus_route_dict, bus_stops_dict = generate_bus_routes_and_stops_dict(transit_schedule_path=schedule, bus_route_hint_str=bus_route_hint_str)
-    pt_type_dict = get_transit_type_dict(vehicle)
+    #input tĩnh của scenario: mỗi file chỉ đọc 1 lần
+    inputs = ScenarioInputs.from_config(path, param)
+    inputs.load_all(param.inputs.executor)         #đọc network / plans / schedule / vehicles cùng lúc
+    links_dict = inputs.links_dict
+    people_dict = inputs.people_dict
+    bus_route_dict, bus_stops_dict = inputs.bus_routes_dict, inputs.bus_stops_dict
+    pt_type_dict = inputs.vehtype_dict
 
     #generate zone
-    min_p_network, max_p_network = get_boundary_nodes_of_network(nodes_dict)
-    min_p_plan, max_p_plan = get_boundary_nodes_of_plans(people_dict)
-    min_p = Point(min(min_p_network.x, min_p_plan.x), min(min_p_network.y, min_p_plan.y))
-    max_p = Point(max(max_p_network.x, max_p_plan.x), max(max_p_network.y, max_p_plan.y))
-    zone_gen = ZoneGeneratorByGrid(max_p=max_p, min_p=min_p, rows=rows, cols=cols)
-    zone_list = zone_gen.generate()
+    zone_gen = inputs.zone_generator
     
     #generate imterim arrrow file
     generate_busDelayAtFacilities_df(
@@ -113,7 +97,8 @@ def main():
         people_dict=people_dict, 
         bus_stops_dict=bus_stops_dict, 
         radia_m=radia_m, 
-        act_coveraged=act_coveraged
+        act_coveraged=act_coveraged,
+        stop_tree=inputs.stop_tree
     )
     people_number = len(people_dict)
     
@@ -123,31 +108,26 @@ def main():
     #visualize
     draw_busroute_heatmap(
         output_image_path=busroute_heatmap_image_path, 
-        network_path=network, 
-        bus_route_data=list(bus_route_dict.values()),
+        inputs=inputs,
         max_freq_limit=max_busroute_number_to_draw)
     draw_od_heatmap(
-        network_path=network, 
-        schedule_path=schedule, 
-        zones_list=zone_list,
+        inputs=inputs,
         od_visualize_number=od_visualize_number,
         people_trip_arrow_path=people_trip,
         save_image_path=od_heatmap_image_path, 
-        scenario_name=scenario_name, 
-        grid_info=f"{rows}x{cols}")
+        scenario_name=scenario_name)
 
     analyze_person_trips(
         people_trip_arrow_path=people_trip,
-        network_path=network,
-        schedule_path=schedule,
-        zones_list=zone_list,
+        inputs=inputs,
         output_folder=person_trip_analysis_output_folder,
         top_od_number=top_od_number,
-        scenario_name=scenario_name,
-        grid_info=f"{rows}x{cols}"
+        scenario_name=scenario_name
     )
 
     #delete variable to free memory
+    inputs.release()
+    del inputs
     del people_dict
     del bus_route_dict
     del bus_stops_dict
@@ -1,18 +1,10 @@
 from src.utils.folder_creator import create_folders
 from src.data.load_config import load_config
-from src.domain.point import Point
-from src.network.network import generate_nodes_and_links_dict
-from src.network.core_class import get_boundary_nodes_of_network
-from src.plan.plan import generate_people_acts_coord_dict
-from src.plan.core_class import get_boundary_nodes_of_plans
-from src.transit.transit_schedule import generate_bus_routes_and_stops_dict
-from src.transit.transit_vehicle import get_transit_type_dict
-from src.od_mask.generator import ZoneGeneratorByGrid
-from src.events.person_trip import generate_personTrip_df
-from src.events.person_enter_bus import generate_personEnterBus_df
-from src.events.travel_time import generate_travelTimeVehicle_df
-from src.events.bus_delay import generate_busDelayAtFacilities_df
-from src.events.bus_trip import generate_busTrip_df
+from src.data.scenario_inputs import ScenarioInputs
+from src.data.input_cache import InputCache
+from src.transit.transit_vehicle import TransitVehicleClasses
+from src.domain.id_registry import build_id_registry
+from src.events.extract_all import generate_stale_events_df
 from src.performance_measurement.bus_route_info import calculate_avg_km_and_stop_in_bus_network
 from src.performance_measurement.travel_time_ratio import calculate_average_bus_travel_time
 from src.performance_measurement.travel_time_ratio import calculate_average_car_travel_time
@@ -22,6 +14,7 @@ from src.performance_measurement.service_coverage import calculte_service_covera
 from src.performance_measurement.ridership import calculte_ridership
 from src.performance_measurement.otp import calculte_otp
 from src.performance_measurement.bus_productivity_effeciency import get_bus_service_metrics,calculate_effective_dist_ratio, calculate_productivity_index, calculate_bus_efficiency_index
+from src.performance_measurement.live_kpi import calculate_live_kpis
 from src.visualize.busroute_heatmap import draw_busroute_heatmap
 from src.visualize.od_heatmap import draw_od_heatmap
 from src.visualize.person_trip_analysis import analyze_person_trips
@@ -30,21 +23,69 @@ from src.visualize.merge_image import merge_images_side_by_side
 from omegaconf import OmegaConf
 import pandas as pd
 import os
+import time
+
+def format_kpi_text(
+    scenario_name: str, ridership: int, people_number: int, service_coverage: int, ontime: int, total: int, otp_percent: float,
+    average_bus_travel_time: float, bus_trip: int, average_car_travel_time: float, car_trip: int,
+    travel_time_ratio_KPI: float, bus_travel_time_ratio_KPI: float, prod_index: float, eff_index: float, dist_ratio: float,
+    bus_metrics: dict, mean_stop_per_route: float, mean_km_per_route: float) -> str:
+    """Khối KPI của 1 scenario (ghi ra kpi_result / in ra màn hình ở chế độ live)."""
+    ridership_percent = (ridership / people_number * 100) if people_number > 0 else 0
+    service_coverage_percent = (service_coverage / people_number * 100) if people_number > 0 else 0
+    service_hours = bus_metrics['service_hours']
+    effective_km = bus_metrics['effective_km']
+    total_km = bus_metrics['total_km']
+    return (
+        f"---------------- Scenario: {scenario_name} ----------------------\n"
+        f"   - Ridership: {ridership}/{people_number} - {ridership_percent:.2f}%\n"
+        f"   - Service Coverage: {service_coverage}/{people_number} - {service_coverage_percent:.2f}%\n"
+        f"   - OTP: {otp_percent:.2f}% - {ontime}/{total}\n"
+        f"   - Bus (Trung bình): {average_bus_travel_time:.2f} s - {bus_trip} trips\n"
+        f"   - Car (Trung bình): {average_car_travel_time:.2f} s - {car_trip} trips\n"
+        f"   - Bus/Car: {travel_time_ratio_KPI:.4f}\n"
+        f"   - Bus After/Before: {bus_travel_time_ratio_KPI:.4f}\n"
+        f"   - Productivity Index: {ridership/service_hours} ({prod_index:.6f}) - {service_hours} service hour\n"
+        f"   - Efficiency Index:   {ridership/total_km} ({eff_index:.6f}) - {total_km} total_km\n"
+        f"   - Effective Dist Ratio: {dist_ratio:.4f} - {effective_km}/{total_km}\n"
+        f"   - Số trạm dừng trung bình/tuyến: {mean_stop_per_route:.2f} trạm\n"
+        f"   - Chiều dài trung bình/tuyến: {mean_km_per_route/1000:.2f} km\n"
+    )
+
+
+def format_stage_timings(scenario_name: str, timings: dict[str, float], input_timings: dict[str, float]) -> str:
+    """Bảng thời gian từng bước của 1 scenario; bước "inputs" được tách theo từng file input."""
+    lines = [f"[*] Thời gian từng bước ({scenario_name}):"]
+    for stage, seconds in timings.items():
+        lines.append(f"   - {stage:<20}{seconds:>10.2f} s")
+        if stage == "inputs":
+            lines.extend(f"       {name:<18}{input_seconds:>10.2f} s" for name, input_seconds in input_timings.items())
+    return "\n".join(lines)
 
-def run_scenario(scenario_name: str, path: dict, param: dict):
+
+def run_scenario(scenario_name: str, path: dict, param: dict, resume: bool = False, cache: InputCache | None = None):
     print(f"\n{'='*50}")
     print(f"RUNNING SCENARIO: {scenario_name}")
     print(f"{'='*50}\n")
     
     #param
     bus_route_hint_str = param.bus_route_hint_str
-    cols = param.zone.cols
-    rows = param.zone.rows
     radia_m = param.zone.radia_m
     act_coveraged = param.service_coveraged.act_coveraged
     max_delay = param.otp.max_delay
     min_delay = param.otp.min_delay
     baseline = param.productivity.coefficient
+    events_workers = param.events.workers
+    events_parser = param.events.parser
+    events_start_time = param.events.start_time
+    events_end_time = param.events.end_time
+    events_lookback = param.events.lookback
+    events_use_lake = param.events.use_lake
+    events_force = param.events.force
+    events_checkpoint_interval = param.events.checkpoint_interval
+    events_open_trip_memory_mb = param.events.open_trip_memory_mb
+    events_write_queue_size = param.events.write_queue_size
+    events_compression = param.events.compression
 
     before_bus_avg_time = param.travel_time.before_bus_avg_time
     od_visualize_number = param.visualize.od_heatmap.od_visualize_number
@@ -53,9 +94,7 @@ def run_scenario(scenario_name: str, path: dict, param: dict):
 
     #input
     events = path.paths.events
-    plan = path.paths.plan
     network = path.paths.network
-    schedule = path.paths.transit_schedule
     vehicle = path.paths.transit_vehicle
 
     #output interim
@@ -64,7 +103,9 @@ def run_scenario(scenario_name: str, path: dict, param: dict):
     travel_time_all_vehicle = path.data.interim.event.travel_time_all_vehicle
     people_trip = path.data.interim.event.people_trip
     bus_trip_path = path.data.interim.event.bus_trip
-    create_folders(bus_delay_at_facilities,person_enter_bus,travel_time_all_vehicle,people_trip)         #create folder
+    events_lake = path.data.interim.events_lake
+    events_checkpoint = path.data.interim.events_checkpoint
+    create_folders(bus_delay_at_facilities,person_enter_bus,travel_time_all_vehicle,people_trip,bus_trip_path)         #create folder
 
     #output processed
     all_kpi_result = path.data.processed.all_kpi_result
@@ -75,51 +116,65 @@ def run_scenario(scenario_name: str, path: dict, param: dict):
     create_folders(kpi_result, busroute_heatmap_image_path, od_heatmap_image_path, person_trip_analysis_output_folder)
 
 
-    #dict necessary for caculating performance measurement
-    nodes_dict, links_dict = generate_nodes_and_links_dict(network)
-    people_dict = generate_people_acts_coord_dict(plan)
-    bus_route_dict, bus_stops_dict = generate_bus_routes_and_stops_dict(transit_schedule_path=schedule, bus_route_hint_str=bus_route_hint_str)
-    pt_type_dict = get_transit_type_dict(vehicle)
+    #thời gian từng bước (giây)
+    timings = {}
+
+    #input tĩnh của scenario: mỗi file chỉ đọc 1 lần, dùng chung cho extractor, KPI và visualizer
+    t0 = time.perf_counter()
+    inputs = ScenarioInputs.from_config(path, param, cache)
+    inputs.load_all(param.inputs.executor)         #đọc network / plans / schedule / vehicles cùng lúc
+    links_dict = inputs.links_dict
+    people_dict = inputs.people_dict
+    bus_route_dict, bus_stops_dict = inputs.bus_routes_dict, inputs.bus_stops_dict
+    pt_type_dict = inputs.vehtype_dict
 
     #generate zone
-    min_p_network, max_p_network = get_boundary_nodes_of_network(nodes_dict)
-    min_p_plan, max_p_plan = get_boundary_nodes_of_plans(people_dict)
-    min_p = Point(min(min_p_network.x, min_p_plan.x), min(min_p_network.y, min_p_plan.y))
-    max_p = Point(max(max_p_network.x, max_p_plan.x), max(max_p_network.y, max_p_plan.y))
-    zone_gen = ZoneGeneratorByGrid(max_p=max_p, min_p=min_p, rows=rows, cols=cols)
-    zone_list = zone_gen.generate()
+    zone_gen = inputs.zone_generator
+    zone_list = inputs.zones_list
+
+    #ID registry: mã int32 dùng chung cho person / vehicle / link / stop / zone (cột ID của file .arrow interim)
+    id_registry = build_id_registry(
+        links_dict=links_dict, vehtype_dict=pt_type_dict, stops_dict=bus_stops_dict, people_dict=people_dict, zones_list=zone_list)
+    #phân loại xe (bus / PT khác) tính sẵn 1 lần, dùng chung cho các extractor
+    vehicle_classes = TransitVehicleClasses(pt_type_dict, bus_route_hint_str, id_registry.vehicle)
     
-    #generate imterim arrrow file
-    # generate_busDelayAtFacilities_df(
-    #     events_path=path.paths.events, 
-    #     vehtype_dict=pt_type_dict, 
-    #     bus_hint_str=bus_route_hint_str, 
-    #     output_arrow_path=bus_delay_at_facilities)
-    # generate_personEnterBus_df(
-    #     events_path=path.paths.events, 
-    #     vehtype_dict=pt_type_dict, 
-    #     bus_hint_str=bus_route_hint_str, 
-    #     output_arrow_path=person_enter_bus)
-    # generate_travelTimeVehicle_df(
-    #     events_path=path.paths.events, 
-    #     vehtype_dict=pt_type_dict, 
-    #     bus_hint_str=bus_route_hint_str, 
-    #     output_arrow_path=travel_time_all_vehicle)
-    # generate_personTrip_df(
-    #     events_path=path.paths.events, 
-    #     vehtype_dict=pt_type_dict, 
-    #     zone_finder=zone_gen,
-    #     bus_hint_str=bus_route_hint_str, 
-    #     output_arrow_path=people_trip)
-    # generate_busTrip_df(
-    #     events_path=path.paths.events,
-    #     links_dict=links_dict,
-    #     bus_hint_str=bus_route_hint_str,
-    #     vehtype_dict=pt_type_dict,
-    #     output_arrow_path=bus_trip_path
-    # )
+    timings["inputs"] = time.perf_counter() - t0
+
+    #generate imterim arrrow file (1 lần đọc output_events.xml, chỉ tạo lại các file có manifest không khớp)
+    t0 = time.perf_counter()
+    generate_stale_events_df(
+        events_path=events,
+        vehicle_path=vehicle,
+        network_path=network,
+        vehtype_dict=pt_type_dict,
+        links_dict=links_dict,
+        zone_finder=zone_gen,
+        bus_hint_str=bus_route_hint_str,
+        bus_delay_arrow_path=bus_delay_at_facilities,
+        person_enter_bus_arrow_path=person_enter_bus,
+        travel_time_arrow_path=travel_time_all_vehicle,
+        people_trip_arrow_path=people_trip,
+        bus_trip_arrow_path=bus_trip_path,
+        workers=events_workers,
+        parser=events_parser,
+        start_time=events_start_time,
+        end_time=events_end_time,
+        lookback=events_lookback,
+        lake_dir=events_lake if events_use_lake else None,
+        force=events_force,
+        checkpoint_path=events_checkpoint if events_checkpoint_interval is not None else None,
+        checkpoint_interval=events_checkpoint_interval,
+        resume=resume,
+        open_trip_memory_mb=events_open_trip_memory_mb,
+        id_registry=id_registry,
+        vehicle_classes=vehicle_classes,
+        write_queue_size=events_write_queue_size,
+        compression=events_compression
+    )
+    timings["extract events"] = time.perf_counter() - t0
 
     #calculate performance measurement
+    t0 = time.perf_counter()
     mean_km_per_route, mean_stop_per_route = calculate_avg_km_and_stop_in_bus_network(routes_dict=bus_route_dict, links_dict=links_dict)
 
     average_bus_travel_time, bus_trip = calculate_average_bus_travel_time(travel_time_path=travel_time_all_vehicle, bus_hint_str=bus_route_hint_str)
@@ -131,7 +186,8 @@ def run_scenario(scenario_name: str, path: dict, param: dict):
         people_dict=people_dict, 
         bus_stops_dict=bus_stops_dict, 
         radia_m=radia_m, 
-        act_coveraged=act_coveraged
+        act_coveraged=act_coveraged,
+        stop_tree=inputs.stop_tree
     )
     people_number = len(people_dict)
     
@@ -143,40 +199,43 @@ def run_scenario(scenario_name: str, path: dict, param: dict):
     eff_index = calculate_bus_efficiency_index(bus_metrics['total_km'], ridership)
     dist_ratio = calculate_effective_dist_ratio(bus_metrics['effective_km'], bus_metrics['total_km'])
 
+    timings["kpi"] = time.perf_counter() - t0
+
     #visualize
+    t0 = time.perf_counter()
     draw_busroute_heatmap(
         output_image_path=busroute_heatmap_image_path, 
-        network_path=network, 
-        bus_route_data=list(bus_route_dict.values()),
+        inputs=inputs,
         max_freq_limit=max_busroute_number_to_draw)
     draw_od_heatmap(
-        network_path=network, 
-        schedule_path=schedule, 
-        zones_list=zone_list,
+        inputs=inputs,
         od_visualize_number=od_visualize_number,
         people_trip_arrow_path=people_trip,
         save_image_path=od_heatmap_image_path, 
-        scenario_name=scenario_name, 
-        grid_info=f"{rows}x{cols}")
+        scenario_name=scenario_name)
 
     analyze_person_trips(
         people_trip_arrow_path=people_trip,
-        network_path=network,
-        schedule_path=schedule,
-        zones_list=zone_list,
+        inputs=inputs,
         output_folder=person_trip_analysis_output_folder,
         bus_hint_str=bus_route_hint_str,
         top_od_number=top_od_number,
-        scenario_name=scenario_name,
-        grid_info=f"{rows}x{cols}"
+        scenario_name=scenario_name
     )
+    timings["visualize"] = time.perf_counter() - t0
+    print(format_stage_timings(scenario_name, timings, inputs.timings))
 
     #delete variable to free memory
+    inputs.release()
+    del inputs
+    del links_dict
     del people_dict
     del bus_route_dict
     del bus_stops_dict
     del pt_type_dict
     del zone_gen
+    del id_registry
+    del vehicle_classes
     del person_enter_bus
     del travel_time_all_vehicle
     del bus_delay_at_facilities
@@ -188,21 +247,14 @@ def run_scenario(scenario_name: str, path: dict, param: dict):
     effective_km = bus_metrics['effective_km']
     total_km = bus_metrics['total_km']
 
-    kpi_text = (
-        f"---------------- Scenario: {scenario_name} ----------------------\n"
-        f"   - Ridership: {ridership}/{people_number} - {ridership_percent:.2f}%\n"
-        f"   - Service Coverage: {service_coverage}/{people_number} - {service_coverage_percent:.2f}%\n"
-        f"   - OTP: {otp_percent:.2f}% - {ontime}/{total}\n"
-        f"   - Bus (Trung bình): {average_bus_travel_time:.2f} s - {bus_trip} trips\n"
-        f"   - Car (Trung bình): {average_car_travel_time:.2f} s - {car_trip} trips\n"
-        f"   - Bus/Car: {travel_time_ratio_KPI:.4f}\n"
-        f"   - Bus After/Before: {bus_travel_time_ratio_KPI:.4f}\n"
-        f"   - Productivity Index: {ridership/service_hours} ({prod_index:.6f}) - {service_hours} service hour\n"
-        f"   - Efficiency Index:   {ridership/total_km} ({eff_index:.6f}) - {total_km} total_km\n"
-        f"   - Effective Dist Ratio: {dist_ratio:.4f} - {effective_km}/{total_km}\n"
-        f"   - Số trạm dừng trung bình/tuyến: {mean_stop_per_route:.2f} trạm\n"
-        f"   - Chiều dài trung bình/tuyến: {mean_km_per_route/1000:.2f} km\n"
-    )
+    kpi_text = format_kpi_text(
+        scenario_name=scenario_name, ridership=ridership, people_number=people_number, service_coverage=service_coverage,
+        ontime=ontime, total=total, otp_percent=otp_percent,
+        average_bus_travel_time=average_bus_travel_time, bus_trip=bus_trip,
+        average_car_travel_time=average_car_travel_time, car_trip=car_trip,
+        travel_time_ratio_KPI=travel_time_ratio_KPI, bus_travel_time_ratio_KPI=bus_travel_time_ratio_KPI,
+        prod_index=prod_index, eff_index=eff_index, dist_ratio=dist_ratio, bus_metrics=bus_metrics,
+        mean_stop_per_route=mean_stop_per_route, mean_km_per_route=mean_km_per_route)
 
     with open(kpi_result, "w", encoding="utf-8") as f:
         f.write(kpi_text)
@@ -243,13 +295,120 @@ def run_scenario(scenario_name: str, path: dict, param: dict):
         }
     }
 
-def main():
+def run_scenario_live(scenario_name: str, path: dict, param: dict, follow: bool = False, cache: InputCache | None = None):
+    """
+    Chế độ live: tính KPI ngay trong lúc parse events (src/performance_measurement/live_kpi.py),
+    không ghi / đọc lại file .arrow interim, không vẽ hình. Chỉ in khối KPI ra màn hình.
+    follow=True: file events đang được MATSim ghi, in tóm tắt KPI sau mỗi events.follow_refresh_interval giây.
+    """
+    print(f"\n{'='*50}")
+    print(f"RUNNING SCENARIO (LIVE): {scenario_name}")
+    print(f"{'='*50}\n")
+
+    #param
+    bus_route_hint_str = param.bus_route_hint_str
+    radia_m = param.zone.radia_m
+    act_coveraged = param.service_coveraged.act_coveraged
+    baseline = param.productivity.coefficient
+    before_bus_avg_time = param.travel_time.before_bus_avg_time
+
+    #input tĩnh của scenario
+    inputs = ScenarioInputs.from_config(path, param, cache)
+    inputs.load_all(param.inputs.executor)         #đọc network / plans / schedule / vehicles cùng lúc
+    links_dict = inputs.links_dict
+    people_dict = inputs.people_dict
+    bus_route_dict, bus_stops_dict = inputs.bus_routes_dict, inputs.bus_stops_dict
+    pt_type_dict = inputs.vehtype_dict
+
+    #generate zone
+    zone_gen = inputs.zone_generator
+    zone_list = inputs.zones_list
+
+    id_registry = build_id_registry(
+        links_dict=links_dict, vehtype_dict=pt_type_dict, stops_dict=bus_stops_dict, people_dict=people_dict, zones_list=zone_list)
+    vehicle_classes = TransitVehicleClasses(pt_type_dict, bus_route_hint_str, id_registry.vehicle)
+
+    kpis = calculate_live_kpis(
+        events_path=path.paths.events,
+        vehtype_dict=pt_type_dict,
+        links_dict=links_dict,
+        zone_finder=zone_gen,
+        bus_hint_str=bus_route_hint_str,
+        max_delay=param.otp.max_delay,
+        min_delay=param.otp.min_delay,
+        workers=param.events.workers,
+        parser=param.events.parser,
+        start_time=param.events.start_time,
+        end_time=param.events.end_time,
+        lookback=param.events.lookback,
+        open_trip_memory_mb=param.events.open_trip_memory_mb,
+        id_registry=id_registry,
+        vehicle_classes=vehicle_classes,
+        follow=follow,
+        refresh_interval=param.events.follow_refresh_interval,
+        poll_interval=param.events.follow_poll_interval,
+        idle_timeout=param.events.follow_idle_timeout
+    )
+
+    #calculate performance measurement
+    mean_km_per_route, mean_stop_per_route = calculate_avg_km_and_stop_in_bus_network(routes_dict=bus_route_dict, links_dict=links_dict)
+    service_coverage = calculte_service_coverage(
+        people_dict=people_dict,
+        bus_stops_dict=bus_stops_dict,
+        radia_m=radia_m,
+        act_coveraged=act_coveraged,
+        stop_tree=inputs.stop_tree
+    )
+    people_number = len(people_dict)
+
+    ridership = kpis["ridership"]
+    bus_metrics = kpis["bus_metrics"]
+    bus_travel_time_ratio_KPI = calculate_bus_travel_time_ratio_KPI(before_bus_avg_time=before_bus_avg_time, after_bus_avg_time=kpis["average_bus_travel_time"])
+    travel_time_ratio_KPI = calculate_travel_time_ratio_KPI(bus_avg_time=kpis["average_bus_travel_time"], car_avg_time=kpis["average_car_travel_time"])
+    prod_index = calculate_productivity_index(bus_metrics['service_hours'], ridership, baseline)
+    eff_index = calculate_bus_efficiency_index(bus_metrics['total_km'], ridership)
+    dist_ratio = calculate_effective_dist_ratio(bus_metrics['effective_km'], bus_metrics['total_km'])
+
+    kpi_text = format_kpi_text(
+        scenario_name=scenario_name, ridership=ridership, people_number=people_number, service_coverage=service_coverage,
+        ontime=kpis["ontime"], total=kpis["total"], otp_percent=kpis["otp_percent"],
+        average_bus_travel_time=kpis["average_bus_travel_time"], bus_trip=kpis["bus_trip"],
+        average_car_travel_time=kpis["average_car_travel_time"], car_trip=kpis["car_trip"],
+        travel_time_ratio_KPI=travel_time_ratio_KPI, bus_travel_time_ratio_KPI=bus_travel_time_ratio_KPI,
+        prod_index=prod_index, eff_index=eff_index, dist_ratio=dist_ratio, bus_metrics=bus_metrics,
+        mean_stop_per_route=mean_stop_per_route, mean_km_per_route=mean_km_per_route)
+    print(kpi_text + f"   - Bus transfer rate: {kpis['bus_transfer_rate']:.4f} transfers/trip\n")
+
+def main(resume: bool = False, live: bool = False, follow: bool = False):
     # 1. Load basic configs
     base_path_config = load_config(r"config/config_path.yaml")
     base_param_config = load_config(r"config/config_param.yaml")
     
     scenario_list = base_path_config.scenario_list
     print(f"Scenarios to run: {scenario_list}")
+
+    # Input giống hệt nhau (cùng sha256) giữa các scenario chỉ đọc 1 lần; chạy 1 scenario thì không cần hash file
+    cache_size = base_param_config.inputs.cache_size
+    input_cache = None
+    if cache_size and len(scenario_list) > 1:
+        input_cache = InputCache(cache_size, base_path_config.data.interim.input_fingerprints)
+
+    if follow:
+        # Theo dõi file events của scenario trong config_path.yaml -> scenario trong lúc MATSim đang chạy
+        run_scenario_live(base_path_config.scenario, base_path_config, base_param_config, follow=True)
+        return
+
+    if live:
+        # Chế độ live: chỉ in KPI, không ghi file interim / KPI / so sánh
+        for sc_name in scenario_list:
+            raw_path_cfg = OmegaConf.load(r"config/config_path.yaml")
+            raw_path_cfg.scenario = sc_name
+            OmegaConf.resolve(raw_path_cfg)
+            run_scenario_live(sc_name, raw_path_cfg, base_param_config, cache=input_cache)
+        if input_cache is not None:
+            print(input_cache.report())
+        return
+
     all_kpi_result = base_path_config.data.processed.all_kpi_result
     all_kpi_csv = base_path_config.data.processed.all_kpi_csv
     all_kpi_comparison_string_csv = base_path_config.data.processed.all_kpi_comparison_string_csv
@@ -284,8 +443,12 @@ def main():
         OmegaConf.resolve(raw_path_cfg)
         
         # Run
-        result = run_scenario(sc_name, raw_path_cfg, base_param_config)
+        result = run_scenario(sc_name, raw_path_cfg, base_param_config, resume=resume, cache=input_cache)
         scenario_results.append(result)
+
+    if input_cache is not None:
+        print(input_cache.report())
+        input_cache.clear()
         
     # 2.5 Lọc lấy KPI và lưu ra CSV ở dạng chuyển vị (Transpose)
     if scenario_results:
@@ -388,4 +551,10 @@ def main():
         merge_images_side_by_side(img2_a, img2_b, os.path.join(output_comparison_folder, "Merged_Global_Summary.png"))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--resume", action="store_true", help="Trích xuất events tiếp từ checkpoint của lần chạy bị dừng")
+    arg_parser.add_argument("--live", action="store_true", help="Tính KPI ngay trong lúc parse events, không ghi file .arrow interim")
+    arg_parser.add_argument("--follow", action="store_true", help="Theo dõi file events MATSim đang ghi (scenario trong config_path.yaml), in KPI định kỳ")
+    args = arg_parser.parse_args()
+    main(resume=args.resume, live=args.live, follow=args.follow)
\ No newline at end of file
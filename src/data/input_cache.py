@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from collections import OrderedDict, Counter
+
+from src.utils.fingerprint import file_fingerprint, read_fingerprints, write_fingerprints
+
+
+class InputCache:
+    """
+    Input tĩnh đã đọc (network, plans, schedule, loại xe, lưới zone, KD-tree trạm) dùng chung giữa các scenario.
+    Khoá theo sha256 nội dung file (+ tham số đọc), nên 2 scenario có file giống hệt nhau (khác đường dẫn vẫn được)
+    chỉ đọc 1 lần. Mỗi loại input giữ tối đa max_entries phiên bản, phiên bản dùng lâu nhất bị bỏ trước.
+    saved: số giây đọc đã tiết kiệm theo từng loại input (= thời gian đọc lần đầu x số lần dùng lại).
+    sources_path: file sidecar lưu fingerprint (size + mtime + sha256) theo đường dẫn file, như sources.json của snapshot
+    network: các lần chạy sau chỉ hash lại file có size / mtime đổi. None: chỉ nhớ trong process.
+    """
+    def __init__(self, max_entries: int = 2, sources_path: str | None = None):
+        self.max_entries = max_entries
+        self.sources_path = sources_path
+        self._fingerprints: dict[str, dict] = read_fingerprints(sources_path) if sources_path else {}
+        self._lock = threading.Lock()
+        self._entries: dict[str, OrderedDict] = {}
+        self.hits: Counter = Counter()
+        self.loads: Counter = Counter()
+        self.saved: Counter = Counter()
+        self.fingerprint_seconds = 0.0
+
+    def fingerprint(self, path: str) -> str:
+        """sha256 của file, chỉ hash lại khi size / mtime đổi so với fingerprint đã lưu."""
+        key = os.path.abspath(path)
+        cached = self._fingerprints.get(key)
+        t0 = time.perf_counter()
+        fingerprint = file_fingerprint(path, cached)
+        if fingerprint is not cached:
+            with self._lock:
+                self.fingerprint_seconds += time.perf_counter() - t0
+                self._fingerprints[key] = fingerprint
+                if self.sources_path:
+                    write_fingerprints(self.sources_path, self._fingerprints)
+        return fingerprint["sha256"]
+
+    def has(self, name: str, key: tuple) -> bool:
+        return key in self._entries.get(name, ())
+
+    def get(self, name: str, key: tuple):
+        entries = self._entries.get(name)
+        entry = entries.get(key) if entries is not None else None
+        if entry is None:
+            return None
+        entries.move_to_end(key)
+        value, load_seconds = entry
+        self.hits[name] += 1
+        self.saved[name] += load_seconds
+        return value
+
+    def put(self, name: str, key: tuple, value, load_seconds: float):
+        self.loads[name] += 1
+        entries = self._entries.setdefault(name, OrderedDict())
+        entries[key] = (value, load_seconds)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def report(self) -> str:
+        lines = ["[*] Input dùng chung giữa các scenario:"]
+        for name in sorted(self.hits.keys() | self.loads.keys()):
+            lines.append(f"   - {name:<18}đọc {self.loads[name]} lần, dùng lại {self.hits[name]} lần, tiết kiệm {self.saved[name]:.2f} s")
+        lines.append(f"   - Tổng tiết kiệm: {sum(self.saved.values()):.2f} s (hash file: {self.fingerprint_seconds:.2f} s)")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Benchmark: 4 scenario dùng chung network + plans (khác schedule, các file nằm ở thư mục riêng của từng scenario),
+    # đọc input của từng scenario không cache vs có InputCache
+    import shutil
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    from src.data.load_config import load_config
+    from src.data.scenario_inputs import ScenarioInputs
+    from src.utils.benchmark_fixtures import write_grid_network, write_synthetic_plans, write_synthetic_schedule
+
+    path = load_config(r"config/config_path.yaml")
+    param = load_config(r"config/config_param.yaml")
+
+    def benchmark_scenarios(scenarios: list[dict], use_cache: bool, sources_path: str):
+        cache = InputCache(sources_path=sources_path) if use_cache else None
+        t0 = time.perf_counter()
+        results = []
+        for paths in scenarios:
+            inputs = ScenarioInputs(**paths, bus_route_hint_str=param.bus_route_hint_str, rows=param.zone.rows, cols=param.zone.cols, cache=cache)
+            network, people_dict, schedule, _ = inputs.load_all(None)
+            results.append((len(network.link_ids), len(people_dict), len(schedule.route_ids), len(inputs.zones_list), inputs.stop_tree.n))
+            inputs.release()
+        return time.perf_counter() - t0, results, cache.report() if cache is not None else ""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scenarios = []
+        for i in range(4):
+            scenario_dir = os.path.join(tmp_dir, f"variant_{i}")
+            os.makedirs(scenario_dir)
+            if i == 0:
+                write_grid_network(os.path.join(scenario_dir, "network.xml"), 150)
+                write_synthetic_plans(os.path.join(scenario_dir, "plan.xml"), 10_000)
+            else:
+                shutil.copy(os.path.join(tmp_dir, "variant_0", "network.xml"), scenario_dir)
+                shutil.copy(os.path.join(tmp_dir, "variant_0", "plan.xml"), scenario_dir)
+            write_synthetic_schedule(os.path.join(scenario_dir, "transitSchedule.xml"), 100 + 50 * i)
+            scenarios.append({
+                "network_path": os.path.join(scenario_dir, "network.xml"),
+                "plan_path": os.path.join(scenario_dir, "plan.xml"),
+                "transit_schedule_path": os.path.join(scenario_dir, "transitSchedule.xml"),
+                "transit_vehicle_path": path.paths.transit_vehicle,
+            })
+
+        print(f"[*] {len(scenarios)} scenario, network {os.path.getsize(scenarios[0]['network_path']) / 1e6:.1f} MB "
+              f"+ plans {os.path.getsize(scenarios[0]['plan_path']) / 1e6:.1f} MB giống nhau, schedule khác nhau")
+        sources_path = os.path.join(tmp_dir, "input_fingerprints.json")
+        totals, results = {}, {}
+        # Lần chạy thứ 2 dùng sha256 đã lưu trong sidecar từ lần đầu, không phải hash lại file nào
+        for label, use_cache in (("không cache", False), ("InputCache", True), ("InputCache lần 2", True)):
+            # Mỗi cách chạy trong 1 process mới để các lần đo độc lập với nhau
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                totals[label], results[label], report = pool.submit(benchmark_scenarios, scenarios, use_cache, sources_path).result()
+            print(f"{label:<18}{totals[label]:>8.2f} s")
+            if report:
+                print(report)
+        print(f"[*] Wall tiết kiệm: {totals['không cache'] - totals['InputCache']:.2f} s, "
+              f"kết quả {'giống nhau' if len(set(map(repr, results.values()))) == 1 else 'KHÁC NHAU!'}")
+
+    # python -m src.data.input_cache
@@ -0,0 +1,314 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import cached_property
+
+import numpy as np
+from scipy.spatial import KDTree
+
+from src.data.input_cache import InputCache
+from src.domain.point import Point
+from src.network.core_class import ColumnarNetwork, Node, Link, get_boundary_nodes_of_network
+from src.network.network import load_network
+from src.od_mask.core_class import Zone
+from src.od_mask.generator import ZoneGeneratorByGrid
+from src.plan.core_class import Person, get_boundary_nodes_of_plans
+from src.plan.plan import generate_people_acts_coord_dict
+from src.transit.core_class import ColumnarSchedule, TransitRoute, StopFacility
+from src.transit.transit_schedule import load_columnar_schedule
+from src.transit.transit_vehicle import get_transit_type_dict
+
+
+class InputLoadError(RuntimeError):
+    """Lỗi khi đọc 1 file input của scenario; name: tên input, path: file bị lỗi, lỗi gốc nằm ở __cause__."""
+    def __init__(self, name: str, path: str, error: BaseException):
+        super().__init__(f"Không đọc được {name} ({path}): {type(error).__name__}: {error}")
+        self.name = name
+        self.path = path
+        self.error = error
+
+    def __reduce__(self):
+        # Để lỗi đi qua được ranh giới process (ProcessPoolExecutor pickle lại exception)
+        return type(self), (self.name, self.path, self.error)
+
+
+def _timed_load(loader, *args):
+    # Chạy được trong process con: trả về cả thời gian đọc
+    t0 = time.perf_counter()
+    value = loader(*args)
+    return value, time.perf_counter() - t0
+
+
+class ScenarioInputs:
+    """
+    Input tĩnh của 1 scenario: network, tuyến / trạm bus (transitSchedule), loại xe (transitVehicles),
+    tọa độ hoạt động của người dân (plans) và lưới zone.
+    Mỗi input chỉ được đọc ở lần truy cập đầu tiên rồi dùng chung cho extractor, KPI và visualizer,
+    nên mỗi file được parse nhiều nhất 1 lần cho mỗi scenario.
+    timings: thời gian đọc / tạo từng input (giây), theo thứ tự được dùng tới.
+    Lỗi khi đọc 1 file được báo bằng InputLoadError (tên input + đường dẫn file).
+    cache: InputCache dùng chung giữa các scenario; input có file nguồn giống hệt (cùng sha256) scenario trước
+    thì lấy lại từ cache thay vì đọc lại.
+    """
+    # Tên input -> thuộc tính cached_property chứa kết quả
+    FILE_INPUTS = {"network": "network", "plan": "people_dict", "transit_schedule": "schedule", "transit_vehicle": "vehtype_dict"}
+
+    def __init__(self, network_path: str, plan_path: str, transit_schedule_path: str, transit_vehicle_path: str,
+                 bus_route_hint_str: str, rows: int, cols: int, network_snapshot_dir: str | None = None, plan_workers: int = 1,
+                 cache: InputCache | None = None):
+        self.network_path = network_path
+        self.plan_path = plan_path
+        self.transit_schedule_path = transit_schedule_path
+        self.transit_vehicle_path = transit_vehicle_path
+        self.bus_route_hint_str = bus_route_hint_str
+        self.rows = rows
+        self.cols = cols
+        self.network_snapshot_dir = network_snapshot_dir
+        self.plan_workers = plan_workers
+        self.cache = cache
+        self.timings: dict[str, float] = {}
+
+    @classmethod
+    def from_config(cls, path, param, cache: InputCache | None = None) -> "ScenarioInputs":
+        return cls(
+            network_path=path.paths.network,
+            plan_path=path.paths.plan,
+            transit_schedule_path=path.paths.transit_schedule,
+            transit_vehicle_path=path.paths.transit_vehicle,
+            bus_route_hint_str=param.bus_route_hint_str,
+            rows=param.zone.rows,
+            cols=param.zone.cols,
+            network_snapshot_dir=path.data.interim.network_snapshot,
+            plan_workers=param.plan.workers,
+            cache=cache)
+
+    def _cache_key(self, name: str) -> tuple:
+        """Khoá của input trong InputCache: sha256 các file nguồn + tham số ảnh hưởng tới kết quả."""
+        fingerprint = self.cache.fingerprint
+        if name == "network":
+            return (fingerprint(self.network_path),)
+        if name == "plan":
+            return (fingerprint(self.plan_path),)
+        if name in ("transit_schedule", "stop_index"):
+            return (fingerprint(self.transit_schedule_path), self.bus_route_hint_str)
+        if name == "transit_vehicle":
+            return (fingerprint(self.transit_vehicle_path),)
+        return (fingerprint(self.network_path), fingerprint(self.plan_path), self.rows, self.cols)
+
+    def _file_cache_key(self, name: str) -> tuple:
+        try:
+            return self._cache_key(name)
+        except Exception as e:
+            raise InputLoadError(name, self._file_input_job(name)[0], e) from e
+
+    def _load(self, name: str, loader, *args):
+        key = self._cache_key(name) if self.cache is not None else None
+        t0 = time.perf_counter()
+        value = self.cache.get(name, key) if key is not None else None
+        if value is None:
+            value = loader(*args)
+            if key is not None:
+                self.cache.put(name, key, value, time.perf_counter() - t0)
+        self.timings[name] = time.perf_counter() - t0
+        return value
+
+    def _file_input_job(self, name: str) -> tuple:
+        """(file, loader, args) của 1 input đọc từ file."""
+        if name == "network":
+            return self.network_path, load_network, (self.network_path, self.network_snapshot_dir)
+        if name == "plan":
+            return self.plan_path, generate_people_acts_coord_dict, (self.plan_path, self.plan_workers)
+        if name == "transit_schedule":
+            return self.transit_schedule_path, load_columnar_schedule, (self.transit_schedule_path, self.bus_route_hint_str)
+        return self.transit_vehicle_path, get_transit_type_dict, (self.transit_vehicle_path,)
+
+    def _load_file_input(self, name: str):
+        file_path, loader, args = self._file_input_job(name)
+        try:
+            if self.cache is not None:
+                self._file_cache_key(name)
+            return self._load(name, loader, *args)
+        except InputLoadError:
+            raise
+        except Exception as e:
+            raise InputLoadError(name, file_path, e) from e
+
+    def load_all(self, executor: str | None = "thread"):
+        """
+        Đọc network, plans, transitSchedule và transitVehicles cùng lúc, trả về (network, people_dict, schedule, vehtype_dict).
+        - executor "thread": 1 thread / file (lxml nhả GIL trong lúc parse), kết quả dùng chung không phải copy.
+        - executor "process": 1 process / file, kết quả được pickle về process chính.
+        - None: đọc lần lượt.
+        Input đã đọc trước đó hoặc có trong cache không bị đọc lại (sha256 các file được tính song song trước). File lỗi: InputLoadError (file đầu tiên bị lỗi theo thứ tự trên),
+        sau khi các file còn lại đã đọc xong.
+        """
+        pending = [name for name, attr in self.FILE_INPUTS.items() if attr not in self.__dict__]
+        keys = {}
+        if self.cache is not None and pending:
+            with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+                keys = dict(zip(pending, pool.map(self._file_cache_key, pending)))
+            for name in [name for name in pending if self.cache.has(name, keys[name])]:
+                getattr(self, self.FILE_INPUTS[name])
+                pending.remove(name)
+        if executor is not None and len(pending) > 1:
+            pool_cls = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}[executor]
+            with pool_cls(max_workers=len(pending)) as pool:
+                futures = {}
+                for name in pending:
+                    file_path, loader, args = self._file_input_job(name)
+                    futures[name] = (file_path, pool.submit(_timed_load, loader, *args))
+            for name, (file_path, future) in futures.items():
+                try:
+                    value, seconds = future.result()
+                except Exception as e:
+                    raise InputLoadError(name, file_path, e) from e
+                self.__dict__[self.FILE_INPUTS[name]] = value
+                self.timings[name] = seconds
+                if self.cache is not None:
+                    self.cache.put(name, keys[name], value, seconds)
+        return self.network, self.people_dict, self.schedule, self.vehtype_dict
+
+    @cached_property
+    def network(self) -> ColumnarNetwork:
+        return self._load_file_input("network")
+
+    @property
+    def nodes_dict(self) -> dict[str, Node]:
+        return self.network.nodes
+
+    @property
+    def links_dict(self) -> dict[str, Link]:
+        return self.network.links
+
+    @cached_property
+    def schedule(self) -> ColumnarSchedule:
+        return self._load_file_input("transit_schedule")
+
+    @property
+    def bus_routes_dict(self) -> dict[str, TransitRoute]:
+        return self.schedule.routes
+
+    @property
+    def bus_stops_dict(self) -> dict[str, StopFacility]:
+        return self.schedule.stops
+
+    @cached_property
+    def bus_link_ids(self) -> set[str]:
+        """Các link có ít nhất 1 tuyến bus đi qua."""
+        return set(self.schedule.link_ids)
+
+    @cached_property
+    def vehtype_dict(self) -> dict[str, str]:
+        return self._load_file_input("transit_vehicle")
+
+    @cached_property
+    def people_dict(self) -> dict[str, Person]:
+        return self._load_file_input("plan")
+
+    def _build_zone_grid(self) -> tuple[ZoneGeneratorByGrid, list[Zone]]:
+        min_p_network, max_p_network = get_boundary_nodes_of_network(self.nodes_dict)
+        min_p_plan, max_p_plan = get_boundary_nodes_of_plans(self.people_dict)
+        min_p = Point(min(min_p_network.x, min_p_plan.x), min(min_p_network.y, min_p_plan.y))
+        max_p = Point(max(max_p_network.x, max_p_plan.x), max(max_p_network.y, max_p_plan.y))
+        zone_generator = ZoneGeneratorByGrid(max_p=max_p, min_p=min_p, rows=self.rows, cols=self.cols)
+        return zone_generator, zone_generator.generate()
+
+    @cached_property
+    def _zone_grid(self) -> tuple[ZoneGeneratorByGrid, list[Zone]]:
+        """Lưới zone phủ cả network lẫn mọi hoạt động trong plans."""
+        return self._load("zone", self._build_zone_grid)
+
+    @property
+    def zone_generator(self) -> ZoneGeneratorByGrid:
+        return self._zone_grid[0]
+
+    @property
+    def zones_list(self) -> list[Zone]:
+        return self._zone_grid[1]
+
+    def _build_stop_tree(self) -> KDTree:
+        schedule = self.schedule
+        codes = schedule.bus_stop_codes
+        return KDTree(np.column_stack([schedule.stop_x[codes], schedule.stop_y[codes]]))
+
+    @cached_property
+    def stop_tree(self) -> KDTree:
+        """KD-tree tọa độ các trạm bus (cùng thứ tự bus_stops_dict), dùng cho service coverage."""
+        return self._load("stop_index", self._build_stop_tree)
+
+    @property
+    def grid_info(self) -> str:
+        return f"{self.rows}x{self.cols}"
+
+    def release(self):
+        """Bỏ các input đã đọc để giải phóng bộ nhớ (đọc lại nếu còn được truy cập)."""
+        for name in ("network", "schedule", "bus_link_ids", "vehtype_dict", "people_dict", "_zone_grid", "stop_tree"):
+            self.__dict__.pop(name, None)
+
+
+if __name__ == "__main__":
+    # Benchmark: thời gian đọc từng input của scenario trong config; lần truy cập thứ 2 trở đi không đọc lại file
+    from src.data.load_config import load_config
+
+    path = load_config(r"config/config_path.yaml")
+    param = load_config(r"config/config_param.yaml")
+    inputs = ScenarioInputs.from_config(path, param)
+
+    t0 = time.perf_counter()
+    _ = (inputs.zones_list, inputs.bus_routes_dict, inputs.bus_link_ids, inputs.vehtype_dict)
+    first = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    _ = (inputs.zones_list, inputs.bus_routes_dict, inputs.bus_link_ids, inputs.vehtype_dict, inputs.links_dict)
+    second = time.perf_counter() - t0
+
+    print(f"[*] Scenario: {path.scenario}")
+    print(f"{'input':<20}{'time (s)':>10}")
+    for name, seconds in inputs.timings.items():
+        print(f"{name:<20}{seconds:>10.3f}")
+    print(f"[*] Lần truy cập đầu: {first:.3f} s, lần sau: {second * 1000:.3f} ms")
+    print(f"[*] {len(inputs.nodes_dict)} node, {len(inputs.links_dict)} link, {len(inputs.bus_routes_dict)} tuyến bus, "
+          f"{len(inputs.bus_stops_dict)} trạm bus, {len(inputs.vehtype_dict)} xe, {len(inputs.people_dict)} người, {len(inputs.zones_list)} zone")
+
+
+    # Benchmark: đọc lần lượt vs cùng lúc (thread / process) trên network, plans, schedule tổng hợp
+    # + transitVehicles của scenario; mỗi lần chạy trong 1 process mới (không có cache trong process)
+    import os
+    import tempfile
+    from src.utils.benchmark_fixtures import write_grid_network, write_synthetic_plans, write_synthetic_schedule
+
+    def benchmark_load_all(executor: str | None, paths: dict):
+        synthetic = ScenarioInputs(**paths, bus_route_hint_str="bus", rows=param.zone.rows, cols=param.zone.cols)
+        t0 = time.perf_counter()
+        network, people_dict, schedule, vehtype_dict = synthetic.load_all(executor)
+        return time.perf_counter() - t0, synthetic.timings, (len(network.link_ids), len(people_dict), len(schedule.route_ids), len(vehtype_dict))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = {
+            "network_path": os.path.join(tmp_dir, "network.xml"),
+            "plan_path": os.path.join(tmp_dir, "plan.xml"),
+            "transit_schedule_path": os.path.join(tmp_dir, "transitSchedule.xml"),
+            "transit_vehicle_path": path.paths.transit_vehicle,
+        }
+        write_grid_network(paths["network_path"], 200)
+        write_synthetic_plans(paths["plan_path"], 15_000)
+        write_synthetic_schedule(paths["transit_schedule_path"], 1000)
+        sizes = ", ".join(f"{name.removesuffix('_path')} {os.path.getsize(file_path) / 1e6:.1f} MB" for name, file_path in paths.items())
+
+        print(f"\n[*] Input tổng hợp: {sizes}, {os.cpu_count()} CPU")
+        print(f"{'executor':<12}{'wall (s)':>10}{'tổng từng file (s)':>20}{'speedup':>9}")
+        results = {}
+        base = None
+        for executor in (None, "thread", "process"):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                wall, input_timings, results[executor] = pool.submit(benchmark_load_all, executor, paths).result()
+            base = base or wall
+            print(f"{str(executor):<12}{wall:>10.2f}{sum(input_timings.values()):>20.2f}{base / wall:>8.2f}x")
+        print(f"[*] Kết quả: {'giống nhau' if len(set(results.values())) == 1 else 'KHÁC NHAU!'}")
+
+        # File lỗi: lỗi báo tên input + đường dẫn file
+        broken = dict(paths, plan_path=os.path.join(tmp_dir, "missing_plan.xml"))
+        try:
+            ScenarioInputs(**broken, bus_route_hint_str="bus", rows=param.zone.rows, cols=param.zone.cols).load_all("thread")
+        except InputLoadError as e:
+            print(f"[*] Lỗi khi đọc: {e}")
+
+    # python -m src.data.scenario_inputs
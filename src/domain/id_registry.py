@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict
+
+import pyarrow as pa
+
+
+class StringInterner:
+    """Gán mỗi chuỗi 1 mã int liên tục (0, 1, 2, ...), lưu chuỗi 1 lần duy nhất."""
+    def __init__(self):
+        self.codes: dict[str, int] = {}
+        self.strings: list[str] = []
+        # size -> dictionary đã tạo: nhiều writer (mỗi handler 1 thread ghi) dùng chung interner với size khác nhau
+        self._dictionaries: OrderedDict[int, pa.Array] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def get(self, value: str) -> int | None:
+        return self.codes.get(value)
+
+    # Số dictionary giữ lại (>= số writer có thể dùng chung 1 interner)
+    MAX_DICTIONARIES = 16
+
+    def dictionary(self, size: int | None = None) -> pa.Array:
+        """
+        Mảng string của toàn bộ mã (mã i -> phần tử i), dùng làm dictionary của cột dictionary<int32, string>.
+        Cùng size thì trả về đúng object cũ: writer Arrow IPC không ghi lại dictionary,
+        có mã mới thì dictionary mới là phần mở rộng của cái cũ (ghi dạng delta).
+        size: chỉ lấy size mã đầu tiên (số mã lúc batch được gom, khi batch được đóng gói trên thread ghi
+        trong lúc thread parse vẫn cấp mã mới). Mỗi writer hỏi 1 size riêng nên dictionary được nhớ theo size;
+        size nhỏ hơn dictionary lớn nhất đã có thì là slice của nó (không copy chuỗi).
+        """
+        if size is None:
+            size = len(self.strings)
+        with self._lock:
+            dictionaries = self._dictionaries
+            dictionary = dictionaries.get(size)
+            if dictionary is not None:
+                dictionaries.move_to_end(size)
+                return dictionary
+            largest = max(dictionaries.values(), key=len, default=None)
+            if largest is not None and len(largest) >= size:
+                dictionary = largest.slice(0, size)
+            else:
+                dictionary = pa.array(self.strings[:size], type=pa.string())
+            dictionaries[size] = dictionary
+            while len(dictionaries) > self.MAX_DICTIONARIES:
+                dictionaries.popitem(last=False)
+            return dictionary
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_dictionaries"] = OrderedDict()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class IdRegistry:
+    """
+    Mã int32 dùng chung cho ID của cả pipeline (loader, extractor, file Arrow interim):
+    - person: plans, vehicle: transitVehicles, link: network, stop: transitSchedule, zone: zone grid
+    - mã được cấp theo thứ tự đọc input, ID chỉ xuất hiện trong events được cấp mã tiếp theo khi gặp
+    - chuỗi chỉ dùng để hiển thị: cột ID trong file .arrow là mã + dictionary = registry[namespace].strings
+    """
+    NAMESPACES = ("person", "vehicle", "link", "stop", "zone")
+
+    def __init__(self):
+        self.person = StringInterner()
+        self.vehicle = StringInterner()
+        self.link = StringInterner()
+        self.stop = StringInterner()
+        self.zone = StringInterner()
+
+    def __getitem__(self, namespace: str) -> StringInterner:
+        if namespace not in self.NAMESPACES:
+            raise KeyError(f"IdRegistry không có namespace {namespace}")
+        return getattr(self, namespace)
+
+    def sizes(self) -> dict[str, int]:
+        return {namespace: len(self[namespace]) for namespace in self.NAMESPACES}
+
+
+def build_id_registry(
+    links_dict: dict | None = None, vehtype_dict: dict | None = None, stops_dict: dict | None = None,
+    people_dict: dict | None = None, zones_list: list | None = None) -> IdRegistry:
+    """
+    Tạo registry từ các dict đã load (network, transitVehicles, transitSchedule, plans, zone grid).
+    zones_list theo thứ tự ZoneGeneratorByGrid.generate(): mã zone = r * cols + c, "undefined" là mã cuối.
+    """
+    registry = IdRegistry()
+    for namespace, ids in (
+        ("link", links_dict), ("vehicle", vehtype_dict), ("stop", stops_dict), ("person", people_dict)):
+        if ids is not None:
+            interner = registry[namespace]
+            for id in ids:
+                interner.code(id)
+    if zones_list is not None:
+        for zone in zones_list:
+            registry.zone.code(zone.id)
+        registry.zone.code("undefined")
+    return registry
+
+
+if __name__ == "__main__":
+    # Benchmark pipeline đầy đủ: load input + tạo registry + trích xuất 5 file .arrow (thời gian, RAM đỉnh, dung lượng)
+    import os
+    import tempfile
+    import time
+    import tracemalloc
+    from src.data.load_config import load_config
+    from src.data.scenario_inputs import ScenarioInputs
+    from src.events.extract_all import generate_all_events_df
+
+    path = load_config(r"config/config_path.yaml")
+    param = load_config(r"config/config_param.yaml")
+    bus_hint = param.bus_route_hint_str
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    inputs = ScenarioInputs.from_config(path, param)
+    links_dict, people, bus_stops_dict, veh_type_dict = inputs.links_dict, inputs.people_dict, inputs.bus_stops_dict, inputs.vehtype_dict
+    zone_gen, zones_list = inputs.zone_generator, inputs.zones_list
+    t_load = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    before = tracemalloc.get_traced_memory()[0]
+    registry = build_id_registry(links_dict, veh_type_dict, bus_stops_dict, people, zones_list)
+    registry_mb = (tracemalloc.get_traced_memory()[0] - before) / 2**20
+    t_registry = time.perf_counter() - t0
+
+    names = ["bus_delay.arrow", "person_enter_bus.arrow", "travel_time.arrow", "people_trip.arrow", "bus_trip.arrow"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        outputs = [os.path.join(tmp_dir, n) for n in names]
+        tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        generate_all_events_df(
+            events_path=path.paths.events, vehtype_dict=veh_type_dict, links_dict=links_dict, zone_finder=zone_gen,
+            bus_hint_str=bus_hint, bus_delay_arrow_path=outputs[0], person_enter_bus_arrow_path=outputs[1],
+            travel_time_arrow_path=outputs[2], people_trip_arrow_path=outputs[3], bus_trip_arrow_path=outputs[4],
+            id_registry=registry)
+        t_extract = time.perf_counter() - t0
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        sizes = {n: os.path.getsize(p) / 1024 for n, p in zip(names, outputs)}
+    tracemalloc.stop()
+
+    print("-" * 50)
+    print(f"[*] Load input: {t_load:.2f} s")
+    print(f"[*] Registry: {t_registry:.3f} s, {registry_mb:.2f} MB - {registry.sizes()}")
+    print(f"[*] Trích xuất events: {t_extract:.2f} s, RAM đỉnh {peak_mb:.1f} MB")
+    for n, size in sizes.items():
+        print(f"    - {n}: {size:.1f} KB")
+
+    # python -m src.domain.id_registry
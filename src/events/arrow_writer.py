@@ -0,0 +1,116 @@
+import pyarrow.ipc as ipc
+
+import queue
+import threading
+
+COMPRESSIONS = (None, "lz4", "zstd")
+
+
+def write_options(compression: str | None = None) -> ipc.IpcWriteOptions:
+    """
+    Option ghi Arrow IPC của các extractor.
+    - Dictionary mới là phần mở rộng của dictionary đã ghi (bảng mã ID) -> chỉ ghi phần thêm vào
+    - compression: nén buffer của từng batch ("lz4" | "zstd"), reader pyarrow tự giải nén
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"compression phải là 1 trong {COMPRESSIONS}, không phải {compression!r}")
+    return ipc.IpcWriteOptions(emit_dictionary_deltas=True, compression=compression)
+
+
+class BatchWriterThread:
+    """
+    Đóng gói + ghi batch trên 1 thread riêng (producer / consumer).
+    Thread parse chỉ đẩy các cột đã gom (ColumnarBatchBuilder.take()) vào hàng đợi có giới hạn,
+    thread ghi gọi write(pending): chuyển sang RecordBatch, nén IPC (nếu có) và ghi ra đĩa,
+    chạy chồng lên thời gian parse (ghi file / nén lz4, zstd nhả GIL).
+    Hàng đợi đầy (max_pending batch chờ ghi) -> thread parse chờ (backpressure), RAM của các batch chưa ghi có giới hạn.
+    Lỗi trên thread ghi được ném lại ở lần put / join / close kế tiếp.
+    """
+    def __init__(self, write, max_pending: int = 4):
+        self._write = write
+        self._queue = queue.Queue(maxsize=max(max_pending, 1))
+        self._error = None
+        self._discard = False
+        self._thread = threading.Thread(target=self._consume, daemon=True)
+        self._thread.start()
+
+    def _consume(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._error is None and not self._discard:
+                    self._write(item)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def put(self, pending):
+        self._raise_error()
+        self._queue.put(pending)
+
+    def join(self):
+        """Đợi ghi xong mọi batch đã đẩy vào (trước khi đọc vị trí file để ghi checkpoint, ...)."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self, discard: bool = False):
+        """Ghi nốt các batch còn trong hàng đợi rồi dừng thread (discard=True: bỏ các batch chưa ghi, dùng khi abort)."""
+        self._discard = discard
+        self._queue.put(None)
+        self._thread.join()
+        if not discard:
+            self._raise_error()
+
+
+if __name__ == "__main__":
+    # Benchmark: ghi trên thread parse (write_queue_size=0) vs thread ghi riêng, có / không nén IPC
+    # write: thời gian đóng gói + ghi batch, parse chờ: thời gian thread parse bị chặn trong flush(), ẩn: phần write chạy chồng lên parse
+    import os
+    import tempfile
+    import time
+    from src.data.load_config import load_config
+    from src.data.scenario_inputs import ScenarioInputs
+    from src.events.engine import EventsEngine
+    from src.events.bus_delay import BusDelayHandler
+    from src.events.person_enter_bus import PersonEnterBusHandler
+    from src.events.travel_time import TravelTimeVehicleHandler
+    from src.events.person_trip import PersonTripHandler
+    from src.events.bus_trip import BusTripHandler
+
+    path = load_config(r"config/config_path.yaml")
+    param = load_config(r"config/config_param.yaml")
+    bus_hint = param.bus_route_hint_str
+    inputs = ScenarioInputs.from_config(path, param)
+    links_dict, zone_gen, veh_type_dict = inputs.links_dict, inputs.zone_generator, inputs.vehtype_dict
+    batch_size = 5000
+
+    print(f"{'mode':<22}{'total (s)':>10}{'write (s)':>11}{'parse chờ (s)':>15}{'ẩn (%)':>9}{'MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for write_queue_size, compression in ((0, None), (4, None), (0, "zstd"), (4, "zstd"), (4, "lz4")):
+            kw = dict(batch_size=batch_size, write_queue_size=write_queue_size, compression=compression)
+            handlers = [
+                BusDelayHandler(veh_type_dict, bus_hint, os.path.join(tmp_dir, "bus_delay.arrow"), **kw),
+                PersonEnterBusHandler(veh_type_dict, bus_hint, os.path.join(tmp_dir, "person_enter_bus.arrow"), **kw),
+                TravelTimeVehicleHandler(veh_type_dict, bus_hint, os.path.join(tmp_dir, "travel_time.arrow"), **kw),
+                PersonTripHandler(veh_type_dict, zone_gen, bus_hint, os.path.join(tmp_dir, "people_trip.arrow"), **kw),
+                BusTripHandler(links_dict, veh_type_dict, bus_hint, os.path.join(tmp_dir, "bus_trip.arrow"), **kw),
+            ]
+            t0 = time.perf_counter()
+            EventsEngine(path.paths.events, handlers).run()
+            total = time.perf_counter() - t0
+            write = sum(h.write_seconds for h in handlers)
+            blocked = sum(h.blocked_seconds for h in handlers)
+            hidden = max(0.0, 100 * (1 - blocked / write)) if write > 0 else 0.0
+            size = sum(os.path.getsize(h.output_arrow_path) for h in handlers) / 1e6
+            mode = f"{'thread' if write_queue_size else 'inline'}, {compression or 'không nén'}"
+            print(f"{mode:<22}{total:>10.2f}{write:>11.2f}{blocked:>15.2f}{hidden:>9.1f}{size:>8.2f}")
+
+    # python -m src.events.arrow_writer
@@ -1,83 +1,83 @@
-import pandas as pd
 import pyarrow as pa
-import pyarrow.ipc as ipc
-import lxml
-import lxml.etree as etree
 
-from src.transit.transit_vehicle import get_transit_type_dict
-from src.domain.logic import is_pt_driver, is_public_transport_bus
+from src.transit.transit_vehicle import TransitVehicleClasses
+from src.domain.id_registry import IdRegistry
+from src.events.engine import ArrowStreamHandler, EventsEngine
+from src.events.schemas import BUS_DELAY_SCHEMA
 
-def generate_busDelayAtFacilities_df(
-    events_path: str, vehtype_dict: dict, bus_hint_str: str, output_arrow_path: str, schema: list = ['vehicleId', 'vehicleType', 'facility' ,  'arrDelay', 'depDelay', 'arrTime', 'depTime'], prefix_pt_driver="pt", batch_size=50000):
-    
-    arrow_schema = pa.schema([(name, pa.string()) for name in schema])
-    temp_bus_map ={}
-    temp_data = []
+class BusDelayHandler(ArrowStreamHandler):
+    event_types = frozenset({"VehicleArrivesAtFacility", "VehicleDepartsAtFacility"})
+    event_columns = {
+        "VehicleArrivesAtFacility": ("vehicle", "delay", "facility"),
+        "VehicleDepartsAtFacility": ("vehicle", "delay"),
+    }
+    checkpoint_attrs = ("temp_bus_map", "id_registry", "vehicle_classes")
 
+    def __init__(self, vehtype_dict: dict, bus_hint_str: str, output_arrow_path: str, schema: pa.Schema = BUS_DELAY_SCHEMA, prefix_pt_driver="pt", batch_size=50000,
+                 id_registry: IdRegistry | None = None, vehicle_classes: TransitVehicleClasses | None = None,
+                 write_queue_size: int = 4, compression: str | None = None):
+        # vehicleId, facility: ghi mã của IdRegistry
+        self.id_registry = id_registry if id_registry is not None else IdRegistry()
+        super().__init__(output_arrow_path, schema, batch_size,
+                         interners={"vehicleId": self.id_registry.vehicle, "facility": self.id_registry.stop},
+                         write_queue_size=write_queue_size, compression=compression)
+        self.vehtype_dict = vehtype_dict
+        self.bus_hint_str = bus_hint_str
+        self.vehicle_classes = vehicle_classes if vehicle_classes is not None else TransitVehicleClasses(
+            vehtype_dict, bus_hint_str, self.id_registry.vehicle)
+        self.temp_bus_map = {}
 
-    with pa.OSFile(output_arrow_path, 'wb') as sink:
-        with ipc.new_stream(sink, arrow_schema) as writer:
-            context = etree.iterparse(events_path, events=('end',))
-            for event, elem in context:
-                if elem.tag == "event":
-                    e_type = elem.get("type")
+    def handle_event(self, e_type: str, attrs):
+        vehtype_dict = self.vehtype_dict
+        bus_codes = self.vehicle_classes.bus_codes
+        temp_bus_map = self.temp_bus_map
 
-                    if e_type == "VehicleArrivesAtFacility":
-                        veh_id = elem.get("vehicle")
-                        delay = elem.get("delay")
-                        time = elem.get("time")
-                        facility = elem.get("facility")
-                        
-                       
+        if e_type == "VehicleArrivesAtFacility":
+            veh_id = attrs.get("vehicle")
+            delay = attrs.get("delay")
+            time = attrs.get("time")
+            facility = attrs.get("facility")
 
-                        if veh_id not in vehtype_dict.keys() or is_public_transport_bus(vehicle_type=vehtype_dict[veh_id], bus_hint_str=bus_hint_str)==False:
-                            continue           
-                        if delay is None:
-                            delay = "null"   
-                        else: 
-                            temp_bus_map[veh_id] = {
-                                "vehicleId": str(veh_id),
-                                "vehicleType": str(vehtype_dict[veh_id]),
-                                "facility": facility, # Sẽ cập nhật ở event Depart
-                                "arrDelay": str(delay),
-                                "depDelay": "0.0",
-                                "arrTime": str(time),
-                                "depTime": "0.0"
-                            }
+            veh_code = bus_codes.get(veh_id)
+            if veh_code is None:
+                return
+            if delay is not None:
+                temp_bus_map[veh_id] = {
+                    "vehicleId": veh_code,
+                    "vehicleType": str(vehtype_dict[veh_id]),
+                    "facility": self.id_registry.stop.code(facility), # Sẽ cập nhật ở event Depart
+                    "arrDelay": float(delay),
+                    "depDelay": 0.0,
+                    "arrTime": float(time),
+                    "depTime": 0.0
+                }
 
-                    elif e_type == "VehicleDepartsAtFacility":
-                        veh_id = elem.get("vehicle")
-                        delay = elem.get("delay")
-                        time = elem.get("time")
-                        facility = elem.get("facility")
+        elif e_type == "VehicleDepartsAtFacility":
+            veh_id = attrs.get("vehicle")
+            delay = attrs.get("delay")
+            time = attrs.get("time")
 
-                        if veh_id not in temp_bus_map:
-                            continue
-                        if delay is None:
-                            delay = "0.0"
-                        else: 
-                            temp_bus_map[veh_id]["depTime"] = str(time)
-                            temp_bus_map[veh_id]["depDelay"] = str(delay)
-                            temp_data.append(temp_bus_map[veh_id])
-                            del temp_bus_map[veh_id]
+            if veh_id not in temp_bus_map:
+                return
+            if delay is not None:
+                record = temp_bus_map.pop(veh_id)
+                self.emit(
+                    record["vehicleId"], record["vehicleType"], record["facility"],
+                    record["arrDelay"], float(delay), record["arrTime"], float(time))
 
-                            if( len(temp_data)>batch_size ):
-                                df = pd.DataFrame(temp_data)
-                                table = pa.Table.from_pandas(df, schema=arrow_schema)
-                                writer.write_table(table)
-                                temp_data = []              
-         
-                elem.clear()
-                while elem.getprevious() is not None:
-                    del elem.getparent()[0]
+                if( len(self.batch)>self.batch_size ):
+                    self.flush()
 
-            if temp_data:
-                df = pd.DataFrame(temp_data)
-                table = pa.Table.from_pandas(df, schema=arrow_schema)
-                writer.write_table(table)
-                temp_data =[]
 
-        print(f"--- Đã hoàn thành Streaming ra file Arrow IPC: {output_arrow_path} ---")
+def generate_busDelayAtFacilities_df(
+    events_path: str, vehtype_dict: dict, bus_hint_str: str, output_arrow_path: str, schema: pa.Schema = BUS_DELAY_SCHEMA, prefix_pt_driver="pt", batch_size=50000,
+    start_time=None, end_time=None, lookback=3600, id_registry: IdRegistry | None = None,
+    vehicle_classes: TransitVehicleClasses | None = None, write_queue_size: int = 4, compression: str | None = None):
+    handler = BusDelayHandler(
+        vehtype_dict=vehtype_dict, bus_hint_str=bus_hint_str, output_arrow_path=output_arrow_path,
+        schema=schema, prefix_pt_driver=prefix_pt_driver, batch_size=batch_size, id_registry=id_registry,
+        vehicle_classes=vehicle_classes, write_queue_size=write_queue_size, compression=compression)
+    EventsEngine(events_path, [handler], start_time=start_time, end_time=end_time, lookback=lookback).run()
 
 if __name__ == "__main__":
     from src.data.load_config import load_config
@@ -90,4 +90,4 @@ if __name__ == "__main__":
         bus_hint_str="bus", 
         output_arrow_path=path.data.interim.event.bus_delay_at_facilities)
 
-    # python -m src.events.bus_delay
\ No newline at end of file
+    # python -m src.events.bus_delay
@@ -1,10 +1,162 @@
 import pyarrow as pa
-import pyarrow.ipc as ipc
-import pandas as pd
-from lxml import etree
 import os
+from array import array
+
+from src.domain.id_registry import IdRegistry
+from src.transit.transit_vehicle import TransitVehicleClasses
+from src.events.engine import ArrowStreamHandler, EventsEngine
+from src.events.schemas import BUS_TRIP_SCHEMA
+
+class BusTripHandler(ArrowStreamHandler):
+    """
+    Bus Trip extractor as an events handler.
+    Logic ported from BusTripExtractor.kt.
+    """
+    event_types = frozenset({
+        "TransitDriverStarts", "vehicle enters traffic", "entered link",
+        "PersonEntersVehicle", "PersonLeavesVehicle", "left link", "vehicle leaves traffic"
+    })
+    event_columns = {
+        "TransitDriverStarts": ("vehicleId", "driverId"),
+        "vehicle enters traffic": ("vehicle", "link"),
+        "entered link": ("vehicle", "link"),
+        "PersonEntersVehicle": ("vehicle", "person"),
+        "PersonLeavesVehicle": ("vehicle", "person"),
+        "left link": ("vehicle",),
+        "vehicle leaves traffic": ("vehicle",),
+    }
+    checkpoint_attrs = ("bus_trips", "veh_driver_map", "id_registry", "link_length", "vehicle_classes")
+
+    def __init__(
+        self, 
+        links_dict: dict, 
+        vehtype_dict: dict, 
+        bus_hint_str: str, 
+        output_arrow_path: str, 
+        schema: pa.Schema = BUS_TRIP_SCHEMA, 
+        batch_size=50000,
+        id_registry: IdRegistry | None = None,
+        vehicle_classes: TransitVehicleClasses | None = None,
+        write_queue_size: int = 4,
+        compression: str | None = None
+    ):
+        # busId, linkId: ghi mã của IdRegistry
+        self.id_registry = id_registry if id_registry is not None else IdRegistry()
+        super().__init__(output_arrow_path, schema, batch_size,
+                         interners={"busId": self.id_registry.vehicle, "linkId": self.id_registry.link},
+                         write_queue_size=write_queue_size, compression=compression)
+        self.vehtype_dict = vehtype_dict
+        self.bus_hint_str = bus_hint_str
+        self.vehicle_classes = vehicle_classes if vehicle_classes is not None else TransitVehicleClasses(
+            vehtype_dict, bus_hint_str, self.id_registry.vehicle)
+        # Chiều dài link theo mã link (link không có trong network: 0.0)
+        links = self.id_registry.link
+        for link_id in links_dict:
+            links.code(link_id)
+        self.link_length = array('d', (links_dict[link_id].length if link_id in links_dict else 0.0 for link_id in links.strings))
+
+        # State maps
+        # busTrips[busId] = {
+        #   "busId": mã vehicle, "currentLinkId": mã link, "passengers": int, 
+        #   "enterTime": float, "pendingPassengers": int
+        # }
+        self.bus_trips = {}
+        self.veh_driver_map = {}
+
+    def _push_link_record(self, trip: dict, time: float):
+        link_code = trip["currentLinkId"]
+
+        # Calculate data
+        link_len = self.link_length[link_code] if link_code < len(self.link_length) else 0.0
+        have_passenger = trip["passengers"] > 0
+        travel_time = time - trip["enterTime"]
+
+        # Push data (busId, linkId, linkLen, havePassenger, travelTime)
+        self.emit(trip["busId"], link_code, link_len, have_passenger, travel_time)
+
+        # Batch Write
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def handle_event(self, e_type: str, attrs):
+        bus_trips = self.bus_trips
+        veh_driver_map = self.veh_driver_map
+        bus_codes = self.vehicle_classes.bus_codes
+        time_str = attrs.get("time")
+        time = float(time_str) if time_str else 0.0
+
+        # --- TransitDriverStarts ---
+        if e_type == "TransitDriverStarts":
+            vehicle_id = attrs.get("vehicleId")
+            if vehicle_id not in bus_codes:
+                return
+            veh_driver_map[vehicle_id] = attrs.get("driverId")
+
+        # --- vehicle enters traffic ---
+        elif e_type == "vehicle enters traffic":
+            vehicle_id = attrs.get("vehicle")
+            bus_code = bus_codes.get(vehicle_id)
+            if bus_code is None:
+                return
+                
+            bus_trips[vehicle_id] = {
+                "busId": bus_code,
+                "currentLinkId": self.id_registry.link.code(attrs.get("link")),
+                "passengers": 0,
+                "pendingPassengers": 0,
+                "enterTime": time
+            }
+
+        # --- entered link ---
+        elif e_type == "entered link":
+            vehicle_id = attrs.get("vehicle")
+            if vehicle_id in bus_trips:
+                trip = bus_trips[vehicle_id]
+                # Update state (copy behavior)
+                trip["currentLinkId"] = self.id_registry.link.code(attrs.get("link"))
+                trip["passengers"] = trip["pendingPassengers"]
+                trip["enterTime"] = time
+
+        # --- PersonEntersVehicle ---
+        elif e_type == "PersonEntersVehicle":
+            vehicle_id = attrs.get("vehicle")
+            person_id = attrs.get("person")
+            
+            if vehicle_id in bus_trips:
+                # If person is driver, ignore
+                if person_id != veh_driver_map.get(vehicle_id):
+                    bus_trips[vehicle_id]["pendingPassengers"] += 1
+
+        # --- PersonLeavesVehicle ---
+        elif e_type == "PersonLeavesVehicle":
+            vehicle_id = attrs.get("vehicle")
+            person_id = attrs.get("person")
+            
+            if vehicle_id in bus_trips:
+                # If person is driver, ignore
+                if person_id != veh_driver_map.get(vehicle_id):
+                    bus_trips[vehicle_id]["pendingPassengers"] -= 1
+
+        # --- left link ---
+        elif e_type == "left link":
+            vehicle_id = attrs.get("vehicle")
+            if vehicle_id in bus_trips:
+                self._push_link_record(bus_trips[vehicle_id], time)
+
+        # --- vehicle leaves traffic ---
+        elif e_type == "vehicle leaves traffic":
+            vehicle_id = attrs.get("vehicle")
+            if vehicle_id in bus_trips:
+                trip = bus_trips.pop(vehicle_id) # Remove and get
+                
+                # Final checks similar to Kotlin require(trip.pendingPassengers == 0)
+                # We won't crash, but won't record if logic is weird? 
+                # Actually we just replicate the write logic from Kotlin
+                self._push_link_record(trip, time)
+                
+                if vehicle_id in veh_driver_map:
+                    del veh_driver_map[vehicle_id]
 
-from src.domain.logic import is_pt_driver, is_public_transport_bus
 
 def generate_busTrip_df(
     events_path: str, 
@@ -12,169 +164,26 @@ def generate_busTrip_df(
     vehtype_dict: dict, 
     bus_hint_str: str, 
     output_arrow_path: str, 
-    schema: list = ['busId', 'linkId', 'linkLen', 'havePassenger', 'travelTime'], 
-    batch_size=50000
+    schema: pa.Schema = BUS_TRIP_SCHEMA, 
+    batch_size=50000,
+    start_time=None,
+    end_time=None,
+    lookback=3600,
+    id_registry: IdRegistry | None = None,
+    vehicle_classes: TransitVehicleClasses | None = None,
+    write_queue_size: int = 4,
+    compression: str | None = None
 ):
     """
     Generates Bus Trip Data Arrow file from MATSim events.
     Logic ported from BusTripExtractor.kt.
+    start_time / end_time: chỉ lấy các link record trong time window (xem EventsEngine).
     """
-    
-    # 1. Define Schema (All strings for consistency with existing modules)
-    arrow_schema = pa.schema([
-        (name, pa.string()) for name in schema
-    ])
-
-    temp_data = []
-    link_length_dict = {k: v.length for k, v in links_dict.items()}
-    
-    # State maps
-    # busTrips[busId] = {
-    #   "busId": str, "currentLinkId": str, "passengers": int, 
-    #   "enterTime": float, "pendingPassengers": int
-    # }
-    bus_trips = {}
-    veh_driver_map = {}
-
-    context = etree.iterparse(events_path, events=('end',))
-
-    # 2. Open Sink and Stream Writer
-    with pa.OSFile(output_arrow_path, 'wb') as sink:
-        with ipc.new_stream(sink, arrow_schema) as writer:
-            
-            for event, elem in context:
-                if elem.tag == "event":
-                    e_type = elem.get("type")
-                    time_str = elem.get("time")
-                    time = float(time_str) if time_str else 0.0
-                    attrs = dict(elem.attrib) # Get attributes
-
-                    # --- TransitDriverStarts ---
-                    if e_type == "TransitDriverStarts":
-                        vehicle_id = attrs.get("vehicleId")
-                        # Lookup vehicle type
-                        if vehicle_id not in vehtype_dict.keys() or not is_public_transport_bus(vehicle_type=vehtype_dict[vehicle_id], bus_hint_str=bus_hint_str):
-                            continue
-                        veh_driver_map[vehicle_id] = attrs.get("driverId")
-
-                    # --- vehicle enters traffic ---
-                    elif e_type == "vehicle enters traffic":
-                        vehicle_id = attrs.get("vehicle")
-                        # Lookup vehicle type
-                        if vehicle_id not in vehtype_dict.keys() or not is_public_transport_bus(vehicle_type=vehtype_dict[vehicle_id], bus_hint_str=bus_hint_str):
-                           continue
-                            
-                        bus_trips[vehicle_id] = {
-                            "busId": vehicle_id,
-                            "currentLinkId": attrs.get("link"),
-                            "passengers": 0,
-                            "pendingPassengers": 0,
-                            "enterTime": time
-                        }
-
-                    # --- entered link ---
-                    elif e_type == "entered link":
-                        vehicle_id = attrs.get("vehicle")
-                        if vehicle_id in bus_trips:
-                            trip = bus_trips[vehicle_id]
-                            # Update state (copy behavior)
-                            trip["currentLinkId"] = attrs.get("link")
-                            trip["passengers"] = trip["pendingPassengers"]
-                            trip["enterTime"] = time
-
-                    # --- PersonEntersVehicle ---
-                    elif e_type == "PersonEntersVehicle":
-                        vehicle_id = attrs.get("vehicle")
-                        person_id = attrs.get("person")
-                        
-                        if vehicle_id in bus_trips:
-                            # If person is driver, ignore
-                            if person_id != veh_driver_map.get(vehicle_id):
-                                bus_trips[vehicle_id]["pendingPassengers"] += 1
-
-                    # --- PersonLeavesVehicle ---
-                    elif e_type == "PersonLeavesVehicle":
-                        vehicle_id = attrs.get("vehicle")
-                        person_id = attrs.get("person")
-                        
-                        if vehicle_id in bus_trips:
-                            # If person is driver, ignore
-                            if person_id != veh_driver_map.get(vehicle_id):
-                                bus_trips[vehicle_id]["pendingPassengers"] -= 1
-
-                    # --- left link ---
-                    elif e_type == "left link":
-                        vehicle_id = attrs.get("vehicle")
-                        if vehicle_id in bus_trips:
-                            trip = bus_trips[vehicle_id]
-                            link_id = trip["currentLinkId"]
-                            
-                            # Calculate data
-                            link_len = link_length_dict.get(link_id, 0.0)
-                            have_passenger = trip["passengers"] > 0
-                            travel_time = time - trip["enterTime"]
-                            
-                            # Push data
-                            temp_data.append({
-                                'busId': str(trip["busId"]),
-                                'linkId': str(link_id),
-                                'linkLen': str(link_len),
-                                'havePassenger': str(have_passenger).lower(), # 'true'/'false'
-                                'travelTime': str(travel_time)
-                            })
-                            
-                            # Batch Write
-                            if len(temp_data) >= batch_size:
-                                batch_df = pd.DataFrame(temp_data)
-                                table = pa.Table.from_pandas(batch_df, schema=arrow_schema)
-                                writer.write_table(table)
-                                temp_data = []
-
-                    # --- vehicle leaves traffic ---
-                    elif e_type == "vehicle leaves traffic":
-                        vehicle_id = attrs.get("vehicle")
-                        if vehicle_id in bus_trips:
-                            trip = bus_trips.pop(vehicle_id) # Remove and get
-                            
-                            # Final checks similar to Kotlin require(trip.pendingPassengers == 0)
-                            # We won't crash, but won't record if logic is weird? 
-                            # Actually we just replicate the write logic from Kotlin
-                            
-                            link_id = trip["currentLinkId"]
-                            link_len = link_length_dict.get(link_id, 0.0)
-                            have_passenger = trip["passengers"] > 0
-                            travel_time = time - trip["enterTime"]
-
-                            temp_data.append({
-                                'busId': str(trip["busId"]),
-                                'linkId': str(link_id),
-                                'linkLen': str(link_len),
-                                'havePassenger': str(have_passenger).lower(),
-                                'travelTime': str(travel_time)
-                            })
-
-                            if len(temp_data) >= batch_size:
-                                batch_df = pd.DataFrame(temp_data)
-                                table = pa.Table.from_pandas(batch_df, schema=arrow_schema)
-                                writer.write_table(table)
-                                temp_data = []
-                            
-                            if vehicle_id in veh_driver_map:
-                                del veh_driver_map[vehicle_id]
-
-                # Free memory
-                elem.clear()
-                while elem.getprevious() is not None:
-                    del elem.getparent()[0]
-
-            # Write remaining
-            if temp_data:
-                batch_df = pd.DataFrame(temp_data)
-                table = pa.Table.from_pandas(batch_df, schema=arrow_schema)
-                writer.write_table(table)
-                del temp_data
-
-    print(f"--- Đã hoàn thành Streaming ra file Arrow IPC: {output_arrow_path} ---")
+    handler = BusTripHandler(
+        links_dict=links_dict, vehtype_dict=vehtype_dict, bus_hint_str=bus_hint_str,
+        output_arrow_path=output_arrow_path, schema=schema, batch_size=batch_size, id_registry=id_registry,
+        vehicle_classes=vehicle_classes, write_queue_size=write_queue_size, compression=compression)
+    EventsEngine(events_path, [handler], start_time=start_time, end_time=end_time, lookback=lookback).run()
 
 if __name__ == "__main__":
     from src.data.load_config import load_config
@@ -0,0 +1,482 @@
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import io
+import os
+import pickle
+from abc import ABC, abstractmethod
+from time import monotonic, perf_counter, sleep
+
+from src.events.arrow_writer import BatchWriterThread, write_options
+from src.events.batch_builder import ColumnarBatchBuilder
+from src.events.event_lake import is_event_lake, iter_lake_events
+from src.events.follow import EventsTail
+from src.events.parsers import EVENT_TAG, EVENTS_END_TAG, get_events_parser, parse_shard_data, prefixed_stream
+from src.events.time_index import load_time_index, offset_after, offset_at_or_before, parse_time
+from src.utils.byte_chunks import find_tag_offsets, iter_ordered_results, iter_stream_tag_chunks
+from src.utils.compressed_input import is_compressed, open_input
+
+
+class EventHandler(ABC):
+    """
+    One consumer of the events stream (port of OfflineEventHandler in BusTripExtractor.kt).
+    - event_types: các type mà handler quan tâm, engine chỉ dispatch những type này
+    - event_columns: các thuộc tính handler đọc cho từng type (chỉ dùng khi đọc từ event lake, None: đọc mọi cột)
+    - attrs: mapping thuộc tính của event (dùng attrs.get("..."))
+    - checkpoint_attrs: các attribute giữ state đang mở (chuyến đi đang dở, ...), được lưu vào checkpoint của engine
+    - supports_checkpoint: False nếu state của handler không lưu được vào checkpoint (engine sẽ bỏ qua checkpoint)
+    """
+    event_types: frozenset = frozenset()
+    event_columns: dict[str, tuple[str, ...]] | None = None
+    checkpoint_attrs: tuple[str, ...] = ()
+    supports_checkpoint: bool = True
+    # False trong giai đoạn look-back của time window: handler cập nhật state nhưng không ghi bản ghi
+    recording: bool = True
+
+    def open(self):
+        pass
+
+    def checkpoint_state(self) -> dict:
+        state = {name: getattr(self, name) for name in self.checkpoint_attrs}
+        state["recording"] = self.recording
+        return state
+
+    def restore_checkpoint(self, state: dict):
+        """Khôi phục state từ checkpoint (gọi trước open())."""
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    @abstractmethod
+    def handle_event(self, e_type: str, attrs) -> None:
+        pass
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+class ArrowStreamHandler(EventHandler):
+    """
+    Base for extractors that stream their rows into an Arrow IPC file.
+    Each handler keeps its own state, its own columnar batch builder and its own writer.
+    Rows are appended with self.emit(...) in schema column order.
+    interners: {column: StringInterner} for ID columns emitted as registry codes (see src/domain/id_registry.py);
+    their dictionary is written once and only extended (delta) when new IDs show up.
+    write_queue_size > 0: full batches are handed to a writer thread (src/events/arrow_writer.py) through a queue
+    of at most write_queue_size batches, encoding + compression + disk writes overlap with parsing; 0: write inline.
+    compression: IPC buffer compression ("lz4" | "zstd" | None), the file content stays the same.
+    """
+    def __init__(self, output_arrow_path: str, arrow_schema: pa.Schema, batch_size: int = 50000, interners: dict | None = None,
+                 write_queue_size: int = 4, compression: str | None = None):
+        self.output_arrow_path = output_arrow_path
+        self.arrow_schema = arrow_schema
+        self.batch_size = batch_size
+        self.batch = ColumnarBatchBuilder(arrow_schema, interners)
+        self.batches_written = 0
+        self.write_queue_size = write_queue_size
+        self.ipc_options = write_options(compression)
+        # Thống kê ghi: thời gian đóng gói + ghi batch / thời gian thread parse bị chặn trong flush()
+        self.write_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self._resume_output_size = None
+        self._sink = None
+        self._writer = None
+        self._write_thread = None
+
+    def open(self):
+        if self._resume_output_size is not None:
+            self._open_resumed(self._resume_output_size)
+        else:
+            self._sink = pa.OSFile(self.output_arrow_path, 'wb')
+            self._writer = ipc.new_stream(self._sink, self.arrow_schema, options=self.ipc_options)
+        if self.write_queue_size > 0:
+            self._write_thread = BatchWriterThread(self._write_pending, self.write_queue_size)
+
+    def _open_resumed(self, output_size: int):
+        # Cắt file về đúng vị trí lúc checkpoint (bỏ các batch ghi sau checkpoint) rồi ghi tiếp
+        with open(self.output_arrow_path, 'r+b') as f:
+            f.truncate(output_size)
+        last_batch = None
+        if self.batches_written:
+            with pa.OSFile(self.output_arrow_path, 'rb') as f:
+                for last_batch in ipc.open_stream(f):
+                    pass
+        sink = _ResumeSink(open(self.output_arrow_path, 'ab'), discard=last_batch is not None)
+        self._sink = pa.PythonFile(sink, mode='w')
+        self._writer = ipc.new_stream(self._sink, self.arrow_schema, options=self.ipc_options)
+        if last_batch is not None:
+            # Writer mới ghi lại schema + batch cuối vào sink bỏ đi: writer nhớ các dictionary đã ghi
+            # giống hệt lúc chưa dừng, nên các batch tiếp theo được ghi y như lần chạy liền mạch
+            self._writer.write_batch(last_batch)
+            sink.discard = False
+
+    def emit(self, *values):
+        """Ghi 1 dòng (theo thứ tự cột của schema) vào batch."""
+        if self.recording:
+            self.batch.append(*values)
+
+    def _write_pending(self, pending):
+        t0 = perf_counter()
+        self._writer.write_batch(self.batch.build(pending))
+        self.write_seconds += perf_counter() - t0
+
+    def flush(self):
+        t0 = perf_counter()
+        if self._write_thread is not None:
+            self._write_thread.put(self.batch.take())
+        else:
+            self._write_pending(self.batch.take())
+        self.batches_written += 1
+        self.blocked_seconds += perf_counter() - t0
+
+    def _join_writes(self):
+        if self._write_thread is not None:
+            t0 = perf_counter()
+            self._write_thread.join()
+            self.blocked_seconds += perf_counter() - t0
+
+    def _stop_write_thread(self, discard: bool = False):
+        write_thread, self._write_thread = self._write_thread, None
+        if write_thread is not None:
+            t0 = perf_counter()
+            write_thread.close(discard)
+            self.blocked_seconds += perf_counter() - t0
+
+    def checkpoint_state(self) -> dict:
+        # Đợi thread ghi ghi hết các batch đã đẩy vào: vị trí file khớp với batches_written
+        self._join_writes()
+        self._sink.flush()
+        state = super().checkpoint_state()
+        state.update(batch=self.batch, batches_written=self.batches_written, output_size=self._sink.tell())
+        return state
+
+    def restore_checkpoint(self, state: dict):
+        state = dict(state)
+        self._resume_output_size = state.pop("output_size")
+        super().restore_checkpoint(state)
+
+    def close(self):
+        if len(self.batch):
+            self.flush()
+        self._stop_write_thread()
+        self._writer.close()
+        self._sink.close()
+        print(f"--- Đã hoàn thành Streaming ra file Arrow IPC: {self.output_arrow_path} ---")
+
+    def abort(self):
+        self._stop_write_thread(discard=True)
+        if self._writer is not None:
+            self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+
+class _ResumeSink:
+    """File-like cho pa.PythonFile: discard=True thì bỏ qua dữ liệu được ghi (dùng khi mồi writer lúc resume)."""
+    def __init__(self, f, discard: bool):
+        self._f = f
+        self.discard = discard
+
+    @property
+    def closed(self) -> bool:
+        return self._f.closed
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if not self.discard:
+            self._f.write(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._f.tell()
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+def find_shard_offsets(events_path: str, shard_size: int, begin: int = 0, end: int | None = None) -> list[tuple[int, int]]:
+    """
+    Cắt file events (hoặc đoạn [begin, end) của file) thành các khoảng byte [start, end),
+    mỗi khoảng bắt đầu đúng tại 1 thẻ `<event `. Khoảng cuối cùng dừng trước `</events>`.
+    """
+    return find_tag_offsets(events_path, shard_size, EVENT_TAG, EVENTS_END_TAG, begin, end)
+
+
+def iter_stream_shards(stream, shard_size: int):
+    """Bản dùng cho file nén (không seek được): các khối bytes bắt đầu tại `<event `, khối cuối dừng trước `</events>`."""
+    return iter_stream_tag_chunks(stream, shard_size, EVENT_TAG, EVENTS_END_TAG)
+
+
+def parse_shard(events_path: str, start: int, end: int, event_types: frozenset, parser: str = "lxml") -> list[tuple[str, dict]]:
+    """
+    Phase 1 (chạy trong process con): parse 1 shard, chỉ giữ lại các event có type được đăng ký.
+    Trả về list (type, attrs) theo đúng thứ tự trong file.
+    """
+    with open(events_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return parse_shard_data(data, event_types, parser)
+
+
+class EventsEngine:
+    """
+    Đọc output_events.xml đúng 1 lần và gửi từng event tới các handler đã đăng ký.
+    - workers > 1: parse song song theo shard (byte range) trên nhiều process,
+      sau đó các event được đưa lại vào handler theo đúng thứ tự file,
+      nên state của từng entity (person_trip_map, bus_trips, ...) được nối liền qua ranh giới shard.
+    - parser: backend đọc XML ("lxml" | "expat" | "line"), xem src/events/parsers.py
+    - events_path có thể là .xml, .xml.gz hoặc .xml.zst (giải nén trên thread riêng, xem src/utils/compressed_input.py),
+      hoặc thư mục event lake Parquet (src/events/event_lake.py): khi đó chỉ đọc partition + cột mà handler cần
+    - start_time / end_time (giây hoặc "HH:MM:SS"): chỉ lấy các bản ghi kết thúc trong [start_time, end_time].
+      Với file không nén, engine seek thẳng tới vị trí cần đọc nhờ time index (src/events/time_index.py) và dừng sớm.
+      Các event trong [start_time - lookback, start_time) được đưa vào handler để khởi tạo state đang mở
+      (chuyến đi đang dở, hành khách đang trên xe) nhưng không ghi ra bản ghi nào.
+    - checkpoint_path: đọc theo shard và sau mỗi checkpoint_interval giây ghi checkpoint (byte offset của shard kế tiếp,
+      state đang mở + batch chưa ghi của từng handler, số batch / số byte đã ghi ra file Arrow).
+      resume=True: tiếp tục từ checkpoint, output giống hệt (từng byte) lần chạy không bị dừng. Chỉ dùng cho file .xml không nén.
+    - follow=True: file events đang được MATSim ghi (src/events/follow.py). Cứ poll_interval giây đọc phần mới ghi thêm,
+      state của handler giữ nguyên giữa các lần đọc; on_poll(tail, seconds) được gọi sau khi handler xử lý xong phần mới
+      (seconds: thời gian parse + xử lý phần đó). Dừng khi gặp `</events>` hoặc không có byte mới trong idle_timeout giây.
+    """
+    def __init__(
+        self, events_path: str, handlers: list[EventHandler], workers: int = 1, shard_size: int = 64 * 1024 * 1024,
+        parser: str = "lxml", start_time=None, end_time=None, lookback: float = 3600,
+        checkpoint_path: str | None = None, checkpoint_interval: float = 300, resume: bool = False,
+        follow: bool = False, poll_interval: float = 1.0, idle_timeout: float | None = None, on_poll=None):
+        self.events_path = events_path
+        self.handlers = handlers
+        self.workers = workers
+        self.shard_size = shard_size
+        self.parser = parser
+        self.start_time = parse_time(start_time)
+        self.end_time = parse_time(end_time)
+        self.lookback = lookback
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.resume = resume
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.on_poll = on_poll
+        self._resume_offset = None
+        self._last_checkpoint = None
+        if checkpoint_path is not None and (is_event_lake(events_path) or is_compressed(events_path)):
+            print(f"--- Checkpoint chỉ dùng cho file .xml không nén, bỏ qua checkpoint: {events_path} ---")
+            self.checkpoint_path = None
+        if follow and checkpoint_path is not None:
+            print(f"--- Chế độ follow không hỗ trợ checkpoint, bỏ qua checkpoint: {events_path} ---")
+            self.checkpoint_path = None
+        if self.checkpoint_path is not None and not all(handler.supports_checkpoint for handler in handlers):
+            print(f"--- Có handler không hỗ trợ checkpoint, bỏ qua checkpoint: {events_path} ---")
+            self.checkpoint_path = None
+
+    def _build_dispatch(self) -> dict[str, list[EventHandler]]:
+        dispatch: dict[str, list[EventHandler]] = {}
+        for handler in self.handlers:
+            for e_type in handler.event_types:
+                dispatch.setdefault(e_type, []).append(handler)
+        return dispatch
+
+    def _has_time_window(self) -> bool:
+        return self.start_time is not None or self.end_time is not None
+
+    def run(self):
+        dispatch = self._build_dispatch()
+        event_types = frozenset(dispatch)
+        checkpoint = self._load_checkpoint() if self.resume and self.checkpoint_path is not None else None
+        self._resume_offset = checkpoint["offset"] if checkpoint is not None else None
+        for i, handler in enumerate(self.handlers):
+            handler.recording = self.start_time is None
+            if checkpoint is not None:
+                handler.restore_checkpoint(checkpoint["handlers"][i])
+            handler.open()
+
+        try:
+            if self.follow:
+                events = self._iter_follow(event_types)
+            elif self.checkpoint_path is not None:
+                events = self._iter_checkpointed(event_types)
+            elif is_event_lake(self.events_path):
+                events = self._iter_lake(event_types)
+            elif self.workers > 1:
+                events = self._iter_parallel(event_types)
+            else:
+                events = self._iter_sequential(event_types)
+            if self._has_time_window():
+                events = self._time_window(events)
+            for e_type, attrs in events:
+                for handler in dispatch[e_type]:
+                    handler.handle_event(e_type, attrs)
+        except BaseException:
+            for handler in self.handlers:
+                handler.abort()
+            raise
+
+        for handler in self.handlers:
+            handler.close()
+        if self.checkpoint_path is not None and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def _checkpoint_key(self) -> dict:
+        """Những gì phải giống nhau giữa lần chạy ghi checkpoint và lần resume."""
+        stat = os.stat(self.events_path)
+        return {
+            "events_path": os.path.abspath(self.events_path),
+            "file_size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "lookback": self.lookback if self.start_time is not None else None,
+            "handlers": [(type(h).__name__, getattr(h, "output_arrow_path", None)) for h in self.handlers],
+        }
+
+    def _load_checkpoint(self) -> dict | None:
+        if not os.path.exists(self.checkpoint_path):
+            print(f"--- Không có checkpoint {self.checkpoint_path}, chạy từ đầu ---")
+            return None
+        with open(self.checkpoint_path, 'rb') as f:
+            checkpoint = pickle.load(f)
+        if checkpoint["key"] != self._checkpoint_key():
+            raise ValueError(
+                f"Checkpoint {self.checkpoint_path} không khớp với lần chạy hiện tại "
+                f"(file events / time window / danh sách handler đã thay đổi), xóa checkpoint để chạy lại từ đầu")
+        print(f"--- Tiếp tục từ checkpoint: byte {checkpoint['offset']:,} ---")
+        return checkpoint
+
+    def _save_checkpoint(self, offset: int):
+        # State của mọi handler nằm trong 1 lần pickle: object dùng chung (IdRegistry) vẫn dùng chung sau khi load
+        checkpoint = {
+            "key": self._checkpoint_key(),
+            "offset": offset,
+            "handlers": [handler.checkpoint_state() for handler in self.handlers],
+        }
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _byte_range(self) -> tuple[int, int | None]:
+        """Khoảng byte [begin, end) cần đọc theo time index (chỉ dùng khi có time window và file không nén)."""
+        if not self._has_time_window() or is_compressed(self.events_path):
+            return 0, None
+        index = load_time_index(self.events_path)
+        begin = offset_at_or_before(index, self.start_time - self.lookback) if self.start_time is not None else 0
+        end = offset_after(index, self.end_time) if self.end_time is not None else None
+        return begin, end
+
+    def _time_window(self, events):
+        start_time = self.start_time if self.start_time is not None else float("-inf")
+        warmup_start = start_time - self.lookback
+        end_time = self.end_time if self.end_time is not None else float("inf")
+        recording = self.start_time is None
+
+        for e_type, attrs in events:
+            time = float(attrs.get("time"))
+            if time > end_time:
+                return
+            if time < start_time:
+                if time < warmup_start:
+                    continue
+            elif not recording:
+                recording = True
+                for handler in self.handlers:
+                    handler.recording = True
+            yield e_type, attrs
+
+    def _columns_by_type(self) -> dict[str, set] | None:
+        columns: dict[str, set] = {}
+        for handler in self.handlers:
+            if handler.event_columns is None:
+                return None
+            for e_type, names in handler.event_columns.items():
+                columns.setdefault(e_type, set()).update(names)
+        return columns
+
+    def _iter_lake(self, event_types: frozenset):
+        min_time = self.start_time - self.lookback if self.start_time is not None else None
+        return iter_lake_events(self.events_path, event_types, self._columns_by_type(), min_time, self.end_time)
+
+    def _iter_sequential(self, event_types: frozenset):
+        parser = get_events_parser(self.parser)
+        begin, _ = self._byte_range()
+        with open_input(self.events_path) as f:
+            stream = f
+            if begin > 0:
+                # Bắt đầu giữa file (tại 1 thẻ `<event `): thêm thẻ gốc cho parser
+                f.seek(begin)
+                stream = prefixed_stream(b"<events>\n", f)
+            yield from parser.parse(stream, event_types)
+
+    def _iter_follow(self, event_types: frozenset):
+        # Mỗi vòng: đọc phần mới ghi thêm -> handler xử lý -> on_poll; không có gì mới thì chờ poll_interval giây
+        tail = EventsTail(self.events_path, event_types, self.parser)
+        last_data = monotonic()
+        while not tail.finished:
+            t0 = perf_counter()
+            offset = tail.offset
+            yield from tail.poll()
+            if self.on_poll is not None:
+                self.on_poll(tail, perf_counter() - t0)
+            if tail.offset != offset:
+                last_data = monotonic()
+                continue
+            if self.idle_timeout is not None and monotonic() - last_data >= self.idle_timeout:
+                print(f"--- Không có event mới trong {self.idle_timeout} s, dừng follow: {self.events_path} ---")
+                return
+            sleep(self.poll_interval)
+
+    def _iter_checkpointed(self, event_types: frozenset):
+        # Đọc theo shard: giữa 2 shard mọi event phía trước đã được handler xử lý -> điểm ghi checkpoint an toàn
+        begin, end = self._byte_range()
+        if self._resume_offset is not None:
+            begin = self._resume_offset
+        shards = find_shard_offsets(self.events_path, self.shard_size, begin, end)
+        if self.workers > 1:
+            tasks = ((parse_shard, self.events_path, start, stop, event_types, self.parser) for start, stop in shards)
+            results = self._iter_shard_results(tasks)
+        else:
+            results = (self._iter_shard(start, stop, event_types) for start, stop in shards)
+
+        self._last_checkpoint = monotonic()
+        for (_, stop), records in zip(shards, results):
+            yield from records
+            if monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+                self._save_checkpoint(stop)
+                self._last_checkpoint = monotonic()
+
+    def _iter_shard(self, start: int, stop: int, event_types: frozenset):
+        with open(self.events_path, 'rb') as f:
+            f.seek(start)
+            data = f.read(stop - start)
+        stream = io.BytesIO(b"<events>\n" + data + b"\n" + EVENTS_END_TAG)
+        yield from get_events_parser(self.parser).parse(stream, event_types)
+
+    def _iter_parallel(self, event_types: frozenset):
+        if is_compressed(self.events_path):
+            # File nén: process chính giải nén + cắt shard, process con nhận bytes
+            with open_input(self.events_path) as stream:
+                tasks = ((parse_shard_data, data, event_types, self.parser)
+                         for data in iter_stream_shards(stream, self.shard_size))
+                yield from self._iter_in_order(tasks)
+        else:
+            # File thường: process con tự đọc byte range của mình
+            begin, end = self._byte_range()
+            tasks = ((parse_shard, self.events_path, start, stop, event_types, self.parser)
+                     for start, stop in find_shard_offsets(self.events_path, self.shard_size, begin, end))
+            yield from self._iter_in_order(tasks)
+
+    def _iter_in_order(self, tasks):
+        for records in self._iter_shard_results(tasks):
+            yield from records
+
+    def _iter_shard_results(self, tasks):
+        # Phase 1: parse các shard song song (giới hạn số shard đang chờ để không giữ quá nhiều kết quả trong RAM)
+        # Phase 2: ghép kết quả theo thứ tự shard và chạy state machine của handler tuần tự
+        return iter_ordered_results(tasks, self.workers)
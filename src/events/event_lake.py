@@ -0,0 +1,225 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import heapq
+import json
+import os
+import shutil
+from itertools import repeat
+from operator import itemgetter
+from urllib.parse import quote
+
+from src.events.parsers import get_events_parser
+from src.utils.compressed_input import open_input
+
+LAKE_META_FILE = "_lake.json"
+HOUR_PARTITIONING = ds.partitioning(pa.schema([("hour", pa.int32())]), flavor="hive")
+
+# Thuộc tính số của event MATSim, lưu float64; các thuộc tính khác lưu string
+NUMERIC_ATTRS = frozenset({"time", "x", "y", "delay", "relativePosition", "distance", "amount"})
+
+
+def is_event_lake(path: str) -> bool:
+    return os.path.isfile(os.path.join(str(path), LAKE_META_FILE))
+
+
+def _type_dir(lake_dir: str, e_type: str) -> str:
+    return os.path.join(lake_dir, f"type={quote(e_type, safe='')}")
+
+
+class _TypeBuffer:
+    """Buffer theo cột cho 1 event type trong 1 giờ (thuộc tính thiếu ở 1 event -> None)."""
+    def __init__(self):
+        self.seq = []
+        self.columns: dict[str, list] = {}
+
+    def append(self, seq: int, attrs):
+        n = len(self.seq)
+        self.seq.append(seq)
+        columns = self.columns
+        for key, value in attrs.items():
+            if key == "type":
+                continue
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = [None] * n
+            column.append(value)
+        if len(columns) != len(attrs) - 1:
+            for column in columns.values():
+                if len(column) == n:
+                    column.append(None)
+
+    def to_table(self) -> pa.Table:
+        arrays = {"seq": pa.array(self.seq, pa.int64())}
+        for key, values in self.columns.items():
+            column = pa.array(values, pa.string())
+            arrays[key] = pc.cast(column, pa.float64()) if key in NUMERIC_ATTRS else column
+        return pa.table(arrays)
+
+
+def convert_events_to_parquet(events_path: str, lake_dir: str, parser: str = "lxml", batch_size: int = 200000) -> dict:
+    """
+    Đọc output_events.xml (.xml / .gz / .zst) đúng 1 lần và ghi thành Parquet dataset:
+        lake_dir/type=<event type>/hour=<giờ>/part-xxxxx.parquet
+    - Mỗi event type có cột riêng theo thuộc tính của nó (số -> float64, còn lại -> string)
+    - Cột seq: thứ tự event trong file gốc, dùng để ghép lại các type theo đúng thứ tự
+    - lake_dir/_lake.json: schema của từng type + thông tin file nguồn
+    """
+    if os.path.exists(lake_dir):
+        shutil.rmtree(lake_dir)
+    os.makedirs(lake_dir)
+
+    buffers: dict[str, _TypeBuffer] = {}
+    part_counts: dict[tuple[str, int], int] = {}
+    schemas: dict[str, dict[str, str]] = {}
+
+    def flush(e_type: str, hour: int):
+        table = buffers.pop(e_type).to_table()
+        fields = schemas.setdefault(e_type, {})
+        for field in table.schema:
+            fields.setdefault(field.name, str(field.type))
+        part = part_counts.get((e_type, hour), 0)
+        part_counts[(e_type, hour)] = part + 1
+        folder = os.path.join(_type_dir(lake_dir, e_type), f"hour={hour}")
+        os.makedirs(folder, exist_ok=True)
+        pq.write_table(table, os.path.join(folder, f"part-{part:05d}.parquet"))
+
+    seq = 0
+    current_hour = None
+    with open_input(events_path) as f:
+        for e_type, attrs in get_events_parser(parser).parse(f, None):
+            hour = int(float(attrs.get("time")) // 3600)
+            if hour != current_hour:
+                # File events sắp xếp theo time: sang giờ mới thì ghi hết buffer của giờ cũ
+                for buffered_type in list(buffers):
+                    flush(buffered_type, current_hour)
+                current_hour = hour
+            buffer = buffers.get(e_type)
+            if buffer is None:
+                buffer = buffers[e_type] = _TypeBuffer()
+            buffer.append(seq, attrs)
+            if len(buffer.seq) >= batch_size:
+                flush(e_type, hour)
+            seq += 1
+    for buffered_type in list(buffers):
+        flush(buffered_type, current_hour)
+
+    stat = os.stat(events_path)
+    meta = {
+        "source": str(events_path),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "num_events": seq,
+        "types": schemas,
+    }
+    with open(os.path.join(lake_dir, LAKE_META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    print(f"--- Đã chuyển {seq:,} events ({len(schemas)} type) sang Parquet: {lake_dir} ---")
+    return meta
+
+
+def ensure_event_lake(events_path: str, lake_dir: str, parser: str = "lxml") -> str:
+    """Tạo event lake nếu chưa có hoặc file events nguồn đã thay đổi (size / mtime), trả về lake_dir."""
+    if is_event_lake(lake_dir):
+        with open(os.path.join(lake_dir, LAKE_META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        stat = os.stat(events_path)
+        if meta["source_size"] == stat.st_size and meta["source_mtime_ns"] == stat.st_mtime_ns:
+            return lake_dir
+    convert_events_to_parquet(events_path, lake_dir, parser=parser)
+    return lake_dir
+
+
+def _type_dataset(lake_dir: str, e_type: str, fields: dict[str, str]) -> ds.Dataset:
+    schema = pa.schema([(name, pa.type_for_alias(type_name)) for name, type_name in fields.items()] + [("hour", pa.int32())])
+    return ds.dataset(_type_dir(lake_dir, e_type), format="parquet", partitioning=HOUR_PARTITIONING, schema=schema)
+
+
+def _type_hours(lake_dir: str, e_type: str) -> list[int]:
+    return [int(name.split("=", 1)[1]) for name in os.listdir(_type_dir(lake_dir, e_type)) if name.startswith("hour=")]
+
+
+def iter_lake_events(lake_dir: str, event_types: frozenset, columns_by_type: dict[str, set] | None = None,
+                     min_time: float | None = None, max_time: float | None = None):
+    """
+    Đọc lại event lake theo đúng thứ tự file gốc, trả về (type, attrs) như các parser XML.
+    - Chỉ đọc partition của các type trong event_types và các giờ giao với [min_time, max_time]
+    - columns_by_type[type]: các thuộc tính cần đọc (None: đọc mọi cột); time luôn được đọc
+    """
+    with open(os.path.join(lake_dir, LAKE_META_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    datasets = {}
+    columns = {}
+    hours = set()
+    for e_type in event_types:
+        fields = meta["types"].get(e_type)
+        if fields is None:
+            continue
+        datasets[e_type] = _type_dataset(lake_dir, e_type, fields)
+        wanted = None if columns_by_type is None else columns_by_type.get(e_type)
+        columns[e_type] = [name for name in fields if wanted is None or name == "seq" or name == "time" or name in wanted]
+        hours.update(_type_hours(lake_dir, e_type))
+
+    min_hour = int(min_time // 3600) if min_time is not None else None
+    max_hour = int(max_time // 3600) if max_time is not None else None
+    for hour in sorted(hours):
+        if (min_hour is not None and hour < min_hour) or (max_hour is not None and hour > max_hour):
+            continue
+        streams = []
+        for e_type, dataset in datasets.items():
+            table = dataset.to_table(columns=columns[e_type], filter=ds.field("hour") == hour)
+            if table.num_rows == 0:
+                continue
+            table = table.sort_by("seq")
+            streams.append(zip(table["seq"].to_pylist(), repeat(e_type), table.drop_columns(["seq"]).to_pylist()))
+        for _, e_type, attrs in heapq.merge(*streams, key=itemgetter(0)):
+            yield e_type, attrs
+
+
+if __name__ == "__main__":
+    # Chuyển events sang Parquet 1 lần, sau đó so sánh 5 extractor đọc từ XML vs đọc từ event lake
+    import filecmp
+    import tempfile
+    import time
+    from src.data.load_config import load_config
+    from src.data.scenario_inputs import ScenarioInputs
+    from src.events.extract_all import generate_all_events_df
+
+    path = load_config(r"config/config_path.yaml")
+    param = load_config(r"config/config_param.yaml")
+    events = path.paths.events
+
+    inputs = ScenarioInputs.from_config(path, param)
+    links_dict, zone_gen, veh_type_dict = inputs.links_dict, inputs.zone_generator, inputs.vehtype_dict
+
+    names = ["bus_delay.arrow", "person_enter_bus.arrow", "travel_time.arrow", "people_trip.arrow", "bus_trip.arrow"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        lake_dir = os.path.join(tmp_dir, "events_lake")
+        t0 = time.perf_counter()
+        convert_events_to_parquet(events, lake_dir, parser=param.events.parser)
+        t_convert = time.perf_counter() - t0
+
+        timings = {}
+        outputs = {}
+        for label, source in (("xml", events), ("lake", lake_dir)):
+            outputs[label] = [os.path.join(tmp_dir, f"{label}_{n}") for n in names]
+            t0 = time.perf_counter()
+            generate_all_events_df(
+                events_path=source, vehtype_dict=veh_type_dict, links_dict=links_dict, zone_finder=zone_gen,
+                bus_hint_str=param.bus_route_hint_str, bus_delay_arrow_path=outputs[label][0],
+                person_enter_bus_arrow_path=outputs[label][1], travel_time_arrow_path=outputs[label][2],
+                people_trip_arrow_path=outputs[label][3], bus_trip_arrow_path=outputs[label][4], parser=param.events.parser)
+            timings[label] = time.perf_counter() - t0
+
+        lake_size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(lake_dir) for f in files)
+        print("-" * 50)
+        print(f"[*] Chuyển sang Parquet (1 lần): {t_convert:.2f} s - {os.path.getsize(events) / 1e6:.1f} MB XML -> {lake_size / 1e6:.1f} MB Parquet")
+        print(f"[*] 5 extractor đọc XML:        {timings['xml']:.2f} s")
+        print(f"[*] 5 extractor đọc event lake: {timings['lake']:.2f} s")
+        for n, a, b in zip(names, outputs["xml"], outputs["lake"]):
+            print(f"    - {n}: {'giống hệt' if filecmp.cmp(a, b, shallow=False) else 'KHÁC NHAU!'}")
+
+    # python -m src.events.event_lake
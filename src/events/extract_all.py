@@ -0,0 +1,216 @@
+from src.domain.id_registry import IdRegistry
+from src.transit.transit_vehicle import TransitVehicleClasses
+from src.events.engine import EventsEngine
+from src.events.bus_delay import BusDelayHandler
+from src.events.person_enter_bus import PersonEnterBusHandler
+from src.events.travel_time import TravelTimeVehicleHandler
+from src.events.person_trip import PersonTripHandler
+from src.events.bus_trip import BusTripHandler
+from src.events.event_lake import ensure_event_lake
+from src.events.manifest import build_manifest, cached_source_fingerprints, code_version, is_fresh, refresh_manifest, remove_manifest, write_manifest
+from src.events.time_index import parse_time
+
+
+def generate_all_events_df(
+    events_path: str, vehtype_dict: dict, links_dict: dict, zone_finder, bus_hint_str: str,
+    bus_delay_arrow_path: str, person_enter_bus_arrow_path: str, travel_time_arrow_path: str,
+    people_trip_arrow_path: str, bus_trip_arrow_path: str, prefix_pt_driver="pt", batch_size=50000, workers: int = 1,
+    parser: str = "lxml", start_time=None, end_time=None, lookback=3600,
+    checkpoint_path: str | None = None, checkpoint_interval: float = 300, resume: bool = False,
+    open_trip_memory_mb: float | None = None, id_registry: IdRegistry | None = None,
+    vehicle_classes: TransitVehicleClasses | None = None, write_queue_size: int = 4, compression: str | None = None):
+    """
+    Chạy cả 5 extractor trong 1 lần đọc output_events.xml.
+    Output giống hệt (từng byte) việc gọi riêng lẻ 5 hàm generate_*_df (với cùng id_registry).
+    - *_arrow_path = None: bỏ qua extractor đó.
+    - workers > 1: parse song song theo shard, kết quả vẫn giống hệt khi chạy tuần tự.
+    - parser: backend đọc XML ("lxml" | "expat" | "line"), kết quả giống nhau với mọi backend.
+    - start_time / end_time: chỉ trích xuất trong time window, state đang mở được khởi tạo bằng lookback giây trước đó.
+    - checkpoint_path: ghi checkpoint định kỳ (mỗi checkpoint_interval giây), resume=True: chạy tiếp từ checkpoint.
+    - open_trip_memory_mb: trần RAM cho state chuyến đi đang mở của travel_time / people_trip (None: không giới hạn),
+      vượt trần thì các chuyến đi mở lâu nhất được spill ra đĩa.
+    - id_registry: bảng mã ID dùng chung (src/domain/id_registry.py), cột ID trong file .arrow là mã của registry.
+      None: tạo registry rỗng, ID được cấp mã theo thứ tự gặp trong events.
+    - vehicle_classes: phân loại xe (bus / PT khác) tính sẵn 1 lần cho scenario, dùng chung cho các extractor
+      (None: tạo từ vehtype_dict + bus_hint_str, xe được cấp mã vehicle trong id_registry).
+    - write_queue_size: số batch tối đa chờ thread ghi của mỗi extractor (backpressure), 0: ghi ngay trên thread parse.
+    - compression: nén IPC các file .arrow ("lz4" | "zstd" | None), nén trên thread ghi.
+    """
+    if id_registry is None:
+        id_registry = IdRegistry()
+    if vehicle_classes is None:
+        vehicle_classes = TransitVehicleClasses(vehtype_dict, bus_hint_str, id_registry.vehicle)
+    handlers = []
+    if bus_delay_arrow_path is not None:
+        handlers.append(BusDelayHandler(
+            vehtype_dict=vehtype_dict, bus_hint_str=bus_hint_str, output_arrow_path=bus_delay_arrow_path,
+            prefix_pt_driver=prefix_pt_driver, batch_size=batch_size, id_registry=id_registry,
+            vehicle_classes=vehicle_classes, write_queue_size=write_queue_size, compression=compression))
+    if person_enter_bus_arrow_path is not None:
+        handlers.append(PersonEnterBusHandler(
+            vehtype_dict=vehtype_dict, bus_hint_str=bus_hint_str, output_arrow_path=person_enter_bus_arrow_path,
+            prefix_pt_driver=prefix_pt_driver, batch_size=batch_size, id_registry=id_registry,
+            vehicle_classes=vehicle_classes, write_queue_size=write_queue_size, compression=compression))
+    if travel_time_arrow_path is not None:
+        handlers.append(TravelTimeVehicleHandler(
+            vehtype_dict=vehtype_dict, bus_hint_str=bus_hint_str, output_arrow_path=travel_time_arrow_path,
+            prefix_pt_driver=prefix_pt_driver, batch_size=batch_size, open_trip_memory_mb=open_trip_memory_mb,
+            id_registry=id_registry, write_queue_size=write_queue_size, compression=compression))
+    if people_trip_arrow_path is not None:
+        handlers.append(PersonTripHandler(
+            vehtype_dict=vehtype_dict, zone_finder=zone_finder, bus_hint_str=bus_hint_str,
+            output_arrow_path=people_trip_arrow_path, prefix_pt_driver=prefix_pt_driver, batch_size=batch_size,
+            open_trip_memory_mb=open_trip_memory_mb, id_registry=id_registry,
+            write_queue_size=write_queue_size, compression=compression))
+    if bus_trip_arrow_path is not None:
+        handlers.append(BusTripHandler(
+            links_dict=links_dict, vehtype_dict=vehtype_dict, bus_hint_str=bus_hint_str,
+            output_arrow_path=bus_trip_arrow_path, batch_size=batch_size, id_registry=id_registry,
+            vehicle_classes=vehicle_classes, write_queue_size=write_queue_size, compression=compression))
+    if not handlers:
+        return
+    EventsEngine(
+        events_path, handlers, workers=workers, parser=parser,
+        start_time=start_time, end_time=end_time, lookback=lookback,
+        checkpoint_path=checkpoint_path, checkpoint_interval=checkpoint_interval, resume=resume).run()
+
+
+def generate_stale_events_df(
+    events_path: str, vehicle_path: str, network_path: str,
+    vehtype_dict: dict, links_dict: dict, zone_finder, bus_hint_str: str,
+    bus_delay_arrow_path: str, person_enter_bus_arrow_path: str, travel_time_arrow_path: str,
+    people_trip_arrow_path: str, bus_trip_arrow_path: str, prefix_pt_driver="pt", batch_size=50000, workers: int = 1,
+    parser: str = "lxml", start_time=None, end_time=None, lookback=3600, lake_dir: str | None = None,
+    force: bool = False, checkpoint_path: str | None = None, checkpoint_interval: float = 300,
+    resume: bool = False, open_trip_memory_mb: float | None = None, id_registry: IdRegistry | None = None,
+    vehicle_classes: TransitVehicleClasses | None = None, write_queue_size: int = 4,
+    compression: str | None = None) -> list[str]:
+    """
+    Như generate_all_events_df nhưng chỉ tạo lại các artifact đã cũ.
+    Mỗi file .arrow có manifest `<file>.arrow.manifest.json` ghi size + sha256 của các file input
+    (events, transitVehicles, network cho bus_trip), tham số zone grid (people_trip), tham số extractor
+    và hash code extractor. Manifest khớp -> bỏ qua; artifact cũ được tạo lại chung 1 lần đọc events.
+    workers / parser / batch_size / open_trip_memory_mb / write_queue_size / compression không ảnh hưởng nội dung output
+    nên không nằm trong manifest.
+    - lake_dir: đọc qua event lake (chỉ tạo / cập nhật lake khi có artifact cần tạo lại).
+    - force: bỏ qua manifest, tạo lại tất cả.
+    - checkpoint_path / checkpoint_interval / resume / open_trip_memory_mb / id_registry / vehicle_classes /
+      write_queue_size / compression: xem generate_all_events_df.
+      Mã trong registry chỉ đổi cách lưu, không đổi giá trị (chuỗi) của cột ID nên cũng không nằm trong manifest.
+    Trả về tên các artifact đã tạo lại.
+    """
+    params = {
+        "bus_hint_str": bus_hint_str, "prefix_pt_driver": prefix_pt_driver,
+        "start_time": parse_time(start_time), "end_time": parse_time(end_time),
+        "lookback": float(lookback) if start_time is not None else None,
+    }
+    artifacts = {
+        "bus_delay": (bus_delay_arrow_path, BusDelayHandler, ("events", "transit_vehicle"), params),
+        "person_enter_bus": (person_enter_bus_arrow_path, PersonEnterBusHandler, ("events", "transit_vehicle"), params),
+        "travel_time": (travel_time_arrow_path, TravelTimeVehicleHandler, ("events", "transit_vehicle"), params),
+        "people_trip": (people_trip_arrow_path, PersonTripHandler, ("events", "transit_vehicle"),
+                        dict(params, zone_grid=zone_finder.grid_params())),
+        "bus_trip": (bus_trip_arrow_path, BusTripHandler, ("events", "transit_vehicle", "network"), params),
+    }
+    sources = cached_source_fingerprints(
+        {"events": events_path, "transit_vehicle": vehicle_path, "network": network_path},
+        [artifact_path for artifact_path, *_ in artifacts.values()])
+
+    expected = {}
+    for name, (artifact_path, handler_cls, source_names, artifact_params) in artifacts.items():
+        code = (handler_cls, type(zone_finder)) if name == "people_trip" else (handler_cls,)
+        expected[name] = build_manifest({s: sources[s] for s in source_names}, artifact_params, code_version(*code))
+
+    stale = [name for name in artifacts if force or not is_fresh(artifacts[name][0], expected[name])]
+    for name in artifacts:
+        if name not in stale:
+            refresh_manifest(artifacts[name][0], expected[name])
+            print(f"--- Bỏ qua {name}: manifest khớp ({artifacts[name][0]}) ---")
+    if not stale:
+        return stale
+
+    print(f"--- Trích xuất lại: {', '.join(stale)} ---")
+    for name in stale:
+        remove_manifest(artifacts[name][0])
+    events_source = ensure_event_lake(events_path, lake_dir, parser=parser) if lake_dir else events_path
+    output = {name: (artifacts[name][0] if name in stale else None) for name in artifacts}
+    generate_all_events_df(
+        events_path=events_source, vehtype_dict=vehtype_dict, links_dict=links_dict, zone_finder=zone_finder,
+        bus_hint_str=bus_hint_str, bus_delay_arrow_path=output["bus_delay"],
+        person_enter_bus_arrow_path=output["person_enter_bus"], travel_time_arrow_path=output["travel_time"],
+        people_trip_arrow_path=output["people_trip"], bus_trip_arrow_path=output["bus_trip"],
+        prefix_pt_driver=prefix_pt_driver, batch_size=batch_size, workers=workers, parser=parser,
+        start_time=start_time, end_time=end_time, lookback=lookback,
+        checkpoint_path=checkpoint_path, checkpoint_interval=checkpoint_interval, resume=resume,
+        open_trip_memory_mb=open_trip_memory_mb, id_registry=id_registry, vehicle_classes=vehicle_classes,
+        write_queue_size=write_queue_size, compression=compression)
+    for name in stale:
+        write_manifest(artifacts[name][0], expected[name])
+    return stale
+
+
+if __name__ == "__main__":
+    # Benchmark: 5 lần iterparse riêng lẻ vs 1 lần đọc multiplexed
+    import filecmp
+    import os
+    import tempfile
+    import time
+    from src.data.load_config import load_config
+    from src.data.scenario_inputs import ScenarioInputs
+    from src.domain.id_registry import build_id_registry
+    from src.events.bus_delay import generate_busDelayAtFacilities_df
+    from src.events.person_enter_bus import generate_personEnterBus_df
+    from src.events.travel_time import generate_travelTimeVehicle_df
+    from src.events.person_trip import generate_personTrip_df
+    from src.events.bus_trip import generate_busTrip_df
+
+    path = load_config(r"config/config_path.yaml")
+    param = load_config(r"config/config_param.yaml")
+    bus_hint = param.bus_route_hint_str
+    events = path.paths.events
+
+    inputs = ScenarioInputs.from_config(path, param)
+    links_dict, zone_gen, veh_type_dict = inputs.links_dict, inputs.zone_generator, inputs.vehtype_dict
+    registry = build_id_registry(links_dict, veh_type_dict, inputs.bus_stops_dict, inputs.people_dict, inputs.zones_list)
+    vehicle_classes = TransitVehicleClasses(veh_type_dict, bus_hint, registry.vehicle)
+
+    names = ["bus_delay.arrow", "person_enter_bus.arrow", "travel_time.arrow", "people_trip.arrow", "bus_trip.arrow"]
+    with tempfile.TemporaryDirectory() as separate_dir, tempfile.TemporaryDirectory() as single_dir:
+        sep = [os.path.join(separate_dir, n) for n in names]
+        one = [os.path.join(single_dir, n) for n in names]
+
+        t0 = time.perf_counter()
+        generate_busDelayAtFacilities_df(events_path=events, vehtype_dict=veh_type_dict, bus_hint_str=bus_hint, output_arrow_path=sep[0], id_registry=registry, vehicle_classes=vehicle_classes)
+        generate_personEnterBus_df(events_path=events, vehtype_dict=veh_type_dict, bus_hint_str=bus_hint, output_arrow_path=sep[1], id_registry=registry, vehicle_classes=vehicle_classes)
+        generate_travelTimeVehicle_df(events_path=events, vehtype_dict=veh_type_dict, bus_hint_str=bus_hint, output_arrow_path=sep[2], id_registry=registry)
+        generate_personTrip_df(events_path=events, vehtype_dict=veh_type_dict, zone_finder=zone_gen, bus_hint_str=bus_hint, output_arrow_path=sep[3], id_registry=registry)
+        generate_busTrip_df(events_path=events, links_dict=links_dict, vehtype_dict=veh_type_dict, bus_hint_str=bus_hint, output_arrow_path=sep[4], id_registry=registry, vehicle_classes=vehicle_classes)
+        t_separate = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        generate_all_events_df(
+            events_path=events, vehtype_dict=veh_type_dict, links_dict=links_dict, zone_finder=zone_gen, bus_hint_str=bus_hint,
+            bus_delay_arrow_path=one[0], person_enter_bus_arrow_path=one[1], travel_time_arrow_path=one[2],
+            people_trip_arrow_path=one[3], bus_trip_arrow_path=one[4], id_registry=registry,
+            vehicle_classes=vehicle_classes)
+        t_single = time.perf_counter() - t0
+
+        workers = os.cpu_count() or 1
+        par = [os.path.join(single_dir, "parallel_" + n) for n in names]
+        t0 = time.perf_counter()
+        generate_all_events_df(
+            events_path=events, vehtype_dict=veh_type_dict, links_dict=links_dict, zone_finder=zone_gen, bus_hint_str=bus_hint,
+            bus_delay_arrow_path=par[0], person_enter_bus_arrow_path=par[1], travel_time_arrow_path=par[2],
+            people_trip_arrow_path=par[3], bus_trip_arrow_path=par[4], workers=workers, id_registry=registry,
+            vehicle_classes=vehicle_classes)
+        t_parallel = time.perf_counter() - t0
+
+        print("-" * 50)
+        print(f"[*] 5 lần đọc riêng lẻ: {t_separate:.2f} s")
+        print(f"[*] 1 lần đọc (engine): {t_single:.2f} s - speedup x{t_separate / t_single:.2f}")
+        print(f"[*] 1 lần đọc, {workers} process: {t_parallel:.2f} s - speedup x{t_separate / t_parallel:.2f}")
+        for n, a, b, c in zip(names, sep, one, par):
+            status = "giống hệt" if filecmp.cmp(a, b, shallow=False) and filecmp.cmp(a, c, shallow=False) else "KHÁC NHAU!"
+            print(f"    - {n}: {status}")
+
+    # python -m src.events.extract_all
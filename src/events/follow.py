@@ -0,0 +1,116 @@
+import os
+
+from src.events.parsers import EVENT_TAG, EVENTS_END_TAG, parse_shard_data
+from src.utils.compressed_input import is_compressed
+
+
+class EventsTail:
+    """
+    Đọc dần file events mà MATSim đang ghi (file .xml không nén, chưa có `</events>`).
+    Mỗi lần poll() chỉ đọc phần byte mới được ghi thêm kể từ lần trước, tới hết dòng đầy đủ cuối cùng
+    (MATSim ghi mỗi event trên 1 dòng); dòng đang ghi dở được đọc lại ở lần poll sau.
+    Phần đọc được bọc lại bằng thẻ gốc `<events>` như 1 shard (parse_shard_data), nên thẻ gốc chưa đóng không sao.
+    Gặp `</events>`: finished = True, các lần poll sau không đọc gì nữa.
+    """
+    def __init__(self, events_path: str, event_types: frozenset, parser: str = "lxml"):
+        if is_compressed(events_path):
+            raise ValueError(f"Chế độ follow chỉ dùng cho file .xml không nén: {events_path}")
+        self.events_path = events_path
+        self.event_types = event_types
+        self.parser = parser
+        # Vị trí byte đầu tiên chưa đọc, None: chưa thấy event đầu tiên (còn đang ở phần header)
+        self.offset = None
+        self.finished = False
+        self.bytes_read = 0
+
+    def poll(self) -> list[tuple[str, dict]]:
+        """Các event (type, attrs) mới được ghi thêm, theo đúng thứ tự trong file."""
+        if self.finished or not os.path.exists(self.events_path):
+            return []
+        begin = self.offset or 0
+        size = os.path.getsize(self.events_path)
+        if size < begin:
+            raise ValueError(f"File events bị ghi lại từ đầu trong lúc follow (nhỏ hơn {begin:,} byte đã đọc): {self.events_path}")
+        if size == begin:
+            return []
+        with open(self.events_path, 'rb') as f:
+            f.seek(begin)
+            data = f.read(size - begin)
+        self.bytes_read += len(data)
+
+        if self.offset is None:
+            start = data.find(EVENT_TAG)
+            if start == -1:
+                return []
+            begin += start
+            data = data[start:]
+        end = data.find(EVENTS_END_TAG)
+        if end != -1:
+            data = data[:end]
+            self.finished = True
+        else:
+            cut = data.rfind(b"\n") + 1
+            if cut == 0:
+                return []
+            data = data[:cut]
+        self.offset = begin + len(data)
+        return parse_shard_data(data, self.event_types, self.parser) if data.strip() else []
+
+
+if __name__ == "__main__":
+    # Benchmark: ghi dần file events (giả lập MATSim đang chạy) và follow song song;
+    # thời gian mỗi lần refresh tỉ lệ với số byte mới, không phải với kích thước file. KPI cuối so với chạy trên file đã xong.
+    import tempfile
+    import threading
+    import time
+    from src.data.load_config import load_config
+    from src.data.scenario_inputs import ScenarioInputs
+    from src.performance_measurement.live_kpi import calculate_live_kpis
+
+    path = load_config(r"config/config_path.yaml")
+    param = load_config(r"config/config_param.yaml")
+    bus_hint = param.bus_route_hint_str
+    inputs = ScenarioInputs.from_config(path, param)
+    links_dict, zone_gen, veh_type_dict = inputs.links_dict, inputs.zone_generator, inputs.vehtype_dict
+    kpi_args = (veh_type_dict, links_dict, zone_gen, bus_hint, param.otp.max_delay, param.otp.min_delay)
+
+    with open(path.paths.events, 'rb') as f:
+        content = f.read()
+    steps = 20
+    step_size = len(content) // steps + 1
+
+    refreshes = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        growing = os.path.join(tmp_dir, "output_events.xml")
+
+        def simulate():
+            with open(growing, 'wb') as out:
+                for i in range(0, len(content), step_size):
+                    out.write(content[i:i + step_size])
+                    out.flush()
+                    time.sleep(0.2)
+
+        writer = threading.Thread(target=simulate)
+        writer.start()
+        t0 = time.perf_counter()
+        followed = calculate_live_kpis(
+            growing, *kpi_args, follow=True, poll_interval=0.1, refresh_interval=0,
+            on_refresh=lambda kpis, tail, seconds: refreshes.append((tail.offset, seconds)), print_summary=False)
+        follow_elapsed = time.perf_counter() - t0
+        writer.join()
+
+    t0 = time.perf_counter()
+    final = calculate_live_kpis(path.paths.events, *kpi_args)
+    full_elapsed = time.perf_counter() - t0
+
+    print(f"[*] File events: {len(content) / 1e6:.1f} MB, ghi thành {steps} phần, {len(refreshes)} lần refresh")
+    print(f"{'đã đọc (MB)':>12}{'byte mới (MB)':>15}{'refresh (ms)':>14}")
+    previous = 0
+    for offset, seconds in refreshes:
+        print(f"{offset / 1e6:>12.2f}{(offset - previous) / 1e6:>15.2f}{seconds * 1000:>14.1f}")
+        previous = offset
+    print(f"[*] Tổng thời gian refresh: {sum(s for _, s in refreshes):.2f} s (follow {follow_elapsed:.2f} s bao gồm thời gian chờ ghi)")
+    print(f"[*] Chạy 1 lần trên file đã xong: {full_elapsed:.2f} s")
+    print(f"[*] KPI cuối khi follow so với chạy trên file đã xong: {'giống hệt' if followed == final else 'KHÁC NHAU!'}")
+
+    # python -m src.events.follow
@@ -0,0 +1,106 @@
+import hashlib
+import inspect
+import json
+import os
+
+from src.utils.fingerprint import file_fingerprint, same_content
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+# Code dùng chung cho mọi extractor: thay đổi 1 file trong đây thì mọi artifact đều cũ
+SHARED_CODE_MODULES = (
+    "src.events.engine", "src.events.parsers", "src.events.batch_builder", "src.events.schemas", "src.events.open_trips",
+    "src.events.arrow_writer", "src.events.follow", "src.domain.id_registry", "src.domain.logic", "src.transit.transit_vehicle")
+
+
+def manifest_path(artifact_path: str) -> str:
+    return str(artifact_path) + MANIFEST_SUFFIX
+
+
+def code_version(*objs) -> str:
+    """Hash nội dung file source của các class/module truyền vào + SHARED_CODE_MODULES."""
+    files = {inspect.getsourcefile(obj) for obj in objs}
+    files.update(inspect.getsourcefile(__import__(name, fromlist=["_"])) for name in SHARED_CODE_MODULES)
+    digest = hashlib.sha256()
+    for file in sorted(files):
+        with open(file, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def load_manifest(artifact_path: str) -> dict | None:
+    path = manifest_path(artifact_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_manifest(sources: dict[str, dict], params: dict, version: str) -> dict:
+    """
+    Manifest mong đợi của 1 artifact:
+    - sources: {tên input: fingerprint}
+    - params: tham số extractor (đã chuẩn hóa qua JSON để so sánh được với manifest đọc từ file)
+    - code_version: hash code extractor
+    """
+    return {
+        "sources": sources,
+        "params": json.loads(json.dumps(params)),
+        "code_version": version,
+    }
+
+
+def is_fresh(artifact_path: str, expected: dict) -> bool:
+    """Artifact còn dùng được: file còn nguyên (size + sha256 như lúc ghi) và inputs / params / code không đổi."""
+    manifest = load_manifest(artifact_path)
+    if manifest is None or not os.path.exists(artifact_path):
+        return False
+    output = manifest.get("output")
+    if not same_content(output, file_fingerprint(artifact_path, output)):
+        return False
+    if manifest.get("params") != expected["params"] or manifest.get("code_version") != expected["code_version"]:
+        return False
+    sources = manifest.get("sources", {})
+    return sources.keys() == expected["sources"].keys() and all(
+        same_content(sources[name], fingerprint) for name, fingerprint in expected["sources"].items())
+
+
+def write_manifest(artifact_path: str, expected: dict):
+    """Ghi manifest sau khi artifact đã được tạo xong (ghi ra file tạm rồi đổi tên)."""
+    _dump_manifest(artifact_path, dict(expected, output=file_fingerprint(artifact_path)))
+
+
+def _dump_manifest(artifact_path: str, manifest: dict):
+    path = manifest_path(artifact_path)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def refresh_manifest(artifact_path: str, expected: dict):
+    """
+    Artifact còn dùng được nhưng fingerprint trong manifest có mtime cũ (file bị touch / copy, nội dung không đổi):
+    ghi lại sources + output với mtime mới để các lần chạy sau không phải hash lại file events lớn.
+    """
+    manifest = load_manifest(artifact_path)
+    refreshed = dict(manifest, sources=expected["sources"], output=file_fingerprint(artifact_path, manifest.get("output")))
+    if refreshed != manifest:
+        _dump_manifest(artifact_path, refreshed)
+
+
+def remove_manifest(artifact_path: str):
+    if os.path.exists(manifest_path(artifact_path)):
+        os.remove(manifest_path(artifact_path))
+
+
+def cached_source_fingerprints(sources: dict[str, str], artifact_paths) -> dict[str, dict]:
+    """Fingerprint các file input, mỗi file hash tối đa 1 lần; lấy sha256 cũ trong các manifest hiện có nếu file chưa đổi."""
+    previous = {}
+    for artifact_path in artifact_paths:
+        manifest = load_manifest(artifact_path) or {}
+        for name, fingerprint in manifest.get("sources", {}).items():
+            previous.setdefault(name, fingerprint)
+    return {name: file_fingerprint(path, previous.get(name)) for name, path in sources.items()}
@@ -0,0 +1,383 @@
+import os
+import sqlite3
+import struct
+import tempfile
+from array import array
+
+import numpy as np
+
+from src.domain.id_registry import StringInterner
+
+
+NO_CODE = -1
+NO_LEG = -1
+NO_SLOT = -1
+NAN = float("nan")
+FREE_SEQ = 1 << 62
+
+
+class OpenTripStore:
+    """
+    State của các chuyến đi đang mở (thay cho person_trip_map = {personId: {...}}).
+    - person, mode, activity, zone, vehicle được intern thành int
+      (persons / code_interners: dùng chung bảng mã của IdRegistry, xem src/domain/id_registry.py)
+    - mỗi chuyến đi là 1 slot cố định: float_fields -> array('d'), code_fields -> array('i') (mã chuỗi, -1: chưa có)
+    - danh sách xe của chuyến đi: danh sách liên kết trong pool array('i') dùng chung, slot / leg trống được dùng lại
+    - person code -> slot: array('i') đánh theo mã person (không dùng dict cho từng chuyến đi)
+    - max_memory_mb: vượt ngưỡng thì các chuyến đi mở lâu nhất được ghi ra SQLite tạm trên đĩa (spill),
+      gặp lại event của người đó thì được đọc lại vào RAM
+    """
+    LEG_BYTES = 8           # leg_vehicle + leg_next
+    SLOT_BASE_BYTES = 24    # person + open_seq + leg_head + leg_tail + leg_count
+
+    def __init__(self, float_fields: tuple[str, ...], code_fields: tuple[str, ...],
+                 max_memory_mb: float | None = None, spill_dir: str | None = None,
+                 persons: StringInterner | None = None, code_interners: dict[str, StringInterner] | None = None):
+        self.float_fields = float_fields
+        self.code_fields = code_fields
+        self.max_memory_mb = max_memory_mb
+        self.spill_dir = spill_dir
+        self.persons = persons if persons is not None else StringInterner()
+        self.strings = StringInterner()
+        self.interners = {name: self.strings for name in code_fields}
+        self.interners.update(code_interners or {})
+        self.slot_bytes = self.SLOT_BASE_BYTES + 8 * len(float_fields) + 4 * len(code_fields)
+
+        self.floats = {name: array('d') for name in float_fields}
+        self.codes = {name: array('i') for name in code_fields}
+        self._float_columns = list(self.floats.values())
+        self._code_columns = list(self.codes.values())
+        self._slot_person = array('i')
+        self._open_seq = array('q')
+        self._leg_head = array('i')
+        self._leg_tail = array('i')
+        self._leg_count = array('i')
+        self._free_slots = []
+        self._leg_vehicle = array('i')
+        self._leg_next = array('i')
+        self._free_leg = NO_LEG
+        self._legs_in_use = 0
+
+        # Theo mã person: slot đang mở (-1: không có) + cờ đã spill ra đĩa
+        self._slot_of = array('i', [NO_SLOT]) * len(self.persons)
+        self._spilled = bytearray(len(self.persons))
+        self._num_in_memory = 0
+        self._num_spilled = 0
+        self._next_seq = 0
+        self._spill_path = None
+        self._spill_db = None
+        self.num_spilled_total = 0
+        self._pack = struct.Struct(f"<{len(float_fields)}d{len(code_fields)}i")
+
+    # ---------------------------------------------------------------- slots
+    def __len__(self) -> int:
+        return self._num_in_memory + self._num_spilled
+
+    def get(self, person_id: str) -> int | None:
+        """Slot của chuyến đi đang mở của person_id (đọc lại từ đĩa nếu đã spill), None nếu không có."""
+        code = self.persons.codes.get(person_id)
+        if code is None or code >= len(self._slot_of):
+            return None
+        slot = self._slot_of[code]
+        if slot != NO_SLOT:
+            return slot
+        if self._spilled[code]:
+            return self._load(code)
+        return None
+
+    def open(self, person_id: str) -> int:
+        """Mở chuyến đi mới cho person_id (chưa có chuyến đi đang mở), trả về slot với float = NaN, code = -1 (chưa có)."""
+        code = self.persons.codes.get(person_id)
+        if code is None:
+            code = self.persons.code(person_id)
+        if code >= len(self._slot_of):
+            # Mã person mới (cấp bởi store này hoặc bởi handler khác dùng chung bảng mã)
+            grow = code + 1 - len(self._slot_of)
+            self._slot_of.extend(array('i', [NO_SLOT]) * grow)
+            self._spilled.extend(bytes(grow))
+        slot = self._new_slot(code)
+        if self.max_memory_mb is not None:
+            self._check_memory()
+        return slot
+
+    def close(self, slot: int):
+        """Đóng chuyến đi: trả slot + các leg về pool."""
+        leg = self._leg_head[slot]
+        while leg != NO_LEG:
+            next_leg = self._leg_next[leg]
+            self._leg_next[leg] = self._free_leg
+            self._free_leg = leg
+            leg = next_leg
+        self._legs_in_use -= self._leg_count[slot]
+        self._slot_of[self._slot_person[slot]] = NO_SLOT
+        self._open_seq[slot] = FREE_SEQ
+        self._num_in_memory -= 1
+        self._free_slots.append(slot)
+
+    def _new_slot(self, person_code: int) -> int:
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._slot_person[slot] = person_code
+            self._open_seq[slot] = self._next_seq
+            self._leg_head[slot] = NO_LEG
+            self._leg_tail[slot] = NO_LEG
+            self._leg_count[slot] = 0
+            for column in self._float_columns:
+                column[slot] = NAN
+            for column in self._code_columns:
+                column[slot] = NO_CODE
+        else:
+            slot = len(self._slot_person)
+            self._slot_person.append(person_code)
+            self._open_seq.append(self._next_seq)
+            self._leg_head.append(NO_LEG)
+            self._leg_tail.append(NO_LEG)
+            self._leg_count.append(0)
+            for column in self._float_columns:
+                column.append(NAN)
+            for column in self._code_columns:
+                column.append(NO_CODE)
+        self._next_seq += 1
+        self._slot_of[person_code] = slot
+        self._num_in_memory += 1
+        return slot
+
+    # ----------------------------------------------------------------- legs
+    def add_vehicle(self, slot: int, vehicle_id: str):
+        code = self.strings.codes.get(vehicle_id)
+        if code is None:
+            code = self.strings.code(vehicle_id)
+        self._append_leg(slot, code)
+
+    def _append_leg(self, slot: int, code: int):
+        if self._free_leg != NO_LEG:
+            leg = self._free_leg
+            self._free_leg = self._leg_next[leg]
+            self._leg_vehicle[leg] = code
+            self._leg_next[leg] = NO_LEG
+        else:
+            leg = len(self._leg_vehicle)
+            self._leg_vehicle.append(code)
+            self._leg_next.append(NO_LEG)
+        tail = self._leg_tail[slot]
+        if tail == NO_LEG:
+            self._leg_head[slot] = leg
+        else:
+            self._leg_next[tail] = leg
+        self._leg_tail[slot] = leg
+        self._leg_count[slot] += 1
+        self._legs_in_use += 1
+
+    def num_vehicles(self, slot: int) -> int:
+        return self._leg_count[slot]
+
+    def vehicles(self, slot: int) -> list[str]:
+        strings = self.strings.strings
+        result = []
+        leg = self._leg_head[slot]
+        while leg != NO_LEG:
+            result.append(strings[self._leg_vehicle[leg]])
+            leg = self._leg_next[leg]
+        return result
+
+    # --------------------------------------------------------------- values
+    def set_code(self, slot: int, field: str, value: str):
+        interner = self.interners[field]
+        code = interner.codes.get(value)
+        if code is None:
+            code = interner.code(value)
+        self.codes[field][slot] = code
+
+    def get_code(self, slot: int, field: str) -> str | None:
+        code = self.codes[field][slot]
+        return self.interners[field].strings[code] if code != NO_CODE else None
+
+    def has_code(self, slot: int, field: str) -> bool:
+        return self.codes[field][slot] != NO_CODE
+
+    def memory_bytes(self) -> int:
+        """Dung lượng state của các chuyến đi đang mở trong RAM (slot + leg, không tính bảng intern)."""
+        return self._num_in_memory * self.slot_bytes + self._legs_in_use * self.LEG_BYTES
+
+    # ---------------------------------------------------------------- spill
+    def _pack_slot(self, slot: int) -> bytes:
+        header = self._pack.pack(
+            *(column[slot] for column in self._float_columns), *(column[slot] for column in self._code_columns))
+        legs = array('i')
+        leg = self._leg_head[slot]
+        while leg != NO_LEG:
+            legs.append(self._leg_vehicle[leg])
+            leg = self._leg_next[leg]
+        return header + legs.tobytes()
+
+    def _unpack_slot(self, person_code: int, data: bytes) -> int:
+        slot = self._new_slot(person_code)
+        values = self._pack.unpack_from(data)
+        n_floats = len(self.float_fields)
+        for column, value in zip(self._float_columns, values[:n_floats]):
+            column[slot] = value
+        for column, value in zip(self._code_columns, values[n_floats:]):
+            column[slot] = value
+        legs = array('i')
+        legs.frombytes(data[self._pack.size:])
+        for code in legs:
+            self._append_leg(slot, code)
+        return slot
+
+    def _db(self) -> sqlite3.Connection:
+        if self._spill_db is None:
+            fd, self._spill_path = tempfile.mkstemp(suffix=".open_trips.sqlite", dir=self.spill_dir)
+            os.close(fd)
+            self._spill_db = sqlite3.connect(self._spill_path)
+            self._spill_db.execute("PRAGMA journal_mode=OFF")
+            self._spill_db.execute("PRAGMA synchronous=OFF")
+            self._spill_db.execute("CREATE TABLE IF NOT EXISTS trips (person INTEGER PRIMARY KEY, data BLOB)")
+        return self._spill_db
+
+    def _check_memory(self):
+        # Chuyến đi vừa mở / vừa đọc lại nằm cuối thứ tự mở nên không bị spill ngay
+        if self._num_in_memory > 1 and self.memory_bytes() > self.max_memory_mb * (1 << 20):
+            self._spill_oldest()
+
+    def _spill_oldest(self):
+        # Ghi 1/10 số chuyến đi mở lâu nhất ra đĩa mỗi lần (ít nhất 1) để không phải spill ở mọi event
+        count = max(1, self._num_in_memory // 10)
+        open_seq = np.frombuffer(self._open_seq, dtype=np.int64)
+        oldest = np.argpartition(open_seq, count - 1)[:count].tolist()
+        del open_seq  # bỏ view numpy trước khi array('q') được append tiếp
+        rows = []
+        for slot in oldest:
+            person_code = self._slot_person[slot]
+            rows.append((person_code, self._pack_slot(slot)))
+            self.close(slot)
+            self._spilled[person_code] = 1
+        self._num_spilled += len(rows)
+        self._db().executemany("INSERT INTO trips (person, data) VALUES (?, ?)", rows)
+        self.num_spilled_total += len(rows)
+
+    def _load(self, person_code: int) -> int:
+        db = self._db()
+        (data,) = db.execute("SELECT data FROM trips WHERE person = ?", (person_code,)).fetchone()
+        db.execute("DELETE FROM trips WHERE person = ?", (person_code,))
+        self._spilled[person_code] = 0
+        self._num_spilled -= 1
+        slot = self._unpack_slot(person_code, data)
+        if self.max_memory_mb is not None:
+            self._check_memory()
+        return slot
+
+    def _iter_spilled(self):
+        if self._spill_db is None:
+            return
+        for person_code, data in self._spill_db.execute("SELECT person, data FROM trips ORDER BY rowid"):
+            yield person_code, data
+
+    def release(self):
+        """Xóa file spill tạm."""
+        if self._spill_db is not None:
+            self._spill_db.close()
+            self._spill_db = None
+        if self._spill_path is not None and os.path.exists(self._spill_path):
+            os.remove(self._spill_path)
+        self._spill_path = None
+
+    # --------------------------------------------------------------- report
+    def unclosed_report(self, group_by: str | None = None) -> dict:
+        """Thống kê các chuyến đi còn mở (chưa có actstart kết thúc), có thể nhóm theo 1 code field."""
+        report = {"unclosed": len(self), "in_memory": self._num_in_memory, "spilled": self._num_spilled,
+                  "spilled_total": self.num_spilled_total}
+        if group_by is not None:
+            column = self.codes[group_by]
+            field_index = len(self.float_fields) + self.code_fields.index(group_by)
+            groups: dict[str, int] = {}
+            codes = [column[slot] for slot in range(len(self._open_seq)) if self._open_seq[slot] != FREE_SEQ]
+            codes.extend(self._pack.unpack_from(data)[field_index] for _, data in self._iter_spilled())
+            strings = self.interners[group_by].strings
+            for code in codes:
+                key = strings[code] if code != NO_CODE else "undefined"
+                groups[key] = groups.get(key, 0) + 1
+            report[f"by_{group_by}"] = dict(sorted(groups.items(), key=lambda item: -item[1]))
+        return report
+
+    # ----------------------------------------------------------- checkpoint
+    def __getstate__(self):
+        # Checkpoint của engine: các chuyến đi đã spill được đưa vào state, file SQLite được tạo lại khi load
+        state = self.__dict__.copy()
+        state["_spilled_rows"] = list(self._iter_spilled())
+        state["_spill_db"] = None
+        state["_spill_path"] = None
+        del state["_pack"]
+        return state
+
+    def __setstate__(self, state):
+        spilled_rows = state.pop("_spilled_rows")
+        self.__dict__.update(state)
+        self._pack = struct.Struct(f"<{len(self.float_fields)}d{len(self.code_fields)}i")
+        if spilled_rows:
+            self._db().executemany("INSERT INTO trips (person, data) VALUES (?, ?)", spilled_rows)
+
+
+def print_unclosed_trips(name: str, store: OpenTripStore):
+    """Báo cáo cuối: số chuyến đi chưa kết thúc khi hết file events (nhóm theo mainMode)."""
+    report = store.unclosed_report(group_by="mainMode")
+    print(f"--- {name}: {report['unclosed']:,} chuyến đi chưa kết thúc"
+          f" (đã spill ra đĩa trong lúc chạy: {report['spilled_total']:,}) ---")
+    for mode, count in report["by_mainMode"].items():
+        print(f"    - {mode}: {count:,}")
+
+
+if __name__ == "__main__":
+    # So sánh RAM giữa dict lồng nhau (cách cũ) và OpenTripStore cho N chuyến đi đang mở, mỗi chuyến 2 xe
+    import random
+    import time
+    import tracemalloc
+
+    n_trips = 500_000
+    rnd = random.Random(0)
+    persons = [f"{i}" for i in range(n_trips)]
+    vehicles = [f"bus_{i}" for i in range(2000)] + [f"{i}" for i in range(20000)]
+    modes = ["pt", "car", "walk", "bike"]
+
+    def measure(fill) -> tuple[float, float]:
+        # Thời gian đo riêng (tracemalloc làm chậm cấp phát)
+        t0 = time.perf_counter()
+        fill()
+        elapsed = time.perf_counter() - t0
+        tracemalloc.start()
+        keep = fill()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del keep
+        return peak / 1e6, elapsed
+
+    def fill_dict():
+        person_trip_map = {}
+        for person in persons:
+            person_trip_map[person] = {"vehIdList": [], "vehicleTypeList": [], "mainMode": rnd.choice(modes),
+                                       "startTime": rnd.uniform(0, 86400), "travelTime": 0}
+            for _ in range(2):
+                v = rnd.choice(vehicles)
+                person_trip_map[person]["vehIdList"].append(v)
+                person_trip_map[person]["vehicleTypeList"].append("Bus_Standard" if v.startswith("bus") else "car")
+        return person_trip_map
+
+    def fill_store(max_memory_mb=None):
+        def fill():
+            store = OpenTripStore(("startTime",), ("mainMode",), max_memory_mb=max_memory_mb)
+            for person in persons:
+                slot = store.open(person)
+                store.set_code(slot, "mainMode", rnd.choice(modes))
+                store.floats["startTime"][slot] = rnd.uniform(0, 86400)
+                for _ in range(2):
+                    store.add_vehicle(slot, rnd.choice(vehicles))
+            store.release()
+            return store
+        return fill
+
+    print(f"[*] {n_trips:,} chuyến đi đang mở, mỗi chuyến 2 xe (tracemalloc peak gồm cả bảng intern person id)")
+    for label, fill in (("dict lồng nhau", fill_dict), ("OpenTripStore", fill_store()),
+                        ("OpenTripStore, trần 4 MB", fill_store(4))):
+        peak_mb, elapsed = measure(fill)
+        print(f"    - {label:<26} {peak_mb:8.1f} MB  {elapsed:.2f} s")
+
+    # python -m src.events.open_trips
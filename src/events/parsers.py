@@ -0,0 +1,191 @@
+from lxml import etree
+
+import io
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterator
+from xml.parsers import expat
+
+
+class EventsParser(ABC):
+    """
+    Backend đọc stream output_events.xml (binary, file-like) và trả về (type, attrs)
+    của các event có type nằm trong event_types (None: mọi type), theo đúng thứ tự trong file.
+    attrs chỉ hợp lệ tới khi lấy event kế tiếp (cần giữ lại thì copy bằng dict(attrs)).
+    """
+    @abstractmethod
+    def parse(self, stream: BinaryIO, event_types: frozenset | None) -> Iterator[tuple[str, dict]]:
+        pass
+
+
+class LxmlEventsParser(EventsParser):
+    """lxml iterparse: dựng element cho mọi event rồi dọn cây sau mỗi event."""
+    def parse(self, stream: BinaryIO, event_types: frozenset | None) -> Iterator[tuple[str, dict]]:
+        context = etree.iterparse(stream, events=('end',), tag='event')
+        for event, elem in context:
+            e_type = elem.get("type")
+            if event_types is None or e_type in event_types:
+                yield e_type, elem.attrib
+
+            # Giải phóng bộ nhớ XML
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+
+class ExpatEventsParser(EventsParser):
+    """pyexpat SAX: chỉ nhận callback start-element, không dựng cây."""
+    def __init__(self, chunk_size: int = 1 << 20):
+        self.chunk_size = chunk_size
+
+    def parse(self, stream: BinaryIO, event_types: frozenset | None) -> Iterator[tuple[str, dict]]:
+        records = []
+        append = records.append
+
+        def start_element(name, attrs):
+            if name == "event":
+                e_type = attrs.get("type")
+                if event_types is None or e_type in event_types:
+                    append((e_type, attrs))
+
+        parser = expat.ParserCreate()
+        parser.StartElementHandler = start_element
+        while True:
+            chunk = stream.read(self.chunk_size)
+            if not chunk:
+                break
+            parser.Parse(chunk, False)
+            yield from records
+            records.clear()
+        parser.Parse(b"", True)
+        yield from records
+
+
+class _PrefixedRaw(io.RawIOBase):
+    def __init__(self, prefix: bytes, stream: BinaryIO):
+        super().__init__()
+        self._prefix = memoryview(prefix)
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._prefix:
+            n = min(len(buffer), len(self._prefix))
+            buffer[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def prefixed_stream(prefix: bytes, stream: BinaryIO) -> BinaryIO:
+    """Stream đọc `prefix` trước, sau đó đọc tiếp phần còn lại của `stream` (không đóng `stream`)."""
+    return io.BufferedReader(_PrefixedRaw(prefix, stream))
+
+
+_TYPE_ATTR = b' type="'
+
+
+class LineEventsParser(EventsParser):
+    """
+    Scanner theo dòng cho định dạng MATSim (mỗi dòng đúng 1 `<event ... />`).
+    - Đọc type="..." trực tiếp trên bytes, event không ai đăng ký thì bỏ qua, không decode phần còn lại
+    - Dòng có entity (&amp;, &#...;) được parse riêng bằng lxml
+    - Gặp dòng không đúng định dạng: chuyển sang lxml từ dòng đó tới hết stream
+    """
+    def parse(self, stream: BinaryIO, event_types: frozenset | None) -> Iterator[tuple[str, dict]]:
+        wanted = {e_type.encode(): e_type for e_type in event_types} if event_types is not None else None
+        root_seen = False
+
+        for raw_line in stream:
+            line = raw_line.strip()
+            if line.startswith(b"<event ") and line.endswith(b"/>") and line.count(b"<") == 1:
+                start = line.find(_TYPE_ATTR)
+                if start == -1:
+                    continue
+                start += len(_TYPE_ATTR)
+                type_bytes = line[start:line.find(b'"', start)]
+                e_type = wanted.get(type_bytes) if wanted is not None else type_bytes.decode()
+                if e_type is None:
+                    continue
+                if b"&" in line:
+                    yield e_type, etree.fromstring(line).attrib
+                else:
+                    # ' time=', '123.0', ' type=', 'left link', ... -> {time: 123.0, type: left link, ...}
+                    parts = line[7:line.rindex(b'"')].decode().split('"')
+                    yield e_type, {key.strip(' =\t'): value for key, value in zip(parts[0::2], parts[1::2])}
+                continue
+            elif not line or line.startswith((b"<?", b"<!")) or line == b"</events>":
+                continue
+            elif line.startswith(b"<events") and line.endswith(b">") and line.count(b"<") == 1:
+                root_seen = True
+                continue
+
+            # Fallback: parse phần còn lại bằng lxml (thêm thẻ gốc nếu thẻ gốc đã bị scanner đọc qua)
+            print("[line parser] Dòng không đúng định dạng 1 event/dòng, chuyển sang lxml cho phần còn lại của file.")
+            prefix = b"<events>" + raw_line if root_seen and b"<events" not in line else raw_line
+            yield from LxmlEventsParser().parse(prefixed_stream(prefix, stream), event_types)
+            return
+
+
+EVENT_TAG = b"<event "
+EVENTS_END_TAG = b"</events>"
+
+
+EVENTS_PARSERS = {
+    "lxml": LxmlEventsParser,
+    "expat": ExpatEventsParser,
+    "line": LineEventsParser,
+}
+
+
+def get_events_parser(name: str = "lxml") -> EventsParser:
+    if name not in EVENTS_PARSERS:
+        raise ValueError(f"Events parser '{name}' không tồn tại, chọn một trong: {', '.join(EVENTS_PARSERS)}")
+    return EVENTS_PARSERS[name]()
+
+
+def parse_shard_data(data: bytes, event_types: frozenset, parser: str = "lxml") -> list[tuple[str, dict]]:
+    # Shard bắt đầu tại `<event ` và dừng trước `<event ` kế tiếp: bọc lại bằng thẻ gốc, mỗi thẻ 1 dòng
+    stream = io.BytesIO(b"<events>\n" + data + b"\n" + EVENTS_END_TAG)
+    return [(e_type, dict(attrs)) for e_type, attrs in get_events_parser(parser).parse(stream, event_types)]
+
+
+if __name__ == "__main__":
+    # Benchmark 3 backend trên cùng 1 file events:
+    # - tập type mà cả 5 extractor đăng ký (gần như mọi event đều phải decode)
+    # - chỉ bus_delay (đa số dòng bị bỏ qua ngay sau khi đọc type)
+    import time
+    from src.data.load_config import load_config
+    from src.events.bus_delay import BusDelayHandler
+    from src.events.person_enter_bus import PersonEnterBusHandler
+    from src.events.travel_time import TravelTimeVehicleHandler
+    from src.events.person_trip import PersonTripHandler
+    from src.events.bus_trip import BusTripHandler
+
+    path = load_config(r"config/config_path.yaml")
+    events = path.paths.events
+    all_types = frozenset().union(*(h.event_types for h in (
+        BusDelayHandler, PersonEnterBusHandler, TravelTimeVehicleHandler, PersonTripHandler, BusTripHandler)))
+
+    for label, event_types in (("5 extractor", all_types), ("bus_delay", BusDelayHandler.event_types)):
+        print("-" * 50)
+        print(f"[*] Event types: {label} ({len(event_types)} type)")
+        results = {}
+        for name in EVENTS_PARSERS:
+            parser = get_events_parser(name)
+            t0 = time.perf_counter()
+            with open(events, 'rb') as f:
+                records = [(e_type, dict(attrs)) for e_type, attrs in parser.parse(f, event_types)]
+            elapsed = time.perf_counter() - t0
+            results[name] = records
+            print(f"    - {name:<6}: {elapsed:.2f} s - {len(records):,} events ({len(records) / elapsed:,.0f} events/s)")
+
+        for name, records in results.items():
+            if name != "lxml":
+                status = "giống hệt" if records == results["lxml"] else "KHÁC NHAU!"
+                print(f"    - {name} so với lxml: {status}")
+
+    # python -m src.events.parsers
@@ -1,59 +1,55 @@
 import pyarrow as pa
-import pyarrow.ipc as ipc
-import pandas as pd
-from lxml import etree
-import os
 
-from src.domain.logic import is_public_transport_bus, is_pt_driver
+from src.domain.logic import is_pt_driver
+from src.transit.transit_vehicle import TransitVehicleClasses
+from src.domain.id_registry import IdRegistry
+from src.events.engine import ArrowStreamHandler, EventsEngine
+from src.events.schemas import PERSON_ENTER_BUS_SCHEMA
 
-def generate_personEnterBus_df(events_path: str, vehtype_dict: dict, bus_hint_str: str, output_arrow_path: str, schema: list = ['person_id', 'vehicle_id'], prefix_pt_driver="pt", batch_size=50000):
-    arrow_schema = pa.schema([
-        (name, pa.string()) for name in schema
-    ])
+class PersonEnterBusHandler(ArrowStreamHandler):
+    event_types = frozenset({"PersonEntersVehicle"})
+    event_columns = {"PersonEntersVehicle": ("person", "vehicle")}
+    checkpoint_attrs = ("id_registry", "vehicle_classes")
 
-    temp_data = []
-    # Dùng 'rb' để iterparse chạy nhanh và ổn định hơn với dữ liệu lớn
-    context = etree.iterparse(events_path, events=('end',))
+    def __init__(self, vehtype_dict: dict, bus_hint_str: str, output_arrow_path: str, schema: pa.Schema = PERSON_ENTER_BUS_SCHEMA, prefix_pt_driver="pt", batch_size=50000,
+                 id_registry: IdRegistry | None = None, vehicle_classes: TransitVehicleClasses | None = None,
+                 write_queue_size: int = 4, compression: str | None = None):
+        # person_id, vehicle_id: ghi mã của IdRegistry
+        self.id_registry = id_registry if id_registry is not None else IdRegistry()
+        super().__init__(output_arrow_path, schema, batch_size,
+                         interners={"person_id": self.id_registry.person, "vehicle_id": self.id_registry.vehicle},
+                         write_queue_size=write_queue_size, compression=compression)
+        self.vehtype_dict = vehtype_dict
+        self.bus_hint_str = bus_hint_str
+        self.prefix_pt_driver = prefix_pt_driver
+        self.vehicle_classes = vehicle_classes if vehicle_classes is not None else TransitVehicleClasses(
+            vehtype_dict, bus_hint_str, self.id_registry.vehicle)
 
-    # 2. Mở Sink và Stream Writer
-    with pa.OSFile(output_arrow_path, 'wb') as sink:
-        with ipc.new_stream(sink, arrow_schema) as writer:
-            
-            for event, elem in context:
-                if elem.tag == "event":
-                    e_type = elem.get("type")
-                    
-                    if e_type == "PersonEntersVehicle":
-                        veh_id = elem.get("vehicle")
-                        person_id = elem.get("person")
+    def handle_event(self, e_type: str, attrs):
+        veh_id = attrs.get("vehicle")
+        person_id = attrs.get("person")
 
-                        if veh_id not in vehtype_dict.keys() or not is_public_transport_bus(vehicle_type=vehtype_dict[veh_id], bus_hint_str=bus_hint_str):
-                            elem.clear()
-                            continue
-                        
-                        if is_pt_driver(person_id=person_id, prefix_pt_driver=prefix_pt_driver):
-                            elem.clear()
-                            continue
+        veh_code = self.vehicle_classes.bus_codes.get(veh_id)
+        if veh_code is None:
+            return
+        
+        if is_pt_driver(person_id=person_id, prefix_pt_driver=self.prefix_pt_driver):
+            return
 
-                        temp_data.append({'person_id': person_id, 'vehicle_id': veh_id})
-                        
-                        if len(temp_data) >= batch_size:
-                            # Chuyển list dict -> DataFrame -> Arrow Table
-                            batch_df = pd.DataFrame(temp_data)
-                            table = pa.Table.from_pandas(batch_df, schema=arrow_schema)
-                            writer.write_table(table)
-                            temp_data = [] 
+        self.emit(self.id_registry.person.code(person_id), veh_code)
+        
+        if len(self.batch) >= self.batch_size:
+            self.flush()
 
-                elem.clear()
-                while elem.getprevious() is not None:
-                    del elem.getparent()[0]
 
-            if temp_data:
-                batch_df = pd.DataFrame(temp_data)
-                table = pa.Table.from_pandas(batch_df, schema=arrow_schema)
-                writer.write_table(table)
-
-    print(f"--- Đã hoàn thành Streaming ra file Arrow IPC: {output_arrow_path} ---")
+def generate_personEnterBus_df(events_path: str, vehtype_dict: dict, bus_hint_str: str, output_arrow_path: str, schema: pa.Schema = PERSON_ENTER_BUS_SCHEMA, prefix_pt_driver="pt", batch_size=50000,
+    start_time=None, end_time=None, lookback=3600, id_registry: IdRegistry | None = None,
+    vehicle_classes: TransitVehicleClasses | None = None, write_queue_size: int = 4, compression: str | None = None):
+    handler = PersonEnterBusHandler(
+        vehtype_dict=vehtype_dict, bus_hint_str=bus_hint_str, output_arrow_path=output_arrow_path,
+        schema=schema, prefix_pt_driver=prefix_pt_driver, batch_size=batch_size, id_registry=id_registry,
+        vehicle_classes=vehicle_classes, write_queue_size=write_queue_size, compression=compression)
+    EventsEngine(events_path, [handler], start_time=start_time, end_time=end_time, lookback=lookback).run()
 
 if __name__ == "__main__":
     from src.data.load_config import load_config
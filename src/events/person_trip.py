@@ -1,119 +1,139 @@
 import pyarrow as pa
-import pyarrow.ipc as ipc
-import pandas as pd
-from lxml import etree
-import pandas as pd
+from math import isnan
 
 from src.domain.point import Point
-from src.od_mask.core_class import Zone
-
+from src.domain.id_registry import IdRegistry
+from src.events.engine import ArrowStreamHandler, EventsEngine
+from src.events.open_trips import OpenTripStore, print_unclosed_trips
+from src.events.schemas import PEOPLE_TRIP_SCHEMA
+
+
+class PersonTripHandler(ArrowStreamHandler):
+    event_types = frozenset({"actend", "departure", "PersonEntersVehicle", "actstart"})
+    event_columns = {
+        "actend": ("person", "actType", "x", "y"),
+        "departure": ("person", "computationalRoutingMode"),
+        "PersonEntersVehicle": ("person", "vehicle"),
+        "actstart": ("person", "actType", "x", "y"),
+    }
+    checkpoint_attrs = ("person_trip_map", "id_registry", "zone_codes")
+
+    def __init__(
+        self, vehtype_dict: dict, zone_finder, bus_hint_str: str, output_arrow_path: str, 
+        prefix_pt_driver="pt", batch_size=50000,
+        schema: pa.Schema = PEOPLE_TRIP_SCHEMA, open_trip_memory_mb: float | None = None,
+        id_registry: IdRegistry | None = None, write_queue_size: int = 4, compression: str | None = None):
+        # OZone, DZone: ghi mã zone của IdRegistry
+        self.id_registry = id_registry if id_registry is not None else IdRegistry()
+        zones = self.id_registry.zone
+        super().__init__(output_arrow_path, schema, batch_size, interners={"OZone": zones, "DZone": zones},
+                         write_queue_size=write_queue_size, compression=compression)
+        self.vehtype_dict = vehtype_dict
+        self.zone_finder = zone_finder
+        # Mã zone của grid (r * cols + c) -> mã zone của registry, phần tử cuối (mã grid -1) là "undefined"
+        self.zone_codes = [zones.code(zone_id) for zone_id in zone_finder.zone_ids()] + [zones.code("undefined")]
+        # Chuyến đi đang mở: điểm đi (xO, yO, OZone, actstart), startTime, mainMode + danh sách xe (xem src/events/open_trips.py)
+        self.person_trip_map = OpenTripStore(
+            float_fields=("startTime", "xO", "yO"), code_fields=("mainMode", "actstart", "OZone"),
+            max_memory_mb=open_trip_memory_mb, persons=self.id_registry.person, code_interners={"OZone": zones})
+
+    def handle_event(self, e_type: str, attrs):
+        person_trip_map = self.person_trip_map
+        zone_finder = self.zone_finder
+
+        # --- Logic thu thập dữ liệu (Giữ nguyên logic của bạn) ---
+        if e_type == "actend":
+            personId = attrs.get("person")
+            if person_trip_map.get(personId) is not None or personId.startswith("pt_") or attrs.get("actType") == "pt interaction":
+                return
+            
+            x, y = float(attrs.get("x")), float(attrs.get("y"))
+            person_location = Point(x, y)
+            in_zone_code = self.zone_codes[zone_finder.find_zone_code(person_location)]
+            
+            slot = person_trip_map.open(personId)
+            person_trip_map.set_code(slot, "actstart", attrs.get("actType"))
+            person_trip_map.codes["OZone"][slot] = in_zone_code
+            person_trip_map.floats["xO"][slot] = x
+            person_trip_map.floats["yO"][slot] = y
+
+        elif e_type == "departure":
+            slot = person_trip_map.get(attrs.get("person"))
+            # startTime = NaN: chưa gặp departure nào của chuyến đi
+            if slot is not None and isnan(person_trip_map.floats["startTime"][slot]):
+                person_trip_map.set_code(slot, "mainMode", attrs.get("computationalRoutingMode"))
+                person_trip_map.floats["startTime"][slot] = float(attrs.get("time"))
+
+        elif e_type == "PersonEntersVehicle":
+            slot = person_trip_map.get(attrs.get("person"))
+            if slot is not None:
+                person_trip_map.add_vehicle(slot, attrs.get("vehicle"))
+
+        elif e_type == "actstart":
+            personId = attrs.get("person")
+            slot = person_trip_map.get(personId)
+            if slot is None or personId.startswith("pt_") or attrs.get("actType") == "pt interaction":
+                return
+            
+            # Tính toán các giá trị cuối
+            floats = person_trip_map.floats
+            start_time = floats["startTime"][slot]
+            travel_time = float(attrs.get("time")) - start_time
+            xD, yD = float(attrs.get("x")), float(attrs.get("y"))
+            
+            person_location = Point(xD, yD)
+            d_zone_code = self.zone_codes[zone_finder.find_zone_code(person_location)]
+
+            veh_list = person_trip_map.vehicles(slot)
+            if len(veh_list) == 0:
+                main_mode = "walk"
+            else:
+                main_mode = person_trip_map.get_code(slot, "mainMode")
+            
+            # 2. Append vào batch theo đúng thứ tự cột của schema
+            self.emit(
+                ";".join(veh_list),
+                ";".join([self.vehtype_dict.get(v_id, "undefined") for v_id in veh_list]),
+                main_mode,
+                travel_time,
+                start_time,
+                person_trip_map.get_code(slot, "actstart"),
+                attrs.get("actType"),
+                person_trip_map.codes["OZone"][slot],
+                d_zone_code,
+                floats["xO"][slot],
+                floats["yO"][slot],
+                xD,
+                yD)
+
+            # 3. Kiểm tra Batch Size để ghi ra Stream
+            if len(self.batch) >= self.batch_size:
+                print(f"Recorded batch of {len(self.batch)} trips...")
+                self.flush()
+            
+            person_trip_map.close(slot)
+
+    def close(self):
+        super().close()
+        print_unclosed_trips(self.output_arrow_path, self.person_trip_map)
+        self.person_trip_map.release()
+
+    def abort(self):
+        super().abort()
+        self.person_trip_map.release()
 
 
 def generate_personTrip_df(
     events_path: str, vehtype_dict: dict, zone_finder, bus_hint_str: str, output_arrow_path: str, 
     prefix_pt_driver="pt", batch_size=50000,
-    schema_names: list = ['vehIdList','vehicleTypeList','mainMode','travelTime','startTime','actstart','actend','OZone','DZone','xO','yO','xD','yD']):
-
-    # 1. Định nghĩa schema cho Arrow (Đảm bảo khớp với các key trong dict)
-    arrow_schema = pa.schema([(name, pa.string()) for name in schema_names])
-    
-    temp_data = [] # Lưu list các dict
-    person_trip_map = {}
-    context = etree.iterparse(events_path, events=('end',))
-
-    with pa.OSFile(output_arrow_path, 'wb') as sink:
-        with ipc.new_stream(sink, arrow_schema) as writer:
-            for event, elem in context:
-                if elem.tag == "event":
-                    e_type = elem.get("type")
-
-                    # --- Logic thu thập dữ liệu (Giữ nguyên logic của bạn) ---
-                    if e_type == "actend":
-                        personId = elem.get("person")
-                        if personId in person_trip_map or personId.startswith("pt_") or elem.get("actType") == "pt interaction":
-                            elem.clear()
-                            continue
-                        
-                        x, y = float(elem.get("x")), float(elem.get("y"))
-                        person_location = Point(x, y)
-                        in_zone_id = zone_finder.find_zone_id(person_location)
-                        
-                        person_trip_map[personId] = {
-                            "actstart": elem.get("actType"),
-                            "OZone": in_zone_id,
-                            "xO": x,
-                            "yO": y,
-                            "vehIdList": [],
-                            "vehicleTypeList": []
-                        }
-
-                    elif e_type == "departure":
-                        personId = elem.get("person")
-                        if personId in person_trip_map and "startTime" not in person_trip_map[personId]:
-                            person_trip_map[personId]["mainMode"] = elem.get("computationalRoutingMode")
-                            person_trip_map[personId]["startTime"] = float(elem.get("time"))
-
-                    elif e_type == "PersonEntersVehicle":
-                        personId = elem.get("person")
-                        if personId in person_trip_map:
-                            v_id = elem.get("vehicle")
-                            person_trip_map[personId]["vehIdList"].append(v_id)
-                            person_trip_map[personId]["vehicleTypeList"].append(vehtype_dict.get(v_id, "undefined"))
-
-                    elif e_type == "actstart":
-                        personId = elem.get("person")
-                        if personId not in person_trip_map or personId.startswith("pt_") or elem.get("actType") == "pt interaction":
-                            elem.clear()
-                            continue
-                        
-                        # Tính toán các giá trị cuối
-                        travel_time = float(elem.get("time")) - person_trip_map[personId]["startTime"]
-                        xD, yD = float(elem.get("x")), float(elem.get("y"))
-                        
-                        person_location = Point(xD, yD)
-                        d_zone_id = zone_finder.find_zone_id(person_location)
-
-                        if len(person_trip_map[personId]["vehIdList"]) == 0 or len(person_trip_map[personId]["vehicleTypeList"]) == 0:
-                            person_trip_map[personId]["mainMode"] = "walk"
-                        
-                        # 2. Append vào temp_data dưới dạng DICT
-                        temp_data.append({
-                            'vehIdList': ";".join(map(str, person_trip_map[personId]['vehIdList'])),
-                            'vehicleTypeList': ";".join(map(str, person_trip_map[personId]['vehicleTypeList'])),
-                            'mainMode': str(person_trip_map[personId]['mainMode']),
-                            'travelTime': str(travel_time),
-                            'startTime': str(person_trip_map[personId]['startTime']),
-                            'actstart': str(person_trip_map[personId]['actstart']),
-                            'actend': str(elem.get("actType")),
-                            'OZone': str(person_trip_map[personId]['OZone']),
-                            'DZone': str(d_zone_id),
-                            'xO': str(person_trip_map[personId]['xO']),
-                            'yO': str(person_trip_map[personId]['yO']),
-                            'xD': str(xD),
-                            'yD': str(yD)
-                        })
-                        # print("Đang làm việc")
-
-                        # 3. Kiểm tra Batch Size để ghi ra Stream
-                        if len(temp_data) >= batch_size:
-                            batch_df = pd.DataFrame(temp_data)
-                            # Đảm bảo thứ tự cột đúng với schema
-                            table = pa.Table.from_pandas(batch_df, schema=arrow_schema)
-                            print(f"Recorded batch of {len(temp_data)} trips...")
-                            writer.write_table(table)
-                            temp_data = [] # Giải phóng RAM
-                        
-                        del person_trip_map[personId]
-
-                elem.clear()
-
-            # 4. Ghi nốt phần dữ liệu còn dư cuối cùng
-            if temp_data:
-                batch_df = pd.DataFrame(temp_data)
-                table = pa.Table.from_pandas(batch_df, schema=arrow_schema)
-                writer.write_table(table)
-
-    print(f"--- Đã hoàn thành Streaming ra file Arrow IPC: {output_arrow_path} ---")
+    schema: pa.Schema = PEOPLE_TRIP_SCHEMA, start_time=None, end_time=None, lookback=3600,
+    open_trip_memory_mb: float | None = None, id_registry: IdRegistry | None = None,
+    write_queue_size: int = 4, compression: str | None = None):
+    handler = PersonTripHandler(
+        vehtype_dict=vehtype_dict, zone_finder=zone_finder, bus_hint_str=bus_hint_str, output_arrow_path=output_arrow_path,
+        prefix_pt_driver=prefix_pt_driver, batch_size=batch_size, schema=schema, open_trip_memory_mb=open_trip_memory_mb,
+        id_registry=id_registry, write_queue_size=write_queue_size, compression=compression)
+    EventsEngine(events_path, [handler], start_time=start_time, end_time=end_time, lookback=lookback).run()
 
 if __name__ == "__main__":
     from src.data.load_config import load_config
@@ -0,0 +1,115 @@
+import pyarrow as pa
+
+# Cột ID lặp lại nhiều (busId, linkId, facility, zone, mode...) được dictionary-encode
+# Cột ID của IdRegistry (person, vehicle, link, stop, zone): indices là mã toàn cục, xem src/domain/id_registry.py
+ID_TYPE = pa.dictionary(pa.int32(), pa.string())
+
+BUS_DELAY_SCHEMA = pa.schema([
+    ('vehicleId', ID_TYPE),
+    ('vehicleType', ID_TYPE),
+    ('facility', ID_TYPE),
+    ('arrDelay', pa.float64()),
+    ('depDelay', pa.float64()),
+    ('arrTime', pa.float64()),
+    ('depTime', pa.float64()),
+])
+
+PERSON_ENTER_BUS_SCHEMA = pa.schema([
+    ('person_id', ID_TYPE),
+    ('vehicle_id', ID_TYPE),
+])
+
+TRAVEL_TIME_SCHEMA = pa.schema([
+    ('vehIdList', pa.string()),
+    ('vehicleTypeList', pa.string()),
+    ('mainMode', ID_TYPE),
+    ('startTime', pa.float64()),
+    ('travelTime', pa.float64()),
+])
+
+PEOPLE_TRIP_SCHEMA = pa.schema([
+    ('vehIdList', pa.string()),
+    ('vehicleTypeList', pa.string()),
+    ('mainMode', ID_TYPE),
+    ('travelTime', pa.float64()),
+    ('startTime', pa.float64()),
+    ('actstart', ID_TYPE),
+    ('actend', ID_TYPE),
+    ('OZone', ID_TYPE),
+    ('DZone', ID_TYPE),
+    ('xO', pa.float64()),
+    ('yO', pa.float64()),
+    ('xD', pa.float64()),
+    ('yD', pa.float64()),
+])
+
+BUS_TRIP_SCHEMA = pa.schema([
+    ('busId', ID_TYPE),
+    ('linkId', ID_TYPE),
+    ('linkLen', pa.float64()),
+    ('havePassenger', pa.bool_()),
+    ('travelTime', pa.float64()),
+])
+
+
+def as_string_schema(schema: pa.Schema) -> pa.Schema:
+    """Schema cũ (toàn bộ cột là string), dùng để so sánh."""
+    return pa.schema([(field.name, pa.string()) for field in schema])
+
+
+if __name__ == "__main__":
+    # So sánh dung lượng + tốc độ đọc giữa file typed và file all-string (định dạng cũ)
+    import os
+    import tempfile
+    import time
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    from src.data.load_config import load_config
+
+    path = load_config(r"config/config_path.yaml")
+    interim = path.data.interim.event
+    files = {
+        "bus_delay_at_facilities": interim.bus_delay_at_facilities,
+        "person_enter_bus": interim.person_enter_bus,
+        "travel_time_all_vehicle": interim.travel_time_all_vehicle,
+        "people_trip": interim.people_trip,
+        "bus_trip": interim.bus_trip,
+    }
+
+    def read_table(p):
+        with pa.OSFile(p, 'rb') as source:
+            return ipc.open_stream(source).read_all()
+
+    def kpi_scan(table):
+        # Mô phỏng phần đọc của các KPI: ép kiểu (nếu cần) + tổng/so sánh
+        for field in table.schema:
+            col = table[field.name]
+            if field.name in ("travelTime", "linkLen", "arrDelay", "startTime", "xO", "yO", "xD", "yD"):
+                pc.sum(col if pa.types.is_floating(col.type) else pc.cast(col, pa.float64()))
+            elif field.name in ("havePassenger", "mainMode", "OZone"):
+                pc.equal(col, True if pa.types.is_boolean(col.type) else "true")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'file':<26}{'typed (KB)':>12}{'string (KB)':>13}{'typed read (s)':>16}{'string read (s)':>17}")
+        for name, typed_path in files.items():
+            if not os.path.exists(typed_path):
+                print(f"{name:<26} (chưa có file)")
+                continue
+            typed_table = read_table(typed_path)
+            string_table = pa.table(
+                [pc.cast(typed_table[f.name], pa.string()) for f in typed_table.schema],
+                schema=as_string_schema(typed_table.schema))
+            string_path = os.path.join(tmp_dir, name + ".arrow")
+            with pa.OSFile(string_path, 'wb') as sink:
+                with ipc.new_stream(sink, string_table.schema) as writer:
+                    writer.write_table(string_table, max_chunksize=50000)
+
+            timings = []
+            for p in (typed_path, string_path):
+                t0 = time.perf_counter()
+                kpi_scan(read_table(p))
+                timings.append(time.perf_counter() - t0)
+            print(f"{name:<26}{os.path.getsize(typed_path)/1024:>12.1f}{os.path.getsize(string_path)/1024:>13.1f}"
+                  f"{timings[0]:>16.4f}{timings[1]:>17.4f}")
+
+    # python -m src.events.schemas
@@ -0,0 +1,110 @@
+import json
+import os
+
+TIME_ATTR = b' time="'
+INDEX_SUFFIX = ".time_index.json"
+
+
+def parse_time(value) -> float | None:
+    """Nhận số giây (float/int) hoặc chuỗi 'HH:MM:SS' (có thể > 24h như MATSim), trả về số giây."""
+    if value is None:
+        return None
+    if isinstance(value, str) and ":" in value:
+        h, m, s = value.split(":")
+        return int(h) * 3600 + int(m) * 60 + float(s)
+    return float(value)
+
+
+def time_index_path(events_path: str) -> str:
+    return str(events_path) + INDEX_SUFFIX
+
+
+def build_time_index(events_path: str, bucket_seconds: int = 900) -> dict:
+    """
+    Quét output_events.xml 1 lần, ghi sidecar `<events>.time_index.json`:
+    offsets[i] = byte offset của event đầu tiên có time >= i * bucket_seconds
+    (file events của MATSim được sắp xếp theo time).
+    """
+    offsets = []
+    pos = 0
+    with open(events_path, 'rb') as f:
+        for line in f:
+            idx = line.find(TIME_ATTR)
+            if idx != -1 and b"<event " in line:
+                start = idx + len(TIME_ATTR)
+                bucket = int(float(line[start:line.find(b'"', start)]) // bucket_seconds)
+                while len(offsets) <= bucket:
+                    offsets.append(pos + line.find(b"<event "))
+            pos += len(line)
+
+    stat = os.stat(events_path)
+    index = {
+        "bucket_seconds": bucket_seconds,
+        "file_size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "end_offset": pos,
+        "offsets": offsets,
+    }
+    with open(time_index_path(events_path), "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    print(f"--- Đã tạo time index ({len(offsets)} bucket x {bucket_seconds} s): {time_index_path(events_path)} ---")
+    return index
+
+
+def load_time_index(events_path: str, bucket_seconds: int = 900) -> dict:
+    """Đọc sidecar nếu còn khớp với file events (size + mtime), ngược lại tạo lại."""
+    path = time_index_path(events_path)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+        stat = os.stat(events_path)
+        if (index["bucket_seconds"] == bucket_seconds and index["file_size"] == stat.st_size
+                and index["mtime_ns"] == stat.st_mtime_ns):
+            return index
+    return build_time_index(events_path, bucket_seconds)
+
+
+def offset_at_or_before(index: dict, time: float) -> int:
+    """Byte offset để bắt đầu đọc sao cho không bỏ sót event nào có time >= `time`."""
+    offsets = index["offsets"]
+    bucket = int(max(time, 0.0) // index["bucket_seconds"])
+    return offsets[bucket] if bucket < len(offsets) else index["end_offset"]
+
+
+def offset_after(index: dict, time: float) -> int:
+    """Byte offset mà mọi event có time <= `time` đều nằm phía trước."""
+    offsets = index["offsets"]
+    bucket = int(max(time, 0.0) // index["bucket_seconds"]) + 1
+    return offsets[bucket] if bucket < len(offsets) else index["end_offset"]
+
+
+if __name__ == "__main__":
+    # Tạo time index cho file events trong config và so sánh thời gian đọc cả ngày vs chỉ giờ cao điểm sáng
+    import time
+    from src.data.load_config import load_config
+    from src.events.bus_trip import BusTripHandler
+    from src.events.engine import EventHandler, EventsEngine
+
+    path = load_config(r"config/config_path.yaml")
+    events = path.paths.events
+
+    t0 = time.perf_counter()
+    index = build_time_index(events)
+    print(f"[*] Tạo index: {time.perf_counter() - t0:.2f} s")
+
+    class CountHandler(EventHandler):
+        event_types = BusTripHandler.event_types
+
+        def __init__(self):
+            self.count = 0
+
+        def handle_event(self, e_type, attrs):
+            self.count += 1
+
+    for label, window in (("cả ngày", {}), ("06:00-09:00", {"start_time": "06:00:00", "end_time": "09:00:00"})):
+        handler = CountHandler()
+        t0 = time.perf_counter()
+        EventsEngine(events, [handler], **window).run()
+        print(f"[*] {label}: {time.perf_counter() - t0:.2f} s - {handler.count:,} events")
+
+    # python -m src.events.time_index
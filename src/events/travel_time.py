@@ -1,126 +1,107 @@
 import pyarrow as pa
-import pyarrow.ipc as ipc
-import pandas as pd
-from lxml import etree
-import os
-from src.domain.logic import is_pt_driver
-
-def generate_travelTimeVehicle_df(events_path: str, vehtype_dict: dict, bus_hint_str: str, output_arrow_path: str, schema: list = ['vehIdList', 'vehicleTypeList', 'mainMode' , 'startTime', 'travelTime'], prefix_pt_driver="pt", batch_size=50000):
-    # 1. Định nghĩa Schema (Ép kiểu string để đồng nhất khi ghi file)
-    arrow_schema = pa.schema([
-        (name, pa.string()) for name in schema
-    ])
-
-    temp_data = []
-    person_trip_map = {} # KHỞI TẠO: Trò thiếu dòng này nên code cũ sẽ báo lỗi NameError
-    context = etree.iterparse(events_path, events=('end',))
-
-    # 2. Mở Sink và Stream Writer của Arrow
-    with pa.OSFile(output_arrow_path, 'wb') as sink:
-        with ipc.new_stream(sink, arrow_schema) as writer:
+from src.domain.id_registry import IdRegistry
+from src.events.engine import ArrowStreamHandler, EventsEngine
+from src.events.open_trips import OpenTripStore, print_unclosed_trips
+from src.events.schemas import TRAVEL_TIME_SCHEMA
+
+class TravelTimeVehicleHandler(ArrowStreamHandler):
+    event_types = frozenset({"departure", "PersonEntersVehicle", "actstart"})
+    event_columns = {
+        "departure": ("person", "computationalRoutingMode"),
+        "PersonEntersVehicle": ("person", "vehicle"),
+        "actstart": ("person", "actType"),
+    }
+    checkpoint_attrs = ("person_trip_map", "id_registry")
+
+    def __init__(self, vehtype_dict: dict, bus_hint_str: str, output_arrow_path: str, schema: pa.Schema = TRAVEL_TIME_SCHEMA, prefix_pt_driver="pt", batch_size=50000,
+                 open_trip_memory_mb: float | None = None, id_registry: IdRegistry | None = None,
+                 write_queue_size: int = 4, compression: str | None = None):
+        super().__init__(output_arrow_path, schema, batch_size, write_queue_size=write_queue_size, compression=compression)
+        self.vehtype_dict = vehtype_dict
+        self.id_registry = id_registry if id_registry is not None else IdRegistry()
+        # Chuyến đi đang mở: startTime, mainMode + danh sách xe (xem src/events/open_trips.py), person theo mã của IdRegistry
+        self.person_trip_map = OpenTripStore(
+            float_fields=("startTime",), code_fields=("mainMode",),
+            max_memory_mb=open_trip_memory_mb, persons=self.id_registry.person)
+
+    def handle_event(self, e_type: str, attrs):
+        person_trip_map = self.person_trip_map
+
+        # --- LOGIC DEPARTURE ---
+        if e_type == "departure":
+            personId = attrs.get("person")
+            if person_trip_map.get(personId) is not None:
+                return
+            if personId.startswith("pt_"):
+                return
+
+            slot = person_trip_map.open(personId)
+            person_trip_map.set_code(slot, "mainMode", attrs.get("computationalRoutingMode"))
+            person_trip_map.floats["startTime"][slot] = float(attrs.get("time"))
+
+        # --- LOGIC ENTER VEHICLE ---
+        elif e_type == "PersonEntersVehicle":
+            personId = attrs.get("person")
+            slot = person_trip_map.get(personId)
+            if slot is None:
+                return
+            if personId.startswith("pt_"):
+                return
+
+            person_trip_map.add_vehicle(slot, attrs.get("vehicle"))
+
+        # --- LOGIC ACTSTART (KẾT THÚC TRIP) ---
+        elif e_type == "actstart":
+            personId = attrs.get("person")
+            slot = person_trip_map.get(personId)
+            if slot is None:
+                return
+            if personId.startswith("pt_"):
+                return
+            if attrs.get("actType") == "pt interaction":
+                return
+        
+            start_time = person_trip_map.floats["startTime"][slot]
+            travel_time = float(attrs.get("time")) - start_time
             
-            for event, elem in context:
-                if elem.tag == "event":
-                    e_type = elem.get("type")
-
-                    # --- LOGIC DEPARTURE ---
-                    if e_type == "departure":
-                        personId = elem.get("person")
-                        if personId in person_trip_map:
-                            elem.clear()
-                            continue
-                        if personId.startswith("pt_"):
-                            elem.clear()
-                            continue
-
-                        veh_id = elem.get("vehicle")
-                        time = elem.get("time")
-                        mainMode = elem.get("computationalRoutingMode")
-
-                        person_trip_map[personId] = {
-                            "vehIdList": [],
-                            "vehicleTypeList": [],
-                            "mainMode": mainMode,
-                            "startTime": float(time),
-                            "travelTime": 0
-                        }
-
-                    # --- LOGIC ENTER VEHICLE ---
-                    elif e_type == "PersonEntersVehicle":
-                        personId = elem.get("person")
-                        veh_id = elem.get("vehicle")
-
-                        if personId not in person_trip_map:
-                            elem.clear()
-                            continue
-                        if personId.startswith("pt_"):
-                            elem.clear()
-                            continue
-                            
-                        person_trip_map[personId]["vehIdList"].append(veh_id)
-
-                        if veh_id in vehtype_dict:
-                            person_trip_map[personId]["vehicleTypeList"].append(vehtype_dict[veh_id])
-                        else:
-                            person_trip_map[personId]["vehicleTypeList"].append("undefined")
-
-                    # --- LOGIC ACTSTART (KẾT THÚC TRIP) ---
-                    elif e_type == "actstart":
-                        personId = elem.get("person")
-                        
-                        if personId not in person_trip_map:
-                            elem.clear()
-                            continue
-                        if personId.startswith("pt_"):
-                            elem.clear()
-                            continue
-                        if elem.get("actType") == "pt interaction":
-                            elem.clear()
-                            continue
+            # Giữ nguyên logic lọc người đi bộ của trò
+            if person_trip_map.num_vehicles(slot) > 0:
+                veh_list = person_trip_map.vehicles(slot)
+                veh_ids = ";".join(veh_list)
+                veh_types = ";".join([self.vehtype_dict.get(v_id, "undefined") for v_id in veh_list])
+                
+                # Đưa vào batch theo đúng thứ tự cột của schema
+                self.emit(
+                    veh_ids,
+                    veh_types,
+                    person_trip_map.get_code(slot, "mainMode"),
+                    start_time,
+                    travel_time)
+                
+                # Kiểm tra Batch Size để ghi ra Stream
+                if len(self.batch) >= self.batch_size:
+                    self.flush()
                     
-                        time = elem.get("time")
-                        travel_time = float(time) - person_trip_map[personId]["startTime"]
-                        
-                        # Giữ nguyên logic lọc người đi bộ của trò
-                        if len(person_trip_map[personId]["vehIdList"]) == 0 or len(person_trip_map[personId]["vehicleTypeList"]) == 0:
-                            del person_trip_map[personId]
-                        else:
-                            # THAY THẾ CSV WRITER BẰNG ARROW BUFFER
-                            veh_ids = ";".join(map(str, person_trip_map[personId]['vehIdList']))
-                            veh_types = ";".join(map(str, person_trip_map[personId]['vehicleTypeList']))
-                            
-                            # Đưa vào temp_data theo đúng schema
-                            
-                            temp_data.append({
-                                'vehIdList': veh_ids,
-                                'vehicleTypeList': veh_types,
-                                'mainMode': str(person_trip_map[personId]['mainMode']),
-                                'startTime': str(person_trip_map[personId]['startTime']),
-                                'travelTime': str(travel_time)
-                            })
-                            
-                            # Kiểm tra Batch Size để ghi ra Stream
-                            if len(temp_data) >= batch_size:
-                                batch_df = pd.DataFrame(temp_data)
-                                table = pa.Table.from_pandas(batch_df, schema=arrow_schema)
-                                writer.write_table(table)
-                                temp_data = [] # Giải phóng RAM
-                                
-                            del person_trip_map[personId]
+            person_trip_map.close(slot)
 
-                # Giải phóng bộ nhớ XML
-                elem.clear()
-                while elem.getprevious() is not None:
-                    del elem.getparent()[0]
+    def close(self):
+        super().close()
+        print_unclosed_trips(self.output_arrow_path, self.person_trip_map)
+        self.person_trip_map.release()
 
-            # Ghi nốt phần dư cuối cùng
-            if temp_data:
-                batch_df = pd.DataFrame(temp_data)
-                table = pa.Table.from_pandas(batch_df, schema=arrow_schema)
-                writer.write_table(table)
-                del temp_data
+    def abort(self):
+        super().abort()
+        self.person_trip_map.release()
 
-    print(f"--- Đã hoàn thành Streaming ra file Arrow IPC: {output_arrow_path} ---")
+
+def generate_travelTimeVehicle_df(events_path: str, vehtype_dict: dict, bus_hint_str: str, output_arrow_path: str, schema: pa.Schema = TRAVEL_TIME_SCHEMA, prefix_pt_driver="pt", batch_size=50000,
+    start_time=None, end_time=None, lookback=3600, open_trip_memory_mb: float | None = None,
+    id_registry: IdRegistry | None = None, write_queue_size: int = 4, compression: str | None = None):
+    handler = TravelTimeVehicleHandler(
+        vehtype_dict=vehtype_dict, bus_hint_str=bus_hint_str, output_arrow_path=output_arrow_path,
+        schema=schema, prefix_pt_driver=prefix_pt_driver, batch_size=batch_size, open_trip_memory_mb=open_trip_memory_mb,
+        id_registry=id_registry, write_queue_size=write_queue_size, compression=compression)
+    EventsEngine(events_path, [handler], start_time=start_time, end_time=end_time, lookback=lookback).run()
 
 if __name__ == "__main__":
     from src.data.load_config import load_config
@@ -135,6 +116,3 @@ if __name__ == "__main__":
 
 
     # python -m src.events.travel_time
-
-
-    
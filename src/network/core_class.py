@@ -1,6 +1,12 @@
 from src.domain.point import Point
 
+from collections.abc import Mapping
 from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 
 @dataclass(slots=True)
 class Node:
@@ -15,7 +21,113 @@ class Link:
     length: float
 
 
+@dataclass
+class ColumnarNetwork:
+    """
+    Network dạng cột: mỗi thuộc tính là 1 mảng NumPy, node/link được đánh chỉ số 0..n-1 theo thứ tự trong file.
+    link_from/link_to là chỉ số node (không phải ID). Thuộc tính không có trong file là NaN.
+    ID được giữ dạng mảng Arrow (có thể memory-map từ snapshot); list ID và bảng ID -> chỉ số chỉ được tạo khi cần.
+    """
+    node_id_array: pa.Array
+    node_x: np.ndarray
+    node_y: np.ndarray
+    link_id_array: pa.Array
+    link_from: np.ndarray
+    link_to: np.ndarray
+    length: np.ndarray
+    freespeed: np.ndarray
+    capacity: np.ndarray
+
+    @cached_property
+    def node_ids(self) -> list[str]:
+        return self.node_id_array.to_pylist()
+
+    @cached_property
+    def node_index(self) -> dict[str, int]:
+        return {node_id: i for i, node_id in enumerate(self.node_ids)}
+
+    @cached_property
+    def link_ids(self) -> list[str]:
+        return self.link_id_array.to_pylist()
+
+    @cached_property
+    def link_index(self) -> dict[str, int]:
+        return {link_id: i for i, link_id in enumerate(self.link_ids)}
+
+    @property
+    def nodes(self) -> "NodesView":
+        return NodesView(self)
+
+    @property
+    def links(self) -> "LinksView":
+        return LinksView(self)
+
+    def link_positions(self, link_ids) -> np.ndarray:
+        """Chỉ số của các link_ids (giữ thứ tự), -1 nếu ID không có trong network. Không cần tạo link_index."""
+        positions = pc.index_in(pa.array(list(link_ids), pa.string()), value_set=self.link_id_array)
+        return positions.fill_null(-1).to_numpy().astype(np.intp)
+
+    def link_segments(self, positions: np.ndarray | None = None) -> np.ndarray:
+        """Toạ độ (from, to) của các link, shape (n, 2, 2) — dùng thẳng cho LineCollection."""
+        link_from, link_to = (self.link_from, self.link_to) if positions is None else (self.link_from[positions], self.link_to[positions])
+        segments = np.empty((len(link_from), 2, 2), dtype=np.float64)
+        segments[:, 0, 0] = self.node_x[link_from]
+        segments[:, 0, 1] = self.node_y[link_from]
+        segments[:, 1, 0] = self.node_x[link_to]
+        segments[:, 1, 1] = self.node_y[link_to]
+        return segments
+
+
+class NodesView(Mapping):
+    """dict[str, Node] chỉ đọc trên ColumnarNetwork, Node chỉ được tạo khi truy cập."""
+    __slots__ = ("network",)
+
+    def __init__(self, network: ColumnarNetwork):
+        self.network = network
+
+    def __getitem__(self, node_id: str) -> Node:
+        net = self.network
+        i = net.node_index[node_id]
+        return Node(node_id, Point(float(net.node_x[i]), float(net.node_y[i])))
+
+    def __contains__(self, node_id) -> bool:
+        return node_id in self.network.node_index
+
+    def __iter__(self):
+        return iter(self.network.node_ids)
+
+    def __len__(self) -> int:
+        return len(self.network.node_ids)
+
+
+class LinksView(Mapping):
+    """dict[str, Link] chỉ đọc trên ColumnarNetwork, Link chỉ được tạo khi truy cập."""
+    __slots__ = ("network",)
+
+    def __init__(self, network: ColumnarNetwork):
+        self.network = network
+
+    def __getitem__(self, link_id: str) -> Link:
+        net = self.network
+        i = net.link_index[link_id]
+        return Link(link_id, net.node_ids[net.link_from[i]], net.node_ids[net.link_to[i]], float(net.length[i]))
+
+    def __contains__(self, link_id) -> bool:
+        return link_id in self.network.link_index
+
+    def __iter__(self):
+        return iter(self.network.link_ids)
+
+    def __len__(self) -> int:
+        return len(self.network.link_ids)
+
+
 def get_boundary_nodes_of_network(nodes_dict: dict[str,Node]) -> (Point, Point):
+    if isinstance(nodes_dict, NodesView) and len(nodes_dict):
+        net = nodes_dict.network
+        return (Point(float(net.node_x.min()), float(net.node_y.min())),
+                Point(float(net.node_x.max()), float(net.node_y.max())))
+
     min_x = float('inf')
     min_y = float('inf')
     max_x = float('-inf')
@@ -27,4 +139,4 @@ def get_boundary_nodes_of_network(nodes_dict: dict[str,Node]) -> (Point, Point):
         max_x = max(max_x, node.coord.x)
         max_y = max(max_y, node.coord.y)
 
-    return Point(min_x, min_y), Point(max_x, max_y)
\ No newline at end of file
+    return Point(min_x, min_y), Point(max_x, max_y)
@@ -1,32 +1,103 @@
-from src.transit.transit_vehicle import get_transit_type_dict
-from src.domain.point import Point
-from src.network.core_class import Node, Link
+from src.network.core_class import Node, Link, ColumnarNetwork
+from src.network.snapshot import source_fingerprint, network_snapshot_path, read_network_snapshot, write_network_snapshot
 
-import lxml
+import os
+from array import array
+
+import numpy as np
+import pyarrow as pa
 import lxml.etree as etree
+from src.utils.compressed_input import open_input
+
+def _float_attr(elem, name: str) -> float:
+    value = elem.get(name)
+    return float(value) if value is not None else float('nan')
+
+def load_columnar_network(network_path: str) -> ColumnarNetwork:
+    """
+    Đọc network.xml kiểu streaming (iterparse, xoá từng node/link sau khi đọc) vào ColumnarNetwork:
+    bộ nhớ chỉ tỉ lệ với các mảng kết quả, không giữ cả cây DOM.
+    ID trùng: giá trị sau ghi đè lên giá trị trước, giữ vị trí cũ (như dict).
+    """
+    node_ids: list[str] = []
+    node_index: dict[str, int] = {}
+    node_x, node_y = array('d'), array('d')
+    link_ids: list[str] = []
+    link_index: dict[str, int] = {}
+    link_from, link_to = array('i'), array('i')
+    length, freespeed, capacity = array('d'), array('d'), array('d')
+
+    with open_input(network_path) as xml_file:
+        for _, elem in etree.iterparse(xml_file, events=("end",), tag=("node", "link")):
+            if elem.tag == "node":
+                node_id = elem.get("id")
+                x, y = float(elem.get("x")), float(elem.get("y"))
+                i = node_index.get(node_id)
+                if i is None:
+                    node_index[node_id] = len(node_ids)
+                    node_ids.append(node_id)
+                    node_x.append(x)
+                    node_y.append(y)
+                else:
+                    node_x[i], node_y[i] = x, y
+            else:
+                link_id = elem.get("id")
+                try:
+                    from_node = node_index[elem.get("from")]
+                    to_node = node_index[elem.get("to")]
+                except KeyError as e:
+                    raise ValueError(f"Link {link_id} tham chiếu node {e.args[0]} không có trong <nodes> của {network_path}") from None
+                values = (float(elem.get("length")), _float_attr(elem, "freespeed"), _float_attr(elem, "capacity"))
+                i = link_index.get(link_id)
+                if i is None:
+                    link_index[link_id] = len(link_ids)
+                    link_ids.append(link_id)
+                    link_from.append(from_node)
+                    link_to.append(to_node)
+                    length.append(values[0])
+                    freespeed.append(values[1])
+                    capacity.append(values[2])
+                else:
+                    link_from[i], link_to[i] = from_node, to_node
+                    length[i], freespeed[i], capacity[i] = values
+            # Giải phóng phần cây đã đọc
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    network = ColumnarNetwork(
+        node_id_array=pa.array(node_ids, pa.string()),
+        node_x=np.frombuffer(node_x, dtype=np.float64), node_y=np.frombuffer(node_y, dtype=np.float64),
+        link_id_array=pa.array(link_ids, pa.string()),
+        link_from=np.frombuffer(link_from, dtype=np.int32), link_to=np.frombuffer(link_to, dtype=np.int32),
+        length=np.frombuffer(length, dtype=np.float64), freespeed=np.frombuffer(freespeed, dtype=np.float64),
+        capacity=np.frombuffer(capacity, dtype=np.float64),
+    )
+    # list ID / bảng ID -> chỉ số đã có sẵn từ lúc đọc, không cần tạo lại
+    network.node_ids, network.node_index = node_ids, node_index
+    network.link_ids, network.link_index = link_ids, link_index
+    return network
+
+def load_network(network_path: str, snapshot_dir: str | None = None) -> ColumnarNetwork:
+    """
+    ColumnarNetwork của network_path.
+    Có snapshot_dir: lần đầu ghi snapshot nhị phân (theo sha256 của file), các lần chạy sau memory-map snapshot thay vì parse XML.
+    Dùng lại network giữa các bước / scenario do ScenarioInputs / InputCache lo, hàm này không giữ gì trong process.
+    """
+    if snapshot_dir is None:
+        return load_columnar_network(network_path)
+    snapshot_path = network_snapshot_path(snapshot_dir, source_fingerprint(network_path, snapshot_dir))
+    if os.path.isdir(snapshot_path):
+        return read_network_snapshot(snapshot_path)
+    network = load_columnar_network(network_path)
+    write_network_snapshot(network, snapshot_path)
+    print(f"--- Đã ghi snapshot network: {snapshot_path} ---")
+    return network
 
-def generate_nodes_and_links_dict(network_path: str) -> (dict[str,Node], dict[str,Link]):
-    nodes_dict: dict[str,Node] = {}
-    links_dict: dict[str,Link] = {}
-
-    parser = etree.XMLParser(remove_blank_text=True)
-    tree = etree.parse(network_path, parser)
-    root = tree.getroot()
-
-    for link in root.xpath("//network/links/link"):
-        link_id = link.xpath("@id")[0]
-        length = float(link.xpath("@length")[0])
-        from_node = link.xpath("@from")[0]
-        to_node = link.xpath("@to")[0]
-        links_dict[link_id] = Link(link_id, from_node, to_node, length)
-
-    for node in root.xpath("//network/nodes/node"):
-        node_id = node.xpath("@id")[0]
-        x = float(node.xpath("@x")[0])
-        y = float(node.xpath("@y")[0])
-        nodes_dict[node_id] = Node(node_id, Point(x,y))
-    
-    return nodes_dict, links_dict
+def generate_nodes_and_links_dict(network_path: str, snapshot_dir: str | None = None) -> (dict[str,Node], dict[str,Link]):
+    """nodes_dict, links_dict cho code cũ: view chỉ đọc trên load_network, Node/Link tạo khi truy cập."""
+    network = load_network(network_path, snapshot_dir)
+    return network.nodes, network.links
 
 if __name__ == "__main__":
     from src.data.load_config import load_config
@@ -64,4 +135,56 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"[LỖI] Có vấn đề khi chạy: {e}")
 
+    # Benchmark: loader DOM cũ (etree.parse + xpath từng thuộc tính) vs loader streaming cột,
+    # trên 1 network lưới tổng hợp; mỗi lần đọc chạy trong 1 process mới để đo RSS đỉnh riêng.
+    import resource
+    import tempfile
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    from src.domain.point import Point
+    from src.network.core_class import get_boundary_nodes_of_network
+    from src.utils.benchmark_fixtures import write_grid_network
+
+    def dom_nodes_and_links_dict(network_path: str) -> (dict[str,Node], dict[str,Link]):
+        nodes_dict: dict[str,Node] = {}
+        links_dict: dict[str,Link] = {}
+        parser = etree.XMLParser(remove_blank_text=True)
+        with open_input(network_path) as xml_file:
+            tree = etree.parse(xml_file, parser)
+        root = tree.getroot()
+        for link in root.xpath("//network/links/link"):
+            link_id = link.xpath("@id")[0]
+            links_dict[link_id] = Link(link_id, link.xpath("@from")[0], link.xpath("@to")[0], float(link.xpath("@length")[0]))
+        for node in root.xpath("//network/nodes/node"):
+            node_id = node.xpath("@id")[0]
+            nodes_dict[node_id] = Node(node_id, Point(float(node.xpath("@x")[0]), float(node.xpath("@y")[0])))
+        return nodes_dict, links_dict
+
+    def benchmark_load(loader: str, network_path: str):
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        t0 = time.perf_counter()
+        if loader == "dom":
+            nodes, links = dom_nodes_and_links_dict(network_path)
+        else:
+            nodes, links = generate_nodes_and_links_dict(network_path)
+        elapsed = time.perf_counter() - t0
+        rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        checksum = (len(nodes), len(links), get_boundary_nodes_of_network(nodes),
+                    sum(links[link_id].length for link_id in list(links)[::1000]))
+        return elapsed, rss_before / 1024, rss_peak / 1024, checksum
+
+    grid = 300
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        synthetic_path = os.path.join(tmp_dir, "network.xml")
+        write_grid_network(synthetic_path, grid)
+
+        print(f"\n[*] Network tổng hợp {grid}x{grid}: {os.path.getsize(synthetic_path) / 1e6:.1f} MB")
+        print(f"{'loader':<12}{'time (s)':>10}{'RSS trước (MB)':>17}{'RSS đỉnh (MB)':>16}")
+        results = {}
+        for loader in ("dom", "streaming"):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                elapsed, rss_before, rss_peak, results[loader] = pool.submit(benchmark_load, loader, synthetic_path).result()
+            print(f"{loader:<12}{elapsed:>10.2f}{rss_before:>17.1f}{rss_peak:>16.1f}")
+        print(f"[*] Kết quả 2 loader: {'giống nhau' if results['dom'] == results['streaming'] else 'KHÁC NHAU!'}")
+
     # python -m src.network.network
\ No newline at end of file
@@ -0,0 +1,123 @@
+import os
+import shutil
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from src.utils.fingerprint import file_fingerprint, read_fingerprints, write_fingerprints
+from src.network.core_class import ColumnarNetwork
+
+# Tăng khi đổi layout snapshot: snapshot cũ tự bị bỏ qua (tên thư mục khác)
+SNAPSHOT_VERSION = 1
+SOURCES_FILE = "sources.json"
+
+NODES_SCHEMA = pa.schema([("id", pa.string()), ("x", pa.float64()), ("y", pa.float64())])
+LINKS_SCHEMA = pa.schema([
+    ("id", pa.string()), ("from", pa.int32()), ("to", pa.int32()),
+    ("length", pa.float64()), ("freespeed", pa.float64()), ("capacity", pa.float64())])
+
+
+def source_fingerprint(network_path: str, snapshot_dir: str) -> dict:
+    """
+    size + sha256 của network.xml. sha256 được lưu trong `<snapshot_dir>/sources.json` theo đường dẫn file,
+    nên chỉ hash lại khi size / mtime thay đổi.
+    """
+    sources_path = os.path.join(snapshot_dir, SOURCES_FILE)
+    sources = read_fingerprints(sources_path)
+    key = os.path.abspath(network_path)
+    fingerprint = file_fingerprint(network_path, sources.get(key))
+    if sources.get(key) != fingerprint:
+        sources[key] = fingerprint
+        write_fingerprints(sources_path, sources)
+    return fingerprint
+
+
+def network_snapshot_path(snapshot_dir: str, fingerprint: dict) -> str:
+    return os.path.join(snapshot_dir, f"network-{fingerprint['sha256'][:16]}-v{SNAPSHOT_VERSION}")
+
+
+def write_network_snapshot(network: ColumnarNetwork, snapshot_path: str):
+    """Ghi network ra thư mục snapshot (nodes.arrow + links.arrow, Arrow IPC file 1 batch). Ghi vào thư mục tạm rồi đổi tên."""
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    nodes = pa.record_batch([network.node_id_array, pa.array(network.node_x), pa.array(network.node_y)], schema=NODES_SCHEMA)
+    links = pa.record_batch([
+        network.link_id_array, pa.array(network.link_from), pa.array(network.link_to),
+        pa.array(network.length), pa.array(network.freespeed), pa.array(network.capacity)], schema=LINKS_SCHEMA)
+    for name, batch in (("nodes.arrow", nodes), ("links.arrow", links)):
+        with ipc.new_file(os.path.join(tmp_path, name), batch.schema) as writer:
+            writer.write_batch(batch)
+    try:
+        os.rename(tmp_path, snapshot_path)
+    except OSError:
+        # Process khác đã ghi xong cùng snapshot
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _map_batch(path: str) -> pa.RecordBatch:
+    with ipc.open_file(pa.memory_map(path, 'r')) as reader:
+        return reader.get_batch(0)
+
+
+def _numpy_view(batch: pa.RecordBatch, name: str) -> np.ndarray:
+    """Mảng NumPy trỏ thẳng vào buffer của cột (không null) — không copy."""
+    column = batch.column(name)
+    return np.frombuffer(column.buffers()[1], dtype=column.type.to_pandas_dtype(), count=len(column), offset=column.offset * column.type.byte_width)
+
+
+def read_network_snapshot(snapshot_path: str) -> ColumnarNetwork:
+    """Memory-map snapshot: các mảng NumPy / Arrow trỏ thẳng vào file, không copy, không parse lại XML."""
+    nodes = _map_batch(os.path.join(snapshot_path, "nodes.arrow"))
+    links = _map_batch(os.path.join(snapshot_path, "links.arrow"))
+    return ColumnarNetwork(
+        node_id_array=nodes.column("id"),
+        node_x=_numpy_view(nodes, "x"), node_y=_numpy_view(nodes, "y"),
+        link_id_array=links.column("id"),
+        link_from=_numpy_view(links, "from"), link_to=_numpy_view(links, "to"),
+        length=_numpy_view(links, "length"), freespeed=_numpy_view(links, "freespeed"),
+        capacity=_numpy_view(links, "capacity"),
+    )
+
+
+if __name__ == "__main__":
+    # Benchmark: đọc network.xml (streaming) vs lần đầu có snapshot (đọc + ghi) vs memory-map snapshot,
+    # trên 1 network lưới tổng hợp; mỗi lần chạy trong 1 process mới.
+    import resource
+    import tempfile
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    from src.network.network import load_network
+    from src.network.core_class import get_boundary_nodes_of_network
+    from src.utils.benchmark_fixtures import write_grid_network
+
+    def benchmark_load(network_path: str, snapshot_dir: str | None):
+        t0 = time.perf_counter()
+        network = load_network(network_path, snapshot_dir)
+        elapsed = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        segments = network.link_segments()
+        segments_elapsed = time.perf_counter() - t0
+        links = network.links
+        checksum = (len(network.nodes), len(links), get_boundary_nodes_of_network(network.nodes),
+                    float(segments.sum()), links[network.link_ids[-1]])
+        return elapsed, segments_elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, checksum
+
+    grid = 300
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        synthetic_path = os.path.join(tmp_dir, "network.xml")
+        snapshot_dir = os.path.join(tmp_dir, "network_snapshot")
+        write_grid_network(synthetic_path, grid)
+
+        print(f"[*] Network tổng hợp {grid}x{grid}: {os.path.getsize(synthetic_path) / 1e6:.1f} MB")
+        print(f"{'mode':<22}{'load (s)':>10}{'segments (s)':>14}{'RSS đỉnh (MB)':>16}")
+        results = {}
+        for mode, cache in (("xml", None), ("snapshot lần đầu", snapshot_dir), ("snapshot mmap", snapshot_dir)):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                elapsed, segments_elapsed, rss_peak, results[mode] = pool.submit(benchmark_load, synthetic_path, cache).result()
+            print(f"{mode:<22}{elapsed:>10.3f}{segments_elapsed:>14.3f}{rss_peak:>16.1f}")
+        snapshot_size = sum(entry.stat().st_size for root in os.scandir(snapshot_dir) if root.is_dir() for entry in os.scandir(root.path))
+        print(f"[*] Snapshot: {snapshot_size / 1e6:.1f} MB")
+        print(f"[*] Kết quả: {'giống nhau' if len(set(map(repr, results.values()))) == 1 else 'KHÁC NHAU!'}")
+
+    # python -m src.network.snapshot
@@ -14,6 +14,14 @@ class ZoneGeneratorByGrid(ZoneGenerator):
         height = (self._max_p.y - self._min_p.y) / self.rows
         return width, height
 
+    def grid_params(self) -> dict:
+        """Tham số xác định grid (dùng làm khóa cache cho dữ liệu đã gán zone)."""
+        return {
+            "min_x": self._min_p.x, "min_y": self._min_p.y,
+            "max_x": self._max_p.x, "max_y": self._max_p.y,
+            "rows": self.rows, "cols": self.cols,
+        }
+
     def generate(self) -> list[Zone]:
         zones_list = []
         unit_width, unit_height = self._calculate_unit_size()
@@ -34,26 +42,40 @@ class ZoneGeneratorByGrid(ZoneGenerator):
                 ]
                 
                 
-                zone_id = f"z_{r}_{c}" # ID có ý nghĩa hơn
+                zone_id = self.zone_id_of(r * self.cols + c) # ID có ý nghĩa hơn
                 zones_list.append(Zone(id=zone_id, boundary_points=points))
         
         return zones_list
     
+    def zone_id_of(self, zone_code: int) -> str:
+        """Zone ID của mã zone (r * cols + c, -1: ngoài grid -> "undefined")."""
+        if zone_code < 0:
+            return "undefined"
+        return f"z_{zone_code // self.cols}_{zone_code % self.cols}"
+
+    def zone_ids(self) -> list[str]:
+        """Zone ID theo thứ tự mã zone (giống thứ tự của generate())."""
+        return [self.zone_id_of(code) for code in range(self.rows * self.cols)]
+
     def find_zone_id(self, point: Point) -> str:
         """
         Tìm Zone ID chứa điểm point (O(1)).
         Trả về "undefined" nếu point nằm ngoài vùng grid.
         """
+        return self.zone_id_of(self.find_zone_code(point))
+
+    def find_zone_code(self, point: Point) -> int:
+        """Như find_zone_id nhưng trả về mã zone r * cols + c (-1 nếu point nằm ngoài vùng grid)."""
         # Kiểm tra boundary box
         if not (self._min_p.x <= point.x <= self._max_p.x and 
                 self._min_p.y <= point.y <= self._max_p.y):
-            return "undefined"
+            return -1
 
         unit_width, unit_height = self._calculate_unit_size()
         
         # Tránh chia cho 0
         if unit_width == 0 or unit_height == 0:
-            return "undefined"
+            return -1
 
         # Tính chỉ số dòng, cột
         c = int((point.x - self._min_p.x) / unit_width)
@@ -65,7 +87,7 @@ class ZoneGeneratorByGrid(ZoneGenerator):
         if r == self.rows:
             r = self.rows - 1
             
-        return f"z_{r}_{c}"
+        return r * self.cols + c
                 
 if __name__ == "__main__":
     from src.data.load_config import load_config
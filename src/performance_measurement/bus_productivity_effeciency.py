@@ -15,17 +15,17 @@ def get_bus_service_metrics(bus_trip_arrow_path: str):
     with pa.OSFile(bus_trip_arrow_path, 'rb') as source:
         reader = ipc.open_stream(source)
         for batch in reader:
-            # Cast columns
-            travel_times = pc.cast(batch['travelTime'], pa.float64())
-            link_lens = pc.cast(batch['linkLen'], pa.float64())
+            # Typed columns (float64), không cần cast
+            travel_times = batch['travelTime']
+            link_lens = batch['linkLen']
             # 1. Total Service Time
             t_sum = pc.sum(travel_times).as_py()
             if t_sum: total_service_time += t_sum
             # 2. Total Distance
             d_sum = pc.sum(link_lens).as_py()
             if d_sum: total_distance += d_sum
-            # Create Mask for 'havePassenger' == 'true'
-            mask = pc.equal(batch['havePassenger'], 'true')
+            # 'havePassenger' là cột bool -> dùng trực tiếp làm mask
+            mask = batch['havePassenger']
             # 3. Revenue Time (Filter then Sum)
             # Only sum travelTime where mask is true
             rev_time_sum = pc.sum(pc.filter(travel_times, mask)).as_py()
@@ -1,11 +1,20 @@
-from src.transit.core_class import TransitRoute, StopFacility
+from src.transit.core_class import TransitRoute, StopFacility, RoutesView
 from src.transit.transit_schedule import generate_bus_routes_and_stops_dict
-from src.network.core_class import Node, Link
+from src.network.core_class import Node, Link, LinksView
 from src.network.network import generate_nodes_and_links_dict
 
 import numpy as np
     
 def calculate_avg_km_and_stop_in_bus_network( routes_dict: dict[str,TransitRoute], links_dict: dict[str,Link]) -> (float, float):
+    if isinstance(routes_dict, RoutesView) and isinstance(links_dict, LinksView):
+        # Dạng cột: chiều dài theo mã link của schedule rồi cộng theo CSR của từng tuyến
+        schedule, network = routes_dict.schedule, links_dict.network
+        positions = network.link_positions(schedule.link_ids)
+        if (positions < 0).any():
+            raise KeyError(schedule.link_ids[int(np.argmax(positions < 0))])
+        km_route_list = schedule.route_lengths(network.length[positions])
+        return np.mean(km_route_list), np.mean(schedule.stops_per_route().astype(float))
+
     stop_number_list = []
     km_route_list = []
 
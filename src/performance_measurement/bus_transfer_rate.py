@@ -1,9 +1,10 @@
 import pyarrow as pa
 import pyarrow.ipc as ipc
 import os
-from src.domain.logic import is_public_transport_bus
+from src.transit.transit_vehicle import TransitVehicleClasses
 
-def calculate_bus_transfer_rate(person_trip_arrow_path: str, veh_type_dict: dict, bus_hint_str: str) -> float:
+def calculate_bus_transfer_rate(person_trip_arrow_path: str, veh_type_dict: dict, bus_hint_str: str,
+                                vehicle_classes: TransitVehicleClasses | None = None) -> float:
     """
     Calculates the Average Bus-to-Bus Transfer Rate per PT Trip.
     
@@ -11,7 +12,11 @@ def calculate_bus_transfer_rate(person_trip_arrow_path: str, veh_type_dict: dict
     1. Filter for trips where main_mode == 'pt'
     2. Count adjacent vehicle pairs (prev, next) where BOTH are buses.
     3. Sum transfers / Total PT Trips.
+    vehicle_classes: phân loại xe dùng chung của scenario (None: tạo từ veh_type_dict).
     """
+    if vehicle_classes is None:
+        vehicle_classes = TransitVehicleClasses(veh_type_dict, bus_hint_str)
+    is_bus_type = vehicle_classes.is_bus_type
     
     if not os.path.exists(person_trip_arrow_path):
         print(f"File not found: {person_trip_arrow_path}")
@@ -45,8 +50,7 @@ def calculate_bus_transfer_rate(person_trip_arrow_path: str, veh_type_dict: dict
                         prev_type = veh_types[i]
                         next_type = veh_types[i+1]
                         
-                        if (is_public_transport_bus(prev_type, bus_hint_str) and 
-                            is_public_transport_bus(next_type, bus_hint_str)):
+                        if is_bus_type(prev_type) and is_bus_type(next_type):
                             trip_transfers += 1
                             
                     total_transfers += trip_transfers
@@ -63,12 +67,14 @@ def calculate_bus_transfer_rate(person_trip_arrow_path: str, veh_type_dict: dict
 
 if __name__ == "__main__":
     from src.data.load_config import load_config
+    from src.transit.transit_vehicle import get_transit_type_dict
     path = load_config(r"config/config_path.yaml")
+    veh_type_dict = get_transit_type_dict(path.paths.transit_vehicle)
     
     person_trip_path = path.data.interim.event.people_trip
     # Assuming config for bus hint exists or hardcoded
     bus_hint = "bus" 
     
     print("Calculating Bus Transfer Rate...")
-    rate = calculate_bus_transfer_rate(person_trip_path, bus_hint)
+    rate = calculate_bus_transfer_rate(person_trip_path, veh_type_dict, bus_hint)
     print(f"[*] Bus-to-Bus Transfer Rate: {rate:.4f} transfers/trip")
\ No newline at end of file
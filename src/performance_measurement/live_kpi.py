@@ -0,0 +1,305 @@
+from abc import abstractmethod
+from time import monotonic
+
+from src.domain.logic import is_public_transport_bus
+from src.domain.id_registry import IdRegistry
+from src.transit.transit_vehicle import TransitVehicleClasses
+from src.events.engine import ArrowStreamHandler, EventsEngine
+from src.events.bus_delay import BusDelayHandler
+from src.events.person_enter_bus import PersonEnterBusHandler
+from src.events.travel_time import TravelTimeVehicleHandler
+from src.events.person_trip import PersonTripHandler
+from src.events.bus_trip import BusTripHandler
+
+
+class LiveKpiOutput(ArrowStreamHandler):
+    """
+    Thay phần ghi file .arrow của extractor bằng accumulator: mỗi dòng extractor emit() được cộng dồn
+    ngay (accumulate), không ghi ra file và không đọc lại. State machine của extractor giữ nguyên.
+    Dùng làm base thứ 2: class LiveX(XHandler, LiveKpiOutput) -> XHandler.close() / abort() vẫn chạy, phần ghi file thì không.
+    """
+    # State nằm trong các accumulator, không lưu vào checkpoint của engine
+    supports_checkpoint = False
+
+    def open(self):
+        pass
+
+    def emit(self, *values):
+        if self.recording:
+            self.accumulate(*values)
+
+    @abstractmethod
+    def accumulate(self, *values):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+class LiveRidership(PersonEnterBusHandler, LiveKpiOutput):
+    """calculte_ridership: số person khác nhau lên xe bus (tập mã person)."""
+    def __init__(self, vehtype_dict: dict, bus_hint_str: str, **kwargs):
+        super().__init__(vehtype_dict, bus_hint_str, output_arrow_path=f"live:{type(self).__name__}", **kwargs)
+        self.riders = set()
+
+    def accumulate(self, person_id, vehicle_id):
+        self.riders.add(person_id)
+
+    def result(self) -> int:
+        return len(self.riders)
+
+
+class LiveOtp(BusDelayHandler, LiveKpiOutput):
+    """calculte_otp: số lần xe bus đến trạm có arrDelay trong [min_delay, max_delay] / tổng số lần đến trạm."""
+    def __init__(self, vehtype_dict: dict, bus_hint_str: str, max_delay: float, min_delay: float, **kwargs):
+        super().__init__(vehtype_dict, bus_hint_str, output_arrow_path=f"live:{type(self).__name__}", **kwargs)
+        self.max_delay = max_delay
+        self.min_delay = min_delay
+        self.ontime = 0
+        self.total = 0
+
+    def accumulate(self, vehicle_id, vehicle_type, facility, arr_delay, dep_delay, arr_time, dep_time):
+        self.total += 1
+        if self.min_delay <= arr_delay <= self.max_delay:
+            self.ontime += 1
+
+    def result(self) -> tuple[int, int, float]:
+        otp_percent = (self.ontime / self.total) * 100.0 if self.total > 0 else 0.0
+        return self.ontime, self.total, otp_percent
+
+
+class LiveTravelTime(TravelTimeVehicleHandler, LiveKpiOutput):
+    """
+    calculate_average_bus_travel_time / calculate_average_car_travel_time:
+    tổng + số chuyến đi có xe bus trong vehicleTypeList, tổng + số chuyến đi có mainMode = car.
+    """
+    def __init__(self, vehtype_dict: dict, bus_hint_str: str, **kwargs):
+        super().__init__(vehtype_dict, bus_hint_str, output_arrow_path=f"live:{type(self).__name__}", **kwargs)
+        self.bus_hint_str = bus_hint_str
+        self._is_bus = {}
+        self.bus_time = 0.0
+        self.bus_trip = 0
+        self.car_time = 0.0
+        self.car_trip = 0
+
+    def accumulate(self, veh_ids, veh_types, main_mode, start_time, travel_time):
+        is_bus = self._is_bus.get(veh_types)
+        if is_bus is None:
+            is_bus = self._is_bus[veh_types] = is_public_transport_bus(veh_types, self.bus_hint_str)
+        if is_bus:
+            self.bus_time += travel_time
+            self.bus_trip += 1
+        if main_mode == "car":
+            self.car_time += travel_time
+            self.car_trip += 1
+
+    def bus_result(self) -> tuple[float, int]:
+        return (self.bus_time / self.bus_trip if self.bus_trip > 0 else 0.0), self.bus_trip
+
+    def car_result(self) -> tuple[float, int]:
+        return (self.car_time / self.car_trip if self.car_trip > 0 else 0.0), self.car_trip
+
+
+class LiveBusService(BusTripHandler, LiveKpiOutput):
+    """get_bus_service_metrics: tổng thời gian / quãng đường xe bus chạy, phần có hành khách."""
+    def __init__(self, links_dict: dict, vehtype_dict: dict, bus_hint_str: str, **kwargs):
+        super().__init__(links_dict, vehtype_dict, bus_hint_str, output_arrow_path=f"live:{type(self).__name__}", **kwargs)
+        self.total_service_time = 0.0
+        self.revenue_service_time = 0.0
+        self.total_distance = 0.0
+        self.effective_distance = 0.0
+
+    def accumulate(self, bus_id, link_id, link_len, have_passenger, travel_time):
+        self.total_service_time += travel_time
+        self.total_distance += link_len
+        if have_passenger:
+            self.revenue_service_time += travel_time
+            self.effective_distance += link_len
+
+    def result(self) -> dict:
+        return {
+            "service_hours": self.total_service_time / 3600.0,
+            "revenue_hours": self.revenue_service_time / 3600.0,
+            "total_km": self.total_distance / 1000,
+            "effective_km": self.effective_distance / 1000,
+        }
+
+
+class LiveTransferRate(PersonTripHandler, LiveKpiOutput):
+    """calculate_bus_transfer_rate: số cặp xe liền nhau đều là bus / số chuyến đi pt."""
+    def __init__(self, vehtype_dict: dict, zone_finder, bus_hint_str: str,
+                 vehicle_classes: TransitVehicleClasses | None = None, **kwargs):
+        super().__init__(vehtype_dict, zone_finder, bus_hint_str, output_arrow_path=f"live:{type(self).__name__}", **kwargs)
+        self.vehicle_classes = vehicle_classes if vehicle_classes is not None else TransitVehicleClasses(
+            vehtype_dict, bus_hint_str, self.id_registry.vehicle)
+        self.transfers = 0
+        self.trips = 0
+
+    def accumulate(self, veh_ids, veh_types, main_mode, *_):
+        if main_mode != "pt":
+            return
+        self.trips += 1
+        if not veh_types:
+            return
+        is_bus = [self.vehicle_classes.is_bus_type(veh_type) for veh_type in veh_types.split(";")]
+        self.transfers += sum(1 for prev_bus, next_bus in zip(is_bus, is_bus[1:]) if prev_bus and next_bus)
+
+    def result(self) -> float:
+        return float(self.transfers) / self.trips if self.trips > 0 else 0.0
+
+
+def calculate_live_kpis(
+    events_path: str, vehtype_dict: dict, links_dict: dict, zone_finder, bus_hint_str: str,
+    max_delay: float, min_delay: float, prefix_pt_driver="pt", workers: int = 1, parser: str = "lxml",
+    start_time=None, end_time=None, lookback=3600, open_trip_memory_mb: float | None = None,
+    id_registry: IdRegistry | None = None, vehicle_classes: TransitVehicleClasses | None = None,
+    follow: bool = False, refresh_interval: float = 10, poll_interval: float = 1.0, idle_timeout: float | None = None,
+    on_refresh=None, print_summary: bool = True) -> dict:
+    """
+    Tính các KPI từ events trong 1 lần đọc, không tạo file .arrow trung gian (chế độ xem nhanh).
+    Kết quả giống các hàm KPI đọc file (calculte_ridership, calculte_otp, get_bus_service_metrics,
+    calculate_average_bus_travel_time, calculate_average_car_travel_time, calculate_bus_transfer_rate)
+    chạy trên output của generate_all_events_df với cùng tham số (chỉ khác sai số làm tròn của phép cộng float).
+    follow=True: file events đang được MATSim ghi (xem EventsEngine), cứ refresh_interval giây (nếu có event mới)
+    tính lại KPI từ các accumulator, in tóm tắt (print_summary) và gọi on_refresh(kpis, tail, seconds)
+    (seconds: thời gian parse + xử lý phần byte mới kể từ lần refresh trước). Chuyến đi chưa kết thúc chưa được tính.
+    """
+    if id_registry is None:
+        id_registry = IdRegistry()
+    if vehicle_classes is None:
+        vehicle_classes = TransitVehicleClasses(vehtype_dict, bus_hint_str, id_registry.vehicle)
+    ridership = LiveRidership(vehtype_dict, bus_hint_str, prefix_pt_driver=prefix_pt_driver,
+                              vehicle_classes=vehicle_classes, id_registry=id_registry)
+    otp = LiveOtp(vehtype_dict, bus_hint_str, max_delay, min_delay, prefix_pt_driver=prefix_pt_driver,
+                  vehicle_classes=vehicle_classes, id_registry=id_registry)
+    travel_time = LiveTravelTime(vehtype_dict, bus_hint_str, prefix_pt_driver=prefix_pt_driver,
+                                 open_trip_memory_mb=open_trip_memory_mb, id_registry=id_registry)
+    bus_service = LiveBusService(links_dict, vehtype_dict, bus_hint_str, vehicle_classes=vehicle_classes, id_registry=id_registry)
+    transfer_rate = LiveTransferRate(vehtype_dict, zone_finder, bus_hint_str, vehicle_classes=vehicle_classes,
+                                     prefix_pt_driver=prefix_pt_driver, open_trip_memory_mb=open_trip_memory_mb, id_registry=id_registry)
+
+    def collect() -> dict:
+        return _collect_live_kpis(ridership, otp, travel_time, bus_service, transfer_rate)
+
+    refresh = {"at": monotonic(), "offset": None, "seconds": 0.0}
+
+    def on_poll(tail, seconds: float):
+        refresh["seconds"] += seconds
+        if tail.offset == refresh["offset"] or (monotonic() - refresh["at"] < refresh_interval and not tail.finished):
+            return
+        kpis = collect()
+        if print_summary:
+            print(format_live_summary(kpis, tail.offset, refresh["seconds"]))
+        if on_refresh is not None:
+            on_refresh(kpis, tail, refresh["seconds"])
+        refresh.update(at=monotonic(), offset=tail.offset, seconds=0.0)
+
+    EventsEngine(
+        events_path, [ridership, otp, travel_time, transfer_rate, bus_service], workers=workers, parser=parser,
+        start_time=start_time, end_time=end_time, lookback=lookback, follow=follow, poll_interval=poll_interval,
+        idle_timeout=idle_timeout, on_poll=on_poll if follow else None).run()
+    return collect()
+
+
+def _collect_live_kpis(ridership: LiveRidership, otp: LiveOtp, travel_time: LiveTravelTime,
+                       bus_service: LiveBusService, transfer_rate: LiveTransferRate) -> dict:
+    ontime, total, otp_percent = otp.result()
+    average_bus_travel_time, bus_trip = travel_time.bus_result()
+    average_car_travel_time, car_trip = travel_time.car_result()
+    return {
+        "ridership": ridership.result(),
+        "ontime": ontime,
+        "total": total,
+        "otp_percent": otp_percent,
+        "average_bus_travel_time": average_bus_travel_time,
+        "bus_trip": bus_trip,
+        "average_car_travel_time": average_car_travel_time,
+        "car_trip": car_trip,
+        "bus_metrics": bus_service.result(),
+        "bus_transfer_rate": transfer_rate.result(),
+    }
+
+
+def format_live_summary(kpis: dict, offset: int | None, seconds: float) -> str:
+    """Dòng tóm tắt KPI khi follow (offset: số byte đã đọc của file events, seconds: thời gian xử lý phần mới)."""
+    bus_metrics = kpis["bus_metrics"]
+    return (
+        f"[follow {(offset or 0) / 1e6:,.1f} MB, +{seconds:.2f} s] "
+        f"ridership {kpis['ridership']:,} | OTP {kpis['otp_percent']:.2f}% ({kpis['ontime']:,}/{kpis['total']:,}) | "
+        f"bus service {bus_metrics['service_hours']:.2f} h | "
+        f"bus {kpis['average_bus_travel_time']:.1f} s ({kpis['bus_trip']:,}) | car {kpis['average_car_travel_time']:.1f} s ({kpis['car_trip']:,})"
+    )
+
+
+def _benchmark_run(mode: str, trace_memory: bool) -> tuple[float, float, float]:
+    """
+    1 lần chạy trong process riêng: (thời gian, RAM Python đỉnh MB, RAM Arrow đỉnh MB).
+    trace_memory=False: chỉ đo thời gian (tracemalloc làm chậm đáng kể).
+    """
+    import os
+    import tempfile
+    import time
+    import tracemalloc
+    import pyarrow as pa
+    from src.data.load_config import load_config
+    from src.data.scenario_inputs import ScenarioInputs
+    from src.events.extract_all import generate_all_events_df
+    from src.performance_measurement.ridership import calculte_ridership
+    from src.performance_measurement.otp import calculte_otp
+    from src.performance_measurement.travel_time_ratio import calculate_average_bus_travel_time, calculate_average_car_travel_time
+    from src.performance_measurement.bus_productivity_effeciency import get_bus_service_metrics
+    from src.performance_measurement.bus_transfer_rate import calculate_bus_transfer_rate
+
+    path = load_config(r"config/config_path.yaml")
+    param = load_config(r"config/config_param.yaml")
+    bus_hint = param.bus_route_hint_str
+    inputs = ScenarioInputs.from_config(path, param)
+    links_dict, zone_gen, veh_type_dict = inputs.links_dict, inputs.zone_generator, inputs.vehtype_dict
+
+    if trace_memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    if mode == "live":
+        calculate_live_kpis(
+            path.paths.events, veh_type_dict, links_dict, zone_gen, bus_hint, param.otp.max_delay, param.otp.min_delay)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out = [os.path.join(tmp_dir, n) for n in (
+                "bus_delay.arrow", "person_enter_bus.arrow", "travel_time.arrow", "people_trip.arrow", "bus_trip.arrow")]
+            generate_all_events_df(
+                events_path=path.paths.events, vehtype_dict=veh_type_dict, links_dict=links_dict, zone_finder=zone_gen,
+                bus_hint_str=bus_hint, bus_delay_arrow_path=out[0], person_enter_bus_arrow_path=out[1],
+                travel_time_arrow_path=out[2], people_trip_arrow_path=out[3], bus_trip_arrow_path=out[4])
+            calculte_ridership(out[1])
+            calculte_otp(out[0], param.otp.max_delay, param.otp.min_delay)
+            calculate_average_bus_travel_time(out[2], bus_hint)
+            calculate_average_car_travel_time(out[2])
+            get_bus_service_metrics(out[4])
+            calculate_bus_transfer_rate(out[3], veh_type_dict, bus_hint)
+    elapsed = time.perf_counter() - t0
+    python_peak = 0
+    if trace_memory:
+        _, python_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, python_peak / 1e6, pa.default_memory_pool().max_memory() / 1e6
+
+
+if __name__ == "__main__":
+    # Benchmark: trích xuất ra file .arrow + đọc lại bằng các hàm KPI vs live KPI (mỗi cách chạy trong 1 process mới)
+    from concurrent.futures import ProcessPoolExecutor
+
+    print(f"{'mode':<12}{'time (s)':>10}{'RAM Python đỉnh (MB)':>23}{'RAM Arrow đỉnh (MB)':>22}")
+    for mode in ("file", "live"):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            elapsed, _, _ = pool.submit(_benchmark_run, mode, False).result()
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            _, python_peak, arrow_peak = pool.submit(_benchmark_run, mode, True).result()
+        print(f"{mode:<12}{elapsed:>10.2f}{python_peak:>23.1f}{arrow_peak:>22.1f}")
+
+    # python -m src.performance_measurement.live_kpi
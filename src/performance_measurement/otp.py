@@ -8,7 +8,7 @@ def calculte_otp(bus_delay_path: str, max_delay: float, min_delay: float):
     with pa.OSFile(bus_delay_path, 'rb') as source:
         table = ipc.open_stream(source).read_all()
     
-    delays = pc.cast(table['arrDelay'], pa.float64())
+    delays = table['arrDelay']
     mask = pc.and_(
         pc.less_equal(delays, max_delay),
         pc.greater_equal(delays, min_delay)
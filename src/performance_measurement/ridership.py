@@ -2,6 +2,7 @@ from src.transit.transit_vehicle import get_transit_type_dict
 from src.events.person_enter_bus import generate_personEnterBus_df
 
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.ipc as ipc
 
 def calculte_ridership(person_enter_bus_arrow_path: str):
@@ -9,8 +10,10 @@ def calculte_ridership(person_enter_bus_arrow_path: str):
 
     with pa.OSFile(person_enter_bus_arrow_path, 'rb') as source:
         person_enter_bus_table = ipc.open_stream(source).read_all()     
-    unique_person_ids = person_enter_bus_table.column('person_id').unique()
-    ridership = len(unique_person_ids)
+    # person_id là mã person của IdRegistry: đếm mã khác nhau trên cột int32, không so sánh chuỗi
+    person_ids = person_enter_bus_table.unify_dictionaries().column('person_id')
+    person_codes = pa.chunked_array([chunk.indices for chunk in person_ids.chunks], type=pa.int32())
+    ridership = pc.count_distinct(person_codes).as_py()
 
     return ridership
 
@@ -7,12 +7,17 @@ from src.plan.plan import generate_people_acts_coord_dict
 import numpy as np
 from scipy.spatial import KDTree # Thư viện "thần thánh" cho bài toán này
 
-def calculte_service_coverage(people_dict: dict[str,Person], bus_stops_dict: dict[str,StopFacility], act_coveraged: str, radia_m: float):
-    stop_coords = np.array([[s.coord.x, s.coord.y] for s in bus_stops_dict.values()])
-    
-    # 2. Xây dựng cây KD-Tree từ các trạm dừng
-    # Việc này chỉ tốn công một lần duy nhất
-    tree = KDTree(stop_coords)
+def calculte_service_coverage(people_dict: dict[str,Person], bus_stops_dict: dict[str,StopFacility], act_coveraged: str, radia_m: float,
+                              stop_tree: KDTree | None = None):
+    # stop_tree: KD-Tree dựng sẵn từ bus_stops_dict (ScenarioInputs.stop_tree, dùng chung giữa các scenario cùng schedule)
+    if stop_tree is not None:
+        tree = stop_tree
+    else:
+        stop_coords = np.array([[s.coord.x, s.coord.y] for s in bus_stops_dict.values()])
+
+        # 2. Xây dựng cây KD-Tree từ các trạm dừng
+        # Việc này chỉ tốn công một lần duy nhất
+        tree = KDTree(stop_coords)
     
     service_coverage = 0
     
@@ -22,8 +22,7 @@ def calculate_average_bus_travel_time(travel_time_path: str, bus_hint_str: str)
     bus_trip = len(bus_table)
     
     if len(bus_table) > 0:
-        # Ép kiểu sang float để tính toán chính xác
-        travel_times = pc.cast(bus_table['travelTime'], pa.float64())
+        travel_times = bus_table['travelTime']
         average_bus_travel_time = pc.mean(travel_times).as_py()
     else:
         average_bus_travel_time = 0.0
@@ -40,7 +39,7 @@ def calculate_average_car_travel_time(travel_time_path: str) -> (float, int):
     car_trip = len(car_table)
     
     if len(car_table) > 0:
-        travel_times = pc.cast(car_table['travelTime'], pa.float64())
+        travel_times = car_table['travelTime']
         average_car_travel_time = pc.mean(travel_times).as_py()
     else:
         average_car_travel_time = 0.0
@@ -1,8 +1,12 @@
 from src.domain.point import Point
 
+from collections.abc import Mapping
 from dataclasses import dataclass, field
+from functools import cached_property
 from typing import Dict
 
+import numpy as np
+
 @dataclass(slots=True)
 class Person:
     id: str
@@ -19,7 +23,77 @@ class Person:
                 current_p.x = point.x
                 current_p.y = point.y
 
+@dataclass
+class ActivityTable:
+    """
+    Tọa độ hoạt động trong plan được chọn của mọi người, dạng cột: mỗi dòng là 1 loại hoạt động của 1 người
+    (giống 1 phần tử của Person.coords_act_dict), các dòng của cùng 1 người nằm liền nhau theo thứ tự xuất hiện.
+    person_offsets: dòng của người i là person_offsets[i]:person_offsets[i+1].
+    coord_conflict: loại hoạt động này xuất hiện nhiều lần với tọa độ khác nhau (x, y là tọa độ lần cuối),
+    tương ứng Person.is_coord_valid = False.
+    chunk_bounds: (min_x, min_y, max_x, max_y) của từng khối đã parse (1 dòng / khối, khối rỗng là inf / -inf).
+    """
+    person_ids: list[str]
+    act_types: list[str]
+    person: np.ndarray
+    act_type: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    coord_conflict: np.ndarray
+    person_offsets: np.ndarray
+    chunk_bounds: np.ndarray
+
+    @cached_property
+    def person_index(self) -> dict[str, int]:
+        return {person_id: i for i, person_id in enumerate(self.person_ids)}
+
+    @property
+    def people(self) -> "PeopleView":
+        return PeopleView(self)
+
+    def person_at(self, i: int) -> Person:
+        start, end = self.person_offsets[i], self.person_offsets[i + 1]
+        act_types = self.act_types
+        coords_act_dict = {
+            act_types[code]: Point(x, y)
+            for code, x, y in zip(self.act_type[start:end].tolist(), self.x[start:end].tolist(), self.y[start:end].tolist())}
+        return Person(id=self.person_ids[i], coords_act_dict=coords_act_dict, is_coord_valid=not self.coord_conflict[start:end].any())
+
+
+def chunk_bounds(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Boundary của 1 khối dạng mảng (1, 4): min_x, min_y, max_x, max_y."""
+    if not len(x):
+        return np.array([[np.inf, np.inf, -np.inf, -np.inf]])
+    return np.array([[x.min(), y.min(), x.max(), y.max()]])
+
+
+class PeopleView(Mapping):
+    """dict[str, Person] chỉ đọc trên ActivityTable, Person chỉ được tạo khi truy cập."""
+    __slots__ = ("table",)
+
+    def __init__(self, table: ActivityTable):
+        self.table = table
+
+    def __getitem__(self, person_id: str) -> Person:
+        return self.table.person_at(self.table.person_index[person_id])
+
+    def __contains__(self, person_id) -> bool:
+        return person_id in self.table.person_index
+
+    def __iter__(self):
+        return iter(self.table.person_ids)
+
+    def __len__(self) -> int:
+        return len(self.table.person_ids)
+
+
 def get_boundary_nodes_of_plans(person_dict: dict[str,Person]) -> (Point, Point):
+    if isinstance(person_dict, PeopleView):
+        # Gộp boundary của từng khối, không duyệt lại từng hoạt động
+        bounds = person_dict.table.chunk_bounds
+        return (Point(float(bounds[:, 0].min()), float(bounds[:, 1].min())),
+                Point(float(bounds[:, 2].max()), float(bounds[:, 3].max())))
+
     min_x = float('inf')
     min_y = float('inf')
     max_x = float('-inf')
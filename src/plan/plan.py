@@ -1,28 +1,155 @@
-from src.transit.transit_vehicle import get_transit_type_dict
-from src.domain.logic import is_public_transport_bus
-from src.domain.point import Point
-from src.plan.core_class import Person
+from src.domain.id_registry import StringInterner
+from src.plan.core_class import Person, ActivityTable, chunk_bounds
 
+import io
+import os
+from array import array
+
+import numpy as np
 import lxml.etree as etree
+from src.utils.byte_chunks import find_tag_offsets, iter_ordered_results, iter_stream_tag_chunks
+from src.utils.compressed_input import open_input, is_compressed
+
+PERSON_TAG = b"<person "
+POPULATION_END_TAG = b"</population>"
+
+
+def parse_activity_stream(xml_file, plan_path: str) -> ActivityTable:
+    """
+    Đọc plans kiểu streaming (iterparse) vào ActivityTable: chỉ giữ act của plan selected='yes' đầu tiên
+    của mỗi người; act / leg được xoá ngay khi đọc xong nên plan không được chọn không bao giờ nằm trọn trong bộ nhớ.
+    Cùng 1 loại hoạt động xuất hiện nhiều lần: giữ tọa độ lần cuối, khác tọa độ trước đó thì coord_conflict (như Person.add_act_coord).
+    """
+    person_ids: list[str] = []
+    act_types = StringInterner()
+    person_col, type_col = array('i'), array('i')
+    xs, ys = array('d'), array('d')
+    conflict = array('b')
+    person_offsets = array('q', [0])
+
+    # Dòng của từng loại hoạt động của người đang đọc
+    person_rows: dict[int, int] = {}
+    in_selected = taken = False
+    for event, elem in etree.iterparse(xml_file, events=("start", "end"), tag=("person", "plan", "act", "leg")):
+        tag = elem.tag
+        if event == "start":
+            if tag == "person":
+                person_rows = {}
+                taken = False
+            elif tag == "plan":
+                in_selected = not taken and elem.get("selected") == "yes"
+            continue
+
+        if tag == "act":
+            if in_selected:
+                code = act_types.code(elem.get("type"))
+                x, y = float(elem.get("x")), float(elem.get("y"))
+                row = person_rows.get(code)
+                if row is None:
+                    person_rows[code] = len(xs)
+                    person_col.append(len(person_ids))
+                    type_col.append(code)
+                    xs.append(x)
+                    ys.append(y)
+                    conflict.append(False)
+                elif x != xs[row] or y != ys[row]:
+                    conflict[row] = True
+                    xs[row], ys[row] = x, y
+        elif tag == "plan":
+            if in_selected:
+                in_selected = False
+                taken = True
+        elif tag == "person":
+            if not taken:
+                raise ValueError(f"Person {elem.get('id')} không có plan selected='yes' trong {plan_path}")
+            person_ids.append(elem.get("id"))
+            person_offsets.append(len(xs))
+        # Giải phóng phần cây đã đọc
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+    x = np.frombuffer(xs, dtype=np.float64)
+    y = np.frombuffer(ys, dtype=np.float64)
+    return ActivityTable(
+        person_ids=person_ids,
+        act_types=act_types.strings,
+        person=np.frombuffer(person_col, dtype=np.int32),
+        act_type=np.frombuffer(type_col, dtype=np.int32),
+        x=x,
+        y=y,
+        coord_conflict=np.frombuffer(conflict, dtype=np.int8).astype(bool),
+        person_offsets=np.frombuffer(person_offsets, dtype=np.int64),
+        chunk_bounds=chunk_bounds(x, y),
+    )
+
+
+def parse_person_chunk_data(data: bytes, plan_path: str) -> ActivityTable:
+    # Khối bắt đầu tại `<person ` và dừng trước `<person ` kế tiếp: bọc lại bằng thẻ gốc
+    return parse_activity_stream(io.BytesIO(b"<population>\n" + data + b"\n" + POPULATION_END_TAG), plan_path)
+
+
+def parse_person_chunk(plan_path: str, start: int, end: int) -> ActivityTable:
+    """Chạy trong process con: parse 1 khối byte [start, end) của plans.xml."""
+    with open(plan_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return parse_person_chunk_data(data, plan_path)
 
-def generate_people_acts_coord_dict(plan_path: str) -> dict[str, Person]:
-    people_dict: dict[str, Person] = {}
-    parser = etree.XMLParser(remove_blank_text=True)
-    tree = etree.parse(plan_path, parser)
-    root = tree.getroot()
-
-    for person_elem in root.xpath("//person"):
-        person_id = person_elem.get("id")
-        selected_plan = person_elem.xpath("./plan[@selected='yes']")[0]
-        person_obj = Person(id=person_id)
-        for act in selected_plan.xpath("./act"):
-            act_type = act.get("type")
-            x = float(act.get("x"))
-            y = float(act.get("y"))
-            person_obj.add_act_coord(act=act_type, point=Point(x, y)) 
-        people_dict[person_id] = person_obj
-    
-    return people_dict
+
+def concat_activity_tables(tables: list[ActivityTable]) -> ActivityTable:
+    """Ghép ActivityTable của các khối theo thứ tự khối (giữ thứ tự người như trong file); mã act_type được đánh lại chung."""
+    act_types = StringInterner()
+    person_ids: list[str] = []
+    persons, types, offsets = [], [], [np.zeros(1, dtype=np.int64)]
+    row_base = 0
+    for table in tables:
+        remap = np.array([act_types.code(act_type) for act_type in table.act_types], dtype=np.int32)
+        persons.append(table.person + len(person_ids))
+        types.append(remap[table.act_type])
+        offsets.append(table.person_offsets[1:] + row_base)
+        person_ids.extend(table.person_ids)
+        row_base += len(table.x)
+    return ActivityTable(
+        person_ids=person_ids,
+        act_types=act_types.strings,
+        person=np.concatenate(persons).astype(np.int32, copy=False),
+        act_type=np.concatenate(types).astype(np.int32, copy=False),
+        x=np.concatenate([table.x for table in tables]),
+        y=np.concatenate([table.y for table in tables]),
+        coord_conflict=np.concatenate([table.coord_conflict for table in tables]),
+        person_offsets=np.concatenate(offsets),
+        chunk_bounds=np.concatenate([table.chunk_bounds for table in tables]),
+    )
+
+
+def load_activity_table(plan_path: str, workers: int = 1, chunk_size: int = 64 * 1024 * 1024) -> ActivityTable:
+    """
+    plans.xml (.xml / .xml.gz / .xml.zst) → ActivityTable, xem parse_activity_stream.
+    workers > 1: cắt file thành các khối ~chunk_size byte bắt đầu tại `<person `, parse song song trên workers process
+    rồi ghép theo thứ tự khối (thứ tự người giống hệt khi đọc tuần tự). File nén được giải nén + cắt khối ở process chính.
+    """
+    if workers <= 1:
+        with open_input(plan_path) as xml_file:
+            return parse_activity_stream(xml_file, plan_path)
+
+    if is_compressed(plan_path):
+        with open_input(plan_path) as stream:
+            tasks = ((parse_person_chunk_data, data, plan_path)
+                     for data in iter_stream_tag_chunks(stream, chunk_size, PERSON_TAG, POPULATION_END_TAG))
+            tables = list(iter_ordered_results(tasks, workers))
+    else:
+        tasks = ((parse_person_chunk, plan_path, start, end)
+                 for start, end in find_tag_offsets(plan_path, chunk_size, PERSON_TAG, POPULATION_END_TAG))
+        tables = list(iter_ordered_results(tasks, workers))
+    if not tables:
+        with open_input(plan_path) as xml_file:
+            return parse_activity_stream(xml_file, plan_path)
+    return concat_activity_tables(tables)
+
+def generate_people_acts_coord_dict(plan_path: str, workers: int = 1) -> dict[str, Person]:
+    """people_dict cho code cũ: view chỉ đọc trên load_activity_table, Person tạo khi truy cập."""
+    return load_activity_table(plan_path, workers).people
 
 if __name__ == "__main__":
     from src.data.load_config import load_config
@@ -57,4 +184,68 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"[LỖI] Không thể xử lý file plans: {e}")
 
+
+    # Benchmark trên plans tổng hợp nhiều plan / người, mỗi lần đọc chạy trong 1 process mới để đo RSS đỉnh riêng
+    # (RSS của process con trong pool không tính vào):
+    # - loader DOM cũ (etree.parse cả file) vs loader streaming tuần tự vs streaming song song theo khối <person>
+    # - boundary: vòng lặp Python qua từng hoạt động vs gộp min / max của từng khối
+    import resource
+    import tempfile
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    from src.domain.point import Point
+    from src.plan.core_class import get_boundary_nodes_of_plans
+    from src.utils.benchmark_fixtures import write_synthetic_plans
+
+    def dom_people_acts_coord_dict(plan_path: str) -> dict[str, Person]:
+        people_dict: dict[str, Person] = {}
+        parser = etree.XMLParser(remove_blank_text=True)
+        with open_input(plan_path) as xml_file:
+            tree = etree.parse(xml_file, parser)
+        root = tree.getroot()
+        for person_elem in root.xpath("//person"):
+            person_id = person_elem.get("id")
+            selected_plan = person_elem.xpath("./plan[@selected='yes']")[0]
+            person_obj = Person(id=person_id)
+            for act in selected_plan.xpath("./act"):
+                person_obj.add_act_coord(act=act.get("type"), point=Point(float(act.get("x")), float(act.get("y"))))
+            people_dict[person_id] = person_obj
+        return people_dict
+
+    def benchmark_load(workers: int | None, plan_path: str, chunk_size: int):
+        t0 = time.perf_counter()
+        if workers is None:
+            people = dom_people_acts_coord_dict(plan_path)
+        else:
+            people = load_activity_table(plan_path, workers, chunk_size).people
+        elapsed = time.perf_counter() - t0
+        rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        t0 = time.perf_counter()
+        boundary = get_boundary_nodes_of_plans(people)
+        boundary_elapsed = time.perf_counter() - t0
+        ids = list(people)
+        checksum = (len(people), boundary, ids[::101], [people[person_id] for person_id in ids[::997]])
+        return elapsed, boundary_elapsed, rss_peak / 1024, checksum
+
+    persons = 30_000
+    chunk_size = 8 * 1024 * 1024
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        synthetic_path = os.path.join(tmp_dir, "plan.xml")
+        write_synthetic_plans(synthetic_path, persons)
+        num_chunks = len(find_tag_offsets(synthetic_path, chunk_size, PERSON_TAG, POPULATION_END_TAG))
+
+        print(f"\n[*] Plans tổng hợp: {persons:,} người x 5 plan, {os.path.getsize(synthetic_path) / 1e6:.1f} MB, "
+              f"{num_chunks} khối {chunk_size >> 20} MB, {os.cpu_count()} CPU")
+        print(f"{'loader':<22}{'time (s)':>10}{'speedup':>9}{'boundary (ms)':>15}{'RSS đỉnh (MB)':>16}")
+        results = {}
+        base = None
+        for label, workers in (("dom", None), ("streaming 1 worker", 1), ("streaming 2 worker", 2), ("streaming 4 worker", 4)):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                elapsed, boundary_elapsed, rss_peak, results[label] = pool.submit(benchmark_load, workers, synthetic_path, chunk_size).result()
+            if workers == 1:
+                base = elapsed
+            speedup = f"{base / elapsed:.2f}x" if base is not None else "-"
+            print(f"{label:<22}{elapsed:>10.2f}{speedup:>9}{boundary_elapsed * 1000:>15.2f}{rss_peak:>16.1f}")
+        print(f"[*] Kết quả các loader: {'giống nhau' if len(set(map(repr, results.values()))) == 1 else 'KHÁC NHAU!'}")
+
     # python -m src.plan.plan
\ No newline at end of file
@@ -1,6 +1,10 @@
 from src.domain.point import Point
 
+from collections.abc import Mapping
 from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
 
 @dataclass(slots=True)
 class StopFacility:
@@ -13,4 +17,121 @@ class TransitRoute:
     id: str
     line: str
     links_id: list[str]
-    stops_id: list[str]
\ No newline at end of file
+    stops_id: list[str]
+
+
+@dataclass
+class ColumnarSchedule:
+    """
+    Transit schedule dạng cột, chỉ gồm các tuyến bus (route được đánh chỉ số 0..n-1 theo thứ tự trong file).
+    - route_link[route_link_offsets[r]:route_link_offsets[r+1]]: mã link (chỉ số trong link_ids) của tuyến r, theo thứ tự đi.
+      link_ids chỉ gồm link có tuyến bus đi qua, theo thứ tự gặp lần đầu.
+    - route_stop[route_stop_offsets[r]:route_stop_offsets[r+1]]: mã trạm (chỉ số trong stop_ids) của tuyến r.
+      stop_ids gồm mọi stopFacility trong file và trạm được tuyến tham chiếu nhưng không khai báo (stop_defined = False, tọa độ NaN).
+    - Bảng departure: dep_route (chỉ số route), dep_time (giây), dep_vehicle (chỉ số trong vehicle_ids).
+    """
+    route_ids: list[str]
+    line_ids: list[str]
+    route_line: np.ndarray
+    link_ids: list[str]
+    route_link_offsets: np.ndarray
+    route_link: np.ndarray
+    stop_ids: list[str]
+    stop_x: np.ndarray
+    stop_y: np.ndarray
+    stop_ref_link: list[str]
+    stop_defined: np.ndarray
+    route_stop_offsets: np.ndarray
+    route_stop: np.ndarray
+    vehicle_ids: list[str]
+    dep_route: np.ndarray
+    dep_time: np.ndarray
+    dep_vehicle: np.ndarray
+
+    @cached_property
+    def route_index(self) -> dict[str, int]:
+        return {route_id: i for i, route_id in enumerate(self.route_ids)}
+
+    @cached_property
+    def bus_stop_codes(self) -> np.ndarray:
+        """Mã các trạm (đã khai báo) có tuyến bus dừng, theo thứ tự gặp lần đầu trong các tuyến."""
+        codes, first = np.unique(self.route_stop, return_index=True)
+        codes = codes[np.argsort(first, kind="stable")]
+        return codes[self.stop_defined[codes]]
+
+    @cached_property
+    def bus_stop_index(self) -> dict[str, int]:
+        return {self.stop_ids[code]: code for code in self.bus_stop_codes.tolist()}
+
+    @property
+    def routes(self) -> "RoutesView":
+        return RoutesView(self)
+
+    @property
+    def stops(self) -> "StopsView":
+        return StopsView(self)
+
+    def stops_per_route(self) -> np.ndarray:
+        return np.diff(self.route_stop_offsets)
+
+    def link_route_counts(self) -> np.ndarray:
+        """Số lượt tuyến đi qua từng link (theo mã link)."""
+        return np.bincount(self.route_link, minlength=len(self.link_ids))
+
+    def route_lengths(self, link_length: np.ndarray) -> np.ndarray:
+        """Tổng chiều dài từng tuyến, link_length: chiều dài theo mã link."""
+        route_of_entry = np.repeat(np.arange(len(self.route_ids)), np.diff(self.route_link_offsets))
+        return np.bincount(route_of_entry, weights=link_length[self.route_link], minlength=len(self.route_ids))
+
+    def route_at(self, i: int) -> TransitRoute:
+        link_ids, stop_ids = self.link_ids, self.stop_ids
+        links = self.route_link[self.route_link_offsets[i]:self.route_link_offsets[i + 1]].tolist()
+        stops = self.route_stop[self.route_stop_offsets[i]:self.route_stop_offsets[i + 1]].tolist()
+        return TransitRoute(
+            id=self.route_ids[i], line=self.line_ids[self.route_line[i]],
+            links_id=[link_ids[code] for code in links], stops_id=[stop_ids[code] for code in stops])
+
+    def stop_at(self, code: int) -> StopFacility:
+        return StopFacility(
+            id=self.stop_ids[code], coord=Point(float(self.stop_x[code]), float(self.stop_y[code])),
+            ref_linkid=self.stop_ref_link[code])
+
+
+class RoutesView(Mapping):
+    """dict[str, TransitRoute] chỉ đọc trên ColumnarSchedule, TransitRoute chỉ được tạo khi truy cập."""
+    __slots__ = ("schedule",)
+
+    def __init__(self, schedule: ColumnarSchedule):
+        self.schedule = schedule
+
+    def __getitem__(self, route_id: str) -> TransitRoute:
+        return self.schedule.route_at(self.schedule.route_index[route_id])
+
+    def __contains__(self, route_id) -> bool:
+        return route_id in self.schedule.route_index
+
+    def __iter__(self):
+        return iter(self.schedule.route_ids)
+
+    def __len__(self) -> int:
+        return len(self.schedule.route_ids)
+
+
+class StopsView(Mapping):
+    """dict[str, StopFacility] các trạm bus (bus_stop_codes) trên ColumnarSchedule, StopFacility chỉ được tạo khi truy cập."""
+    __slots__ = ("schedule",)
+
+    def __init__(self, schedule: ColumnarSchedule):
+        self.schedule = schedule
+
+    def __getitem__(self, stop_id: str) -> StopFacility:
+        return self.schedule.stop_at(self.schedule.bus_stop_index[stop_id])
+
+    def __contains__(self, stop_id) -> bool:
+        return stop_id in self.schedule.bus_stop_index
+
+    def __iter__(self):
+        return iter(self.schedule.bus_stop_index)
+
+    def __len__(self) -> int:
+        return len(self.schedule.bus_stop_index)
@@ -1,44 +1,99 @@
 from src.transit.transit_vehicle import get_transit_type_dict
+from src.domain.id_registry import StringInterner
 from src.domain.logic import is_public_transport_bus
-from src.domain.point import Point
-from src.transit.core_class import TransitRoute, StopFacility
+from src.events.time_index import parse_time
+from src.transit.core_class import TransitRoute, StopFacility, ColumnarSchedule
 
-import lxml
+from array import array
+
+import numpy as np
 import lxml.etree as etree
+from src.utils.compressed_input import open_input
+
+def load_columnar_schedule(transit_schedule_path: str, bus_route_hint_str: str) -> ColumnarSchedule:
+    """
+    Đọc transitSchedule kiểu streaming (iterparse, xoá từng stopFacility / transitRoute sau khi đọc) vào ColumnarSchedule.
+    Chỉ giữ các transitRoute có transportMode là bus (is_public_transport_bus).
+    """
+    route_ids: list[str] = []
+    lines, links, stops, vehicles = StringInterner(), StringInterner(), StringInterner(), StringInterner()
+    route_line = array('i')
+    route_link, route_link_offsets = array('i'), array('q', [0])
+    route_stop, route_stop_offsets = array('i'), array('q', [0])
+    stop_x, stop_y, stop_defined = array('d'), array('d'), array('b')
+    stop_ref_link: list[str] = []
+    dep_route, dep_time, dep_vehicle = array('i'), array('d'), array('i')
+
+    def stop_code(stop_id: str) -> int:
+        code = stops.code(stop_id)
+        if code == len(stop_x):
+            # Trạm chưa khai báo (tham chiếu trước / không có stopFacility)
+            stop_x.append(float('nan'))
+            stop_y.append(float('nan'))
+            stop_ref_link.append("")
+            stop_defined.append(False)
+        return code
+
+    line_id = None
+    with open_input(transit_schedule_path) as xml_file:
+        for event, elem in etree.iterparse(xml_file, events=("start", "end"), tag=("stopFacility", "transitLine", "transitRoute")):
+            tag = elem.tag
+            if event == "start":
+                if tag == "transitLine":
+                    line_id = elem.get("id")
+                continue
+
+            if tag == "stopFacility":
+                code = stop_code(elem.get("id"))
+                stop_x[code] = float(elem.get("x"))
+                stop_y[code] = float(elem.get("y"))
+                stop_ref_link[code] = elem.get("linkRefId")
+                stop_defined[code] = True
+            elif tag == "transitRoute":
+                transit_mode = elem.findtext("transportMode")
+                if is_public_transport_bus(vehicle_type=transit_mode, bus_hint_str=bus_route_hint_str):
+                    route = len(route_ids)
+                    route_ids.append(elem.get("id"))
+                    route_line.append(lines.code(line_id))
+                    for stop in elem.iterfind("routeProfile/stop"):
+                        route_stop.append(stop_code(stop.get("refId")))
+                    for link in elem.iterfind("route/link"):
+                        route_link.append(links.code(link.get("refId")))
+                    for departure in elem.iterfind("departures/departure"):
+                        dep_route.append(route)
+                        dep_time.append(parse_time(departure.get("departureTime")))
+                        dep_vehicle.append(vehicles.code(departure.get("vehicleRefId")))
+                    route_stop_offsets.append(len(route_stop))
+                    route_link_offsets.append(len(route_link))
+            # Giải phóng phần cây đã đọc
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    return ColumnarSchedule(
+        route_ids=route_ids,
+        line_ids=lines.strings,
+        route_line=np.frombuffer(route_line, dtype=np.int32),
+        link_ids=links.strings,
+        route_link_offsets=np.frombuffer(route_link_offsets, dtype=np.int64),
+        route_link=np.frombuffer(route_link, dtype=np.int32),
+        stop_ids=stops.strings,
+        stop_x=np.frombuffer(stop_x, dtype=np.float64),
+        stop_y=np.frombuffer(stop_y, dtype=np.float64),
+        stop_ref_link=stop_ref_link,
+        stop_defined=np.frombuffer(stop_defined, dtype=np.int8).astype(bool),
+        route_stop_offsets=np.frombuffer(route_stop_offsets, dtype=np.int64),
+        route_stop=np.frombuffer(route_stop, dtype=np.int32),
+        vehicle_ids=vehicles.strings,
+        dep_route=np.frombuffer(dep_route, dtype=np.int32),
+        dep_time=np.frombuffer(dep_time, dtype=np.float64),
+        dep_vehicle=np.frombuffer(dep_vehicle, dtype=np.int32),
+    )
 
 def generate_bus_routes_and_stops_dict(transit_schedule_path: str, bus_route_hint_str: str) -> (dict[str,TransitRoute], dict[str,StopFacility]):
-    routes_dict: dict(str,TransitRoute) = {}
-    full_stops_dict: dict(str,StopFacility) = {}
-    bus_stops_dict: dict(str,StopFacility) = {}
-
-    parser = etree.XMLParser(remove_blank_text=True)
-    tree = etree.parse(transit_schedule_path, parser)
-    root = tree.getroot()
-
-    for stop in root.xpath("//transitSchedule/transitStops/stopFacility"):
-        stop_id = stop.xpath("@id")[0]
-        x = stop.xpath("@x")[0]
-        y = stop.xpath("@y")[0]
-        ref_linkid = stop.xpath("@linkRefId")[0]
-        full_stops_dict[stop_id] = StopFacility(id=stop_id, coord=Point(x,y), ref_linkid=ref_linkid)
-
-    for line in root.xpath("//transitSchedule/transitLine"):    
-        line_id = line.xpath("@id")[0]
-        for route in line.xpath("./transitRoute"):
-            transit_mode = route.xpath("./transportMode/text()")[0]
-
-            if is_public_transport_bus(vehicle_type=transit_mode, bus_hint_str=bus_route_hint_str) :
-                route_id = route.xpath("@id")[0]
-
-                stops_id: list = route.xpath("./routeProfile/stop/@refId")
-                links_id: list = route.xpath("./route/link/@refId")
-                routes_dict[route_id] = TransitRoute(id=route_id, line=line_id, links_id=links_id, stops_id=stops_id)
-                for stop_id in stops_id:
-                    if stop_id in full_stops_dict:
-                        bus_stops_dict[stop_id] = full_stops_dict[stop_id]
-    
-    return routes_dict, bus_stops_dict
-
+    """(routes_dict, bus_stops_dict) cho code cũ: view chỉ đọc trên load_columnar_schedule."""
+    schedule = load_columnar_schedule(transit_schedule_path, bus_route_hint_str)
+    return schedule.routes, schedule.stops
 
 
 if __name__ == "__main__":
@@ -90,4 +145,63 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"[LỖI HỆ THỐNG] {e}")
 
+
+    # Benchmark: loader DOM cũ (xpath từng transitRoute, list ID dạng chuỗi) vs loader streaming cột,
+    # trên schedule tổng hợp; mỗi lần đọc chạy trong 1 process mới để đo RSS đỉnh riêng.
+    import os
+    import resource
+    import tempfile
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    from src.domain.point import Point
+    from src.utils.benchmark_fixtures import write_synthetic_schedule
+
+    def dom_bus_routes_and_stops_dict(transit_schedule_path: str, bus_route_hint_str: str):
+        routes_dict, full_stops_dict, bus_stops_dict = {}, {}, {}
+        parser = etree.XMLParser(remove_blank_text=True)
+        with open_input(transit_schedule_path) as xml_file:
+            tree = etree.parse(xml_file, parser)
+        root = tree.getroot()
+        for stop in root.xpath("//transitSchedule/transitStops/stopFacility"):
+            stop_id = stop.xpath("@id")[0]
+            full_stops_dict[stop_id] = StopFacility(
+                id=stop_id, coord=Point(float(stop.xpath("@x")[0]), float(stop.xpath("@y")[0])), ref_linkid=stop.xpath("@linkRefId")[0])
+        for line in root.xpath("//transitSchedule/transitLine"):
+            line_id = line.xpath("@id")[0]
+            for route in line.xpath("./transitRoute"):
+                if is_public_transport_bus(vehicle_type=route.xpath("./transportMode/text()")[0], bus_hint_str=bus_route_hint_str):
+                    route_id = route.xpath("@id")[0]
+                    stops_id = route.xpath("./routeProfile/stop/@refId")
+                    routes_dict[route_id] = TransitRoute(id=route_id, line=line_id, links_id=route.xpath("./route/link/@refId"), stops_id=stops_id)
+                    for stop_id in stops_id:
+                        if stop_id in full_stops_dict:
+                            bus_stops_dict[stop_id] = full_stops_dict[stop_id]
+        return routes_dict, bus_stops_dict
+
+    def benchmark_load(loader: str, transit_schedule_path: str):
+        t0 = time.perf_counter()
+        if loader == "dom":
+            routes_dict, stops_dict = dom_bus_routes_and_stops_dict(transit_schedule_path, "bus")
+        else:
+            routes_dict, stops_dict = generate_bus_routes_and_stops_dict(transit_schedule_path, "bus")
+        elapsed = time.perf_counter() - t0
+        rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        checksum = (list(routes_dict), list(stops_dict), [routes_dict[route_id] for route_id in list(routes_dict)[::97]],
+                    [stops_dict[stop_id] for stop_id in list(stops_dict)[::97]])
+        return elapsed, rss_peak / 1024, checksum
+
+    lines = 2000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        synthetic_path = os.path.join(tmp_dir, "transitSchedule.xml")
+        write_synthetic_schedule(synthetic_path, lines)
+
+        print(f"\n[*] Schedule tổng hợp: {lines:,} line, {os.path.getsize(synthetic_path) / 1e6:.1f} MB")
+        print(f"{'loader':<12}{'time (s)':>10}{'RSS đỉnh (MB)':>16}")
+        results = {}
+        for loader in ("dom", "streaming"):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                elapsed, rss_peak, results[loader] = pool.submit(benchmark_load, loader, synthetic_path).result()
+            print(f"{loader:<12}{elapsed:>10.2f}{rss_peak:>16.1f}")
+        print(f"[*] Kết quả 2 loader: {'giống nhau' if results['dom'] == results['streaming'] else 'KHÁC NHAU!'}")
+
     # python -m src.transit.transit_schedule
\ No newline at end of file
@@ -1,7 +1,17 @@
 from lxml import etree
+from src.domain.id_registry import StringInterner
+from src.domain.logic import is_public_transport_bus
+from src.utils.compressed_input import open_input
+
+# Mã loại xe của TransitVehicleClasses.category
+VEHICLE_UNKNOWN = 0     # không có trong transitVehicles (xe cá nhân, ...)
+VEHICLE_BUS = 1
+VEHICLE_OTHER_PT = 2    # xe PT không phải bus (rail, tram, ...)
+
 
 def get_transit_type_dict(transit_vehicle_path: str) -> dict[str,str]:
-    tree = etree.parse(transit_vehicle_path)
+    with open_input(transit_vehicle_path) as xml_file:
+        tree = etree.parse(xml_file)
     root = tree.getroot()
     ns = {'m': 'http://www.matsim.org/files/dtd'}
 
@@ -10,12 +20,82 @@ def get_transit_type_dict(transit_vehicle_path: str) -> dict[str,str]:
         id = node.xpath("@id")[0]
         type = node.xpath("@type")[0]
         pt_type_dict[id] = type
-    
+
     return pt_type_dict
 
+
+class TransitVehicleClasses:
+    """
+    Phân loại xe tính sẵn 1 lần cho mỗi scenario (thay cho vehtype_dict + is_public_transport_bus ở từng event).
+    - bus_codes: vehicle_id -> mã vehicle (IdRegistry) của các xe bus, 1 lần tra dict vừa kiểm tra bus vừa lấy mã
+    - category: bytearray theo mã vehicle (VEHICLE_BUS / VEHICLE_OTHER_PT / VEHICLE_UNKNOWN)
+    - type_category: loại xe (chuỗi type trong transitVehicles) -> mã loại, dùng cho cột vehicleTypeList
+    """
+    def __init__(self, vehtype_dict: dict[str, str], bus_hint_str: str, vehicles: StringInterner | None = None):
+        self.vehtype_dict = vehtype_dict
+        self.bus_hint_str = bus_hint_str
+        self.vehicles = vehicles if vehicles is not None else StringInterner()
+        self.type_category = {
+            vehicle_type: VEHICLE_BUS if is_public_transport_bus(vehicle_type, bus_hint_str) else VEHICLE_OTHER_PT
+            for vehicle_type in set(vehtype_dict.values())}
+
+        codes = {vehicle_id: self.vehicles.code(vehicle_id) for vehicle_id in vehtype_dict}
+        self.category = bytearray(len(self.vehicles))
+        for vehicle_id, code in codes.items():
+            self.category[code] = self.type_category[vehtype_dict[vehicle_id]]
+        self.bus_codes = {
+            vehicle_id: code for vehicle_id, code in codes.items() if self.category[code] == VEHICLE_BUS}
+
+    def is_bus_type(self, vehicle_type: str) -> bool:
+        """Loại xe (chuỗi) là bus, loại không có trong transitVehicles ("undefined", ...) được phân loại 1 lần rồi nhớ lại."""
+        category = self.type_category.get(vehicle_type)
+        if category is None:
+            category = VEHICLE_BUS if is_public_transport_bus(vehicle_type, self.bus_hint_str) else VEHICLE_UNKNOWN
+            self.type_category[vehicle_type] = category
+        return category == VEHICLE_BUS
+
+
 if __name__ == "__main__":
+    # Benchmark chi phí phân loại mỗi event: vehtype_dict.keys() + is_public_transport_bus (cách cũ) vs TransitVehicleClasses
+    import random
+    import time
     from src.data.load_config import load_config
     path = load_config(r"config/config_path.yaml")
     pt_type_dict = get_transit_type_dict(path.paths.transit_vehicle)
-    print(pt_type_dict)
-    #python -m src.transit.transit_vehicle
\ No newline at end of file
+    print(f"[*] {len(pt_type_dict)} xe PT")
+
+    bus_hint = "bus"
+    vehicle_classes = TransitVehicleClasses(pt_type_dict, bus_hint)
+    print(f"    - bus: {len(vehicle_classes.bus_codes)}, loại xe: {vehicle_classes.type_category}")
+
+    # Luồng vehicle id giống events: phần lớn là xe cá nhân, còn lại là xe PT
+    n_events = 2_000_000
+    rnd = random.Random(0)
+    pt_ids = list(pt_type_dict)
+    vehicle_ids = [rnd.choice(pt_ids) if rnd.random() < 0.3 else f"{rnd.randrange(100000)}" for _ in range(n_events)]
+
+    def old_check():
+        vehtype_dict = pt_type_dict
+        n = 0
+        for vehicle_id in vehicle_ids:
+            if vehicle_id not in vehtype_dict.keys() or not is_public_transport_bus(vehicle_type=vehtype_dict[vehicle_id], bus_hint_str=bus_hint):
+                continue
+            n += 1
+        return n
+
+    def new_check():
+        bus_codes = vehicle_classes.bus_codes
+        n = 0
+        for vehicle_id in vehicle_ids:
+            if bus_codes.get(vehicle_id) is None:
+                continue
+            n += 1
+        return n
+
+    for label, check in (("vehtype_dict + is_public_transport_bus", old_check), ("TransitVehicleClasses.bus_codes", new_check)):
+        t0 = time.perf_counter()
+        n_bus = check()
+        elapsed = time.perf_counter() - t0
+        print(f"    - {label:<40} {elapsed / n_events * 1e9:6.1f} ns/event ({n_bus:,} event bus)")
+
+    #python -m src.transit.transit_vehicle
@@ -0,0 +1,70 @@
+# File input MATSim tổng hợp cho benchmark trong khối __main__ của các module
+
+def write_grid_network(network_path: str, grid: int):
+    """Network lưới grid x grid tổng hợp (mỗi node nối 2 chiều với các node kề) cho benchmark."""
+    with open(network_path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<network>\n<nodes>\n')
+        for r in range(grid):
+            for c in range(grid):
+                f.write(f'<node id="n{r}_{c}" x="{c * 100.0 + 0.5}" y="{r * 100.0 + 0.25}" />\n')
+        f.write('</nodes>\n<links capperiod="01:00:00" effectivecellsize="7.5" effectivelanewidth="3.75">\n')
+        for r in range(grid):
+            for c in range(grid):
+                for dr, dc in ((0, 1), (1, 0), (0, -1), (-1, 0)):
+                    if 0 <= r + dr < grid and 0 <= c + dc < grid:
+                        f.write(f'<link id="l{r}_{c}_{dr}_{dc}" from="n{r}_{c}" to="n{r + dr}_{c + dc}" length="{100.0 + (r * c) % 7}" '
+                                f'freespeed="13.89" capacity="1800.0" permlanes="1.0" oneway="1" modes="car,bus" />\n')
+        f.write('</links>\n</network>\n')
+
+
+def write_synthetic_plans(plan_path: str, persons: int, plans_per_person: int = 5):
+    """plans.xml tổng hợp cho benchmark: mỗi người có plans_per_person plan (plan cuối được chọn), mỗi plan home-work-shop-home."""
+    with open(plan_path, "w") as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE population SYSTEM "http://www.matsim.org/files/dtd/population_v6.dtd">\n<population>\n')
+        for i in range(persons):
+            home = (i % 1000 * 10.0 + 0.5, i // 1000 % 1000 * 10.0 + 0.25)
+            f.write(f'\t<person id="p{i}">\n\t\t<attributes>\n\t\t\t<attribute name="age" class="java.lang.Integer">{20 + i % 50}</attribute>\n\t\t</attributes>\n')
+            for k in range(plans_per_person):
+                selected = "yes" if k == plans_per_person - 1 else "no"
+                work = (home[0] + 1000.0 + k, home[1] + 500.0)
+                shop = (home[0] + 200.0, home[1] + 300.0 + k)
+                f.write(f'\t\t<plan score="{100.0 - k}" selected="{selected}">\n')
+                for act_type, (x, y), end_time in (("home", home, "07:00:00"), ("work", work, "17:00:00"), ("shop", shop, "18:00:00"), ("home", home, None)):
+                    end = f' end_time="{end_time}"' if end_time else ""
+                    f.write(f'\t\t\t<act type="{act_type}" x="{x}" y="{y}"{end} >\n\t\t\t</act>\n')
+                    if end_time:
+                        f.write(f'\t\t\t<leg mode="car" dep_time="{end_time}" trav_time="00:20:00">\n'
+                                f'\t\t\t\t<route type="links" start_link="l{i}" end_link="l{i + 1}" trav_time="00:20:00" distance="1500.0">l{i} l{i + 1}</route>\n'
+                                f'\t\t\t</leg>\n')
+                f.write('\t\t</plan>\n')
+            f.write('\t</person>\n')
+        f.write('</population>\n')
+
+
+def write_synthetic_schedule(transit_schedule_path: str, lines: int, routes_per_line: int = 2, stops_per_route: int = 30,
+                             links_per_stop: int = 3, departures_per_route: int = 100):
+    """transitSchedule tổng hợp cho benchmark: mỗi line có routes_per_line tuyến bus, thêm 1 tuyến rail mỗi 10 line."""
+    with open(transit_schedule_path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE transitSchedule SYSTEM "http://www.matsim.org/files/dtd/transitSchedule_v2.dtd">\n<transitSchedule>\n\t<transitStops>\n')
+        for line in range(lines):
+            for k in range(stops_per_route):
+                f.write(f'\t\t<stopFacility id="s{line}_{k}" x="{k * 300.0 + 0.5}" y="{line * 50.0 + 0.25}" linkRefId="l{line}_{k * links_per_stop}" isBlocking="false"/>\n')
+        f.write('\t</transitStops>\n')
+        for line in range(lines):
+            f.write(f'\t<transitLine id="line{line}">\n')
+            modes = ["bus"] * routes_per_line + (["rail"] if line % 10 == 0 else [])
+            for r, mode in enumerate(modes):
+                order = range(stops_per_route) if r % 2 == 0 else range(stops_per_route - 1, -1, -1)
+                f.write(f'\t\t<transitRoute id="route{line}_{r}">\n\t\t\t<transportMode>{mode}</transportMode>\n\t\t\t<routeProfile>\n')
+                for k in order:
+                    f.write(f'\t\t\t\t<stop refId="s{line}_{k}" arrivalOffset="00:01:00" departureOffset="00:01:00" awaitDeparture="true"/>\n')
+                f.write('\t\t\t</routeProfile>\n\t\t\t<route>\n')
+                for k in range(stops_per_route * links_per_stop):
+                    f.write(f'\t\t\t\t<link refId="l{line}_{k}"/>\n')
+                f.write('\t\t\t</route>\n\t\t\t<departures>\n')
+                for d in range(departures_per_route):
+                    seconds = 5 * 3600 + d * 600
+                    f.write(f'\t\t\t\t<departure id="d{d}" departureTime="{seconds // 3600:02d}:{seconds // 60 % 60:02d}:00" vehicleRefId="veh_{line}_{r}_{d % 8}"/>\n')
+                f.write('\t\t\t</departures>\n\t\t</transitRoute>\n')
+            f.write('\t</transitLine>\n')
+        f.write('</transitSchedule>\n')
@@ -0,0 +1,100 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def find_tag_offsets(path: str, chunk_size: int, tag: bytes, end_tag: bytes, begin: int = 0, end: int | None = None) -> list[tuple[int, int]]:
+    """
+    Cắt file XML (hoặc đoạn [begin, end) của file) thành các khoảng byte [start, end) cỡ chunk_size,
+    mỗi khoảng bắt đầu đúng tại 1 thẻ `tag` (vd `<event `, `<person `). Khoảng cuối cùng dừng trước `end_tag`.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        def next_tag_offset(pos: int) -> int:
+            f.seek(pos)
+            window = b""
+            while True:
+                chunk = f.read(1 << 16)
+                if not chunk:
+                    return file_size
+                window += chunk
+                idx = window.find(tag)
+                if idx != -1:
+                    return pos + idx
+                # Giữ lại vài byte cuối phòng trường hợp thẻ bị cắt ngang giữa 2 chunk
+                keep = len(tag) - 1
+                pos += len(window) - keep
+                window = window[-keep:]
+
+        f.seek(max(0, file_size - (1 << 16)))
+        tail = f.read()
+        end_idx = tail.rfind(end_tag)
+        data_end = file_size - len(tail) + end_idx if end_idx != -1 else file_size
+        if end is not None:
+            data_end = min(data_end, end)
+
+        offsets = []
+        start = next_tag_offset(begin)
+        while start < data_end:
+            end = min(next_tag_offset(start + max(chunk_size, 1)), data_end)
+            offsets.append((start, end))
+            start = end
+    return offsets
+
+
+def iter_stream_tag_chunks(stream, chunk_size: int, tag: bytes, end_tag: bytes):
+    """
+    Bản dùng cho file nén (không seek được): cắt stream đã giải nén thành các khối bytes
+    bắt đầu tại `tag`, khối cuối dừng trước `end_tag`.
+    """
+    buffer = b""
+    started = False
+    while True:
+        chunk = stream.read(max(chunk_size, 1))
+        if not chunk:
+            break
+        buffer += chunk
+        if not started:
+            idx = buffer.find(tag)
+            if idx == -1:
+                buffer = buffer[-(len(tag) - 1):]
+                continue
+            buffer = buffer[idx:]
+            started = True
+        cut = buffer.rfind(tag)
+        if cut > 0:
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+
+    if started:
+        end_idx = buffer.rfind(end_tag)
+        if end_idx != -1:
+            buffer = buffer[:end_idx]
+        if buffer:
+            yield buffer
+
+
+def iter_ordered_results(tasks, workers: int):
+    """
+    Chạy các task (fn, *args) trên workers process, trả kết quả theo đúng thứ tự task.
+    Giới hạn số task đang chờ (workers x 2) để không giữ quá nhiều bytes / kết quả trong RAM.
+    Dừng sớm (caller ngừng đọc / lỗi): các task chưa chạy bị huỷ.
+    """
+    tasks = iter(tasks)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        try:
+            for task in tasks:
+                pending.append(pool.submit(*task))
+                if len(pending) >= workers * 2:
+                    break
+
+            while pending:
+                result = pending.popleft().result()
+                next_task = next(tasks, None)
+                if next_task is not None:
+                    pending.append(pool.submit(*next_task))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
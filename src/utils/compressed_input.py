@@ -0,0 +1,158 @@
+import gzip
+import io
+import queue
+import threading
+from typing import BinaryIO
+
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+
+def is_compressed(path: str) -> bool:
+    return str(path).endswith(COMPRESSED_SUFFIXES)
+
+
+class ThreadedDecompressReader(io.RawIOBase):
+    """
+    Giải nén trên 1 thread riêng, đẩy từng chunk vào hàng đợi có giới hạn (bounded buffer).
+    Thread parse chỉ lấy chunk ra, nên giải nén chạy chồng lên thời gian parse
+    (zlib / zstd nhả GIL trong lúc giải nén).
+    """
+    def __init__(self, source: BinaryIO, chunk_size: int = 1 << 20, max_chunks: int = 8):
+        super().__init__()
+        self._source = source
+        self._chunk_size = chunk_size
+        self._queue = queue.Queue(maxsize=max_chunks)
+        self._stop = threading.Event()
+        self._current = memoryview(b"")
+        self._eof = False
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            while not self._stop.is_set():
+                chunk = self._source.read(self._chunk_size)
+                if not chunk:
+                    break
+                if not self._put(chunk):
+                    return
+            self._put(b"")
+        except BaseException as e:
+            self._put(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._current and not self._eof:
+            item = self._queue.get()
+            if isinstance(item, BaseException):
+                self._eof = True
+                raise item
+            if not item:
+                self._eof = True
+            self._current = memoryview(item)
+        n = min(len(buffer), len(self._current))
+        buffer[:n] = self._current[:n]
+        self._current = self._current[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._source.close()
+        super().close()
+
+
+def open_input(path: str, chunk_size: int = 1 << 20, max_chunks: int = 8) -> BinaryIO:
+    """
+    Mở file input (xml / xml.gz / xml.zst) ở chế độ binary.
+    File nén được giải nén trên thread riêng, trả về stream đã giải nén (read / readline / iterate theo dòng).
+    """
+    path = str(path)
+    if path.endswith(".gz"):
+        source = gzip.open(path, 'rb')
+    elif path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(f"Cần cài 'zstandard' để đọc file .zst: {path}") from e
+        source = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    else:
+        return open(path, 'rb')
+    return io.BufferedReader(ThreadedDecompressReader(source, chunk_size, max_chunks), buffer_size=chunk_size)
+
+
+if __name__ == "__main__":
+    # Benchmark: parse events từ file nén, giải nén cùng thread vs giải nén trên thread riêng (lấy min của 3 lần chạy)
+    import os
+    import tempfile
+    import time
+    from src.data.load_config import load_config
+    from src.events.parsers import get_events_parser
+    from src.events.bus_trip import BusTripHandler
+
+    path = load_config(r"config/config_path.yaml")
+    events = path.paths.events
+    parser = get_events_parser("lxml")
+    event_types = BusTripHandler.event_types
+
+    def best_of(open_stream, consume, repeat: int = 3) -> float:
+        timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            with open_stream() as stream:
+                consume(stream)
+            timings.append(time.perf_counter() - t0)
+        return min(timings)
+
+    def parse_all(stream):
+        for _ in parser.parse(stream, event_types):
+            pass
+
+    def read_all(stream):
+        while stream.read(1 << 20):
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with open(events, 'rb') as src:
+            data = src.read()
+        inline_openers = {}
+
+        gz_path = os.path.join(tmp_dir, "output_events.xml.gz")
+        with gzip.open(gz_path, 'wb', compresslevel=6) as dst:
+            dst.write(data)
+        inline_openers[gz_path] = lambda: gzip.open(gz_path, 'rb')
+        try:
+            import zstandard
+            zst_path = os.path.join(tmp_dir, "output_events.xml.zst")
+            with open(zst_path, 'wb') as dst:
+                dst.write(zstandard.ZstdCompressor(level=3).compress(data))
+            inline_openers[zst_path] = lambda: zstandard.ZstdDecompressor().stream_reader(open(zst_path, 'rb'), closefd=True)
+        except ImportError:
+            print("(bỏ qua .zst: chưa cài zstandard)")
+
+        t_plain = best_of(lambda: open(events, 'rb'), parse_all)
+        print(f"[*] CPU: {os.cpu_count()} - file: {len(data) / 1e6:.1f} MB")
+        print(f"[*] Parse file .xml: {t_plain:.2f} s")
+        for compressed_path, open_inline in inline_openers.items():
+            t_decompress = best_of(open_inline, read_all)
+            t_inline = best_of(open_inline, parse_all)
+            t_threaded = best_of(lambda: open_input(compressed_path), parse_all)
+            hidden = min(1.0, max(0.0, t_inline - t_threaded) / t_decompress)
+            print(f"[*] {os.path.basename(compressed_path)} ({os.path.getsize(compressed_path) / 1e6:.1f} MB)")
+            print(f"    - Chỉ giải nén:                  {t_decompress:.2f} s")
+            print(f"    - Parse, giải nén cùng thread:   {t_inline:.2f} s")
+            print(f"    - Parse, giải nén thread riêng:  {t_threaded:.2f} s - phần giải nén được che: {hidden * 100:.0f}%")
+
+    # python -m src.utils.compressed_input
@@ -0,0 +1,42 @@
+import hashlib
+import json
+import os
+import threading
+
+
+def file_fingerprint(path: str, cached: dict | None = None) -> dict:
+    """
+    size + sha256 của file. Nếu `cached` (fingerprint cũ) có cùng size và mtime thì dùng lại sha256,
+    không phải hash lại file lớn ở mỗi lần chạy.
+    """
+    stat = os.stat(path)
+    if cached and cached.get("size") == stat.st_size and cached.get("mtime_ns") == stat.st_mtime_ns:
+        return cached
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+
+
+def same_content(a: dict | None, b: dict | None) -> bool:
+    """So sánh 2 fingerprint theo nội dung (size + sha256), bỏ qua mtime."""
+    return bool(a) and bool(b) and a["size"] == b["size"] and a["sha256"] == b["sha256"]
+
+
+def read_fingerprints(sources_path: str) -> dict[str, dict]:
+    """Fingerprint đã lưu trong file sidecar JSON ({đường dẫn tuyệt đối: fingerprint}); file chưa có / hỏng: {}."""
+    try:
+        with open(sources_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_fingerprints(sources_path: str, sources: dict[str, dict]):
+    """Ghi file sidecar (ra file tạm rồi đổi tên, không để lại file ghi dở)."""
+    os.makedirs(os.path.dirname(sources_path) or ".", exist_ok=True)
+    tmp_path = f"{sources_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(sources, f, indent=2)
+    os.replace(tmp_path, sources_path)
@@ -2,11 +2,9 @@ import matplotlib.pyplot as plt
 from matplotlib.collections import LineCollection
 from matplotlib import colors as mcolors
 from matplotlib import cm
-from lxml import etree
+from src.data.scenario_inputs import ScenarioInputs
 import os
 import numpy as np
-from collections import Counter
-from src.transit.core_class import TransitRoute
 
 def get_offset_coords(p1, p2, offset):
     """Shift line p1-p2 to the right by offset amount"""
@@ -28,46 +26,31 @@ def get_offset_coords(p1, p2, offset):
     
     return [(x1 + ox, y1 + oy), (x2 + ox, y2 + oy)]
 
-def draw_busroute_heatmap(output_image_path: str, network_path: str, bus_route_data: list[TransitRoute], max_freq_limit: int = 5):
+def get_offset_segments(segments: np.ndarray, offset):
+    """get_offset_coords cho cả mảng segment shape (n, 2, 2), offset: 1 số hoặc 1 giá trị / segment"""
+    dx = segments[:, 1, 0] - segments[:, 0, 0]
+    dy = segments[:, 1, 1] - segments[:, 0, 1]
+    length = np.sqrt(dx*dx + dy*dy)
+    moved = length != 0
+    offset = np.broadcast_to(offset, length.shape)[moved]
+    shifted = segments.copy()
+    shifted[moved, :, 0] += (dy[moved] / length[moved] * offset)[:, None]
+    shifted[moved, :, 1] += (-dx[moved] / length[moved] * offset)[:, None]
+    return shifted
+
+def draw_busroute_heatmap(output_image_path: str, inputs: ScenarioInputs, max_freq_limit: int = 5):
     print("Starting Visualization V4 (Full Network Base Layer)...\n")
     
 
-    print(f"Parsing network data from {network_path}...")
-    network_tree = etree.parse(network_path)
-    network_root = network_tree.getroot()
-    
-    nodes_xy = {}
-    for node in network_root.xpath("//network/nodes/node"):
-        nodes_xy[node.get('id')] = (float(node.get('x')), float(node.get('y')))
-        
-    all_links_geom = {}
-    for link in network_root.xpath("//network/links/link"):
-        lid = link.get('id')
-        fid = link.get('from')
-        tid = link.get('to')
-        if fid in nodes_xy and tid in nodes_xy:
-            all_links_geom[lid] = [nodes_xy[fid], nodes_xy[tid]]
-    print(f"Loaded {len(all_links_geom)} links from network.")
-
-
-    # 2. Count Bus Link Frequency
-    bus_link_counts = Counter()
+    network = inputs.network
+    print(f"Loaded {len(network.link_from)} links from network.")
 
-    # Support both list and dict input  
-    routes_iter = bus_route_data.values() if isinstance(bus_route_data, dict) else bus_route_data
 
-    for route in routes_iter:
-        link_list = route.links_id
-        bus_link_counts.update(link_list)
+    # 2. Count Bus Link Frequency (số tuyến đi qua, theo mã link của schedule)
+    schedule = inputs.schedule
+    bus_link_counts = schedule.link_route_counts()
     
     # 3. Prepare Plot Layers
-    base_lines = []
-    bus_lines = []
-    bus_widths = []
-    bus_colors = []
-    
-    focus_x = []
-    focus_y = []
     
     # -- Configuration --
     # Offset scaling
@@ -77,7 +60,7 @@ def draw_busroute_heatmap(output_image_path: str, network_path: str, bus_route_d
         return 1.2 + (freq * 0.8) # Linear width scaling requested by user
     
     # Determine total routes count for consistent scale
-    total_routes_count = len(routes_iter) if isinstance(routes_iter, list) else len(list(routes_iter))
+    total_routes_count = len(inputs.bus_routes_dict)
     
     offset_multiplier = 2.0 
     cmap = plt.get_cmap('turbo')
@@ -95,36 +78,28 @@ def draw_busroute_heatmap(output_image_path: str, network_path: str, bus_route_d
     # 3a. Process Base Links (ALL LINKS)
     # User request: "vẽ các link của cả bản đồ mạng lưới... ở giữu background với lớp vẽ bus"
     print("Processing Base Network Layout...")
-    for lid, coords in all_links_geom.items():
-        p1, p2 = coords
-        # Apply small offset to base links too so bidirectional roads don't look like one line
-        # and to ensure they sit 'under' the bus lanes correctly if aligned
-        p_new = get_offset_coords(p1, p2, 5.0) 
-        base_lines.append(p_new)
+    # Apply small offset to base links too so bidirectional roads don't look like one line
+    # and to ensure they sit 'under' the bus lanes correctly if aligned
+    base_lines = get_offset_segments(network.link_segments(), 5.0)
 
     # 3b. Process Bus Links
-    sorted_bus_links = sorted(bus_link_counts.items(), key=lambda x: x[1])
-    print(f"Processing {len(sorted_bus_links)} Bus Segments...")
-    
-    for lid, freq in sorted_bus_links:
-        if lid in all_links_geom:
-            p1, p2 = all_links_geom[lid]
-            
-            width = get_width(freq)
-            # Offset further out to not overlap the base link or opposing bus link
-            current_offset = offset_base_meters + (width * offset_multiplier)
-            
-            p_new = get_offset_coords(p1, p2, current_offset)
-            
-            bus_lines.append(p_new)
-            bus_widths.append(width)
-            
-            # Clip frequency to visual_max_val for color mapping
-            visual_freq = min(freq, visual_max_val)
-            bus_colors.append(cmap(norm(visual_freq)))
-            
-            focus_x.extend([p1[0], p2[0]])
-            focus_y.extend([p1[1], p2[1]])
+    # Link ít tuyến vẽ trước (sort ổn định: cùng tần suất thì giữ thứ tự gặp lần đầu)
+    sorted_codes = np.argsort(bus_link_counts, kind="stable")
+    print(f"Processing {len(sorted_codes)} Bus Segments...")
+    
+    bus_positions = network.link_positions(schedule.link_ids[code] for code in sorted_codes.tolist())
+    found = bus_positions >= 0
+    bus_freqs = bus_link_counts[sorted_codes][found]
+    bus_segments = network.link_segments(bus_positions[found])
+
+    bus_widths = get_width(bus_freqs)
+    # Offset further out to not overlap the base link or opposing bus link
+    bus_lines = get_offset_segments(bus_segments, offset_base_meters + (bus_widths * offset_multiplier))
+    # Clip frequency to visual_max_val for color mapping
+    bus_colors = cmap(norm(np.minimum(bus_freqs, visual_max_val)))
+
+    focus_x = bus_segments[:, :, 0]
+    focus_y = bus_segments[:, :, 1]
 
     # 4. Plotting
     print("Generating plot...")
@@ -166,9 +141,9 @@ def draw_busroute_heatmap(output_image_path: str, network_path: str, bus_route_d
     cbar.ax.yaxis.set_tick_params(color='white', labelcolor='white')
 
     # Focus Focus
-    if focus_x and focus_y:
-        min_x, max_x = min(focus_x), max(focus_x)
-        min_y, max_y = min(focus_y), max(focus_y)
+    if focus_x.size and focus_y.size:
+        min_x, max_x = float(focus_x.min()), float(focus_x.max())
+        min_y, max_y = float(focus_y.min()), float(focus_y.max())
         margin = 1000.0
         ax.set_xlim(min_x - margin, max_x + margin)
         ax.set_ylim(min_y - margin, max_y + margin)
@@ -177,7 +152,7 @@ def draw_busroute_heatmap(output_image_path: str, network_path: str, bus_route_d
         ax.autoscale()
         
     ax.axis('off')
-    title_text = f"Bus Network Map ({network_path}) - Full Network Context"
+    title_text = f"Bus Network Map ({inputs.network_path}) - Full Network Context"
     plt.title(title_text, color='white', fontsize=20)
 
 
@@ -187,19 +162,13 @@ def draw_busroute_heatmap(output_image_path: str, network_path: str, bus_route_d
 
 if __name__ == "__main__":
     from src.data.load_config import load_config
-    from src.network.network import generate_nodes_and_links_dict
-    from src.network.core_class import get_boundary_nodes_of_network
-    from src.transit.transit_schedule import generate_bus_routes_and_stops_dict
-    from src.transit.core_class import TransitRoute
     
     path = load_config(r"config/config_path.yaml")
-    
-    network = path.paths.network
+    param = load_config(r"config/config_param.yaml")
+    inputs = ScenarioInputs.from_config(path, param)
 
     image = path.data.interim.visualize.bus_heatmap
 
-    schedule = path.paths.transit_schedule
-    bus_routes_dict, _ = generate_bus_routes_and_stops_dict(transit_schedule_path=schedule, bus_route_hint_str="bus")
-    draw_busroute_heatmap(output_image_path=image, network_path=network, bus_route_data=list(bus_routes_dict.values()))
+    draw_busroute_heatmap(output_image_path=image, inputs=inputs)
 
-    #py -m src.visualize.busroute_heatmap
\ No newline at end of file
+    #py -m src.visualize.busroute_heatmap
@@ -13,7 +13,7 @@ def load_data(path: str) -> pd.DataFrame:
             df = reader.read_all().to_pandas()
         print(f"Loaded {len(df)} rows (Stream).")
         if 'drawmode' not in df.columns and 'mainMode' in df.columns:
-            df['drawmode'] = df['mainMode']
+            df['drawmode'] = df['mainMode'].astype(object)
         return df
     except Exception:
         try:
@@ -37,17 +37,14 @@ def prepare_od_metrics(df: pd.DataFrame, top_od_pairs: list = None, top_k: int =
     """
     # Ensure cols
     if 'drawmode' not in df.columns:
-        df['drawmode'] = df['mainMode'] if 'mainMode' in df.columns else 'unknown'
-        
-    if 'travelTime' in df.columns:
-        df['travelTime'] = pd.to_numeric(df['travelTime'], errors='coerce')
+        df['drawmode'] = df['mainMode'].astype(object) if 'mainMode' in df.columns else 'unknown'
 
     # Filter valid OD
     valid_df = df[(df['OZone'] != 'undefined') & (df['DZone'] != 'undefined')].copy()
     
     # 1. Identify Top OD if not provided
     if top_od_pairs is None:
-        od_counts = valid_df.groupby(['OZone', 'DZone']).size().reset_index(name='count').sort_values('count', ascending=False)
+        od_counts = valid_df.groupby(['OZone', 'DZone'], observed=True).size().reset_index(name='count').sort_values('count', ascending=False)
         top_od_pairs = list(zip(od_counts['OZone'], od_counts['DZone']))[:top_k]
     
     # 2. Calculate Metrics per OD
@@ -96,7 +93,7 @@ def plot_scenario_comparison(scenarios: list, output_folder: str, top_k: int = 1
     
     # Helper to get OD list
     temp_valid = base_df[(base_df['OZone'] != 'undefined') & (base_df['DZone'] != 'undefined')]
-    od_counts = temp_valid.groupby(['OZone', 'DZone']).size().reset_index(name='count').sort_values('count', ascending=False)
+    od_counts = temp_valid.groupby(['OZone', 'DZone'], observed=True).size().reset_index(name='count').sort_values('count', ascending=False)
     top_od_tuples = list(zip(od_counts['OZone'], od_counts['DZone']))[:top_k]
     
     # 2. Compute Metrics for ALL scenarios using these OD pairs
@@ -186,7 +183,6 @@ if __name__ == "__main__":
         
         # MOCKING 2nd Scenario for DEMO: Reduce car time by 10%, increase bus share arbitrarily
         df2 = df1.copy()
-        df2['travelTime'] = pd.to_numeric(df2['travelTime'], errors='coerce')
         
         # Reduce car travel time
         mask_car = df2['drawmode'] == 'car'
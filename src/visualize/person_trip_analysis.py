@@ -8,12 +8,11 @@ import matplotlib.patches as patches
 from matplotlib.collections import LineCollection
 from matplotlib.path import Path
 from matplotlib.path import Path
-from lxml import etree
 import pyarrow as pa
 import matplotlib.cm as cm
 import matplotlib.colors as mcolors
 
-from src.od_mask.core_class import Zone
+from src.data.scenario_inputs import ScenarioInputs
 from src.domain.logic import is_public_transport_bus
 
 def generate_final_report(data_df: pd.DataFrame, output_folder: str, bus_hint_str: str = "bus", scenario_name: str = "", filename: str = "00_global_summary.png", title_prefix: str = "BÁO CÁO TỔNG QUAN HỆ THỐNG"):
@@ -28,14 +27,10 @@ def generate_final_report(data_df: pd.DataFrame, output_folder: str, bus_hint_st
     
     # --- C. PREPARE DATA FOR TIME ANALYSIS ---
     if 'startTime' in subset.columns:
-        subset['startTime'] = pd.to_numeric(subset['startTime'], errors='coerce')
         subset['start_hour'] = subset['startTime'] / 3600
     else:
             subset['start_hour'] = 0 # Fallback
 
-    if 'travelTime' in subset.columns:
-        subset['travelTime'] = pd.to_numeric(subset['travelTime'], errors='coerce')
-
     # Classify drawmode based on vehicleTypeList to distinguish bus from other PT
     if 'drawmode' not in subset.columns:
         def _classify_mode(row):
@@ -126,23 +121,14 @@ def generate_final_report(data_df: pd.DataFrame, output_folder: str, bus_hint_st
     plt.close()
     print(f"Final report saved to {save_path}")
 
-def draw_all_zones_map(network_path: str, zones_list: list[Zone], output_folder: str, scenario_name: str, nodes: dict = None, links: dict = None):
+def draw_all_zones_map(inputs: ScenarioInputs, output_folder: str, scenario_name: str):
     """
     Draws a map showing the network and all defined zones.
     """
     print(f"Generating All Zones Map for {scenario_name}...")
     
-    # 1. Parse Network if not provided
-    if nodes is None or links is None:
-        print(f"Parsing network: {network_path}")
-        tree = etree.parse(network_path)
-        root = tree.getroot()
-        nodes = {}
-        for node in root.xpath('//network/nodes/node'):
-            nodes[node.get('id')] = (float(node.get('x')), float(node.get('y')))
-        links = {}
-        for link in root.xpath('//network/links/link'):
-            links[link.get('id')] = (link.get('from'), link.get('to'))
+    # 1. Network (đọc 1 lần trong ScenarioInputs)
+    network = inputs.network
 
     # 4. Setup Plot
     fig, ax = plt.subplots(figsize=(24, 24), facecolor='black')
@@ -160,7 +146,7 @@ def draw_all_zones_map(network_path: str, zones_list: list[Zone], output_folder:
     min_x, max_x = float('inf'), float('-inf')
     min_y, max_y = float('inf'), float('-inf')
 
-    for zone in zones_list:
+    for zone in inputs.zones_list:
         if not zone.boundary_points:
             continue
             
@@ -181,11 +167,8 @@ def draw_all_zones_map(network_path: str, zones_list: list[Zone], output_folder:
         ax.text(centroid_x, centroid_y, str(zone.id), color='white', fontsize=5, ha='center', va='top', zorder=Z_TEXT)
 
     # Layer 1: Background Network
-    base_lines = []
-    for l_id, (u, v) in links.items():
-        if u in nodes and v in nodes:
-            base_lines.append([nodes[u], nodes[v]])
-    if base_lines:
+    base_lines = network.link_segments()
+    if len(base_lines):
         lc_base = LineCollection(base_lines, colors='#bd0000', linewidths=3, alpha=1, zorder=Z_BASE)
         ax.add_collection(lc_base)
 
@@ -205,7 +188,7 @@ def draw_all_zones_map(network_path: str, zones_list: list[Zone], output_folder:
     print(f"All Zones Map saved to: {save_path}")
 
 
-def draw_top_od_map(network_path: str, schedule_path: str, zones_list: list[Zone], data_df: pd.DataFrame, output_folder: str, top_n: int = 5, scenario_name: str = "", grid_info="20x20"):
+def draw_top_od_map(inputs: ScenarioInputs, data_df: pd.DataFrame, output_folder: str, top_n: int = 5, scenario_name: str = ""):
     """
     Draws a map showing the network, bus routes, zones, and top N OD flows.
     data_Df là dataframe chứa thông tin về các chuyến đi của người dân như people_trip.arrow
@@ -215,51 +198,26 @@ def draw_top_od_map(network_path: str, schedule_path: str, zones_list: list[Zone
         
     print(f"Generating Top {top_n} OD Map for {scenario_name}...")
     
-    # 1. Parse Network
-    print(f"Parsing network: {network_path}")
-    tree = etree.parse(network_path)
-    root = tree.getroot()
-    nodes = {}
-    for node in root.xpath('//network/nodes/node'):
-        nodes[node.get('id')] = (float(node.get('x')), float(node.get('y')))
-    links = {}
-    for link in root.xpath('//network/links/link'):
-        links[link.get('id')] = (link.get('from'), link.get('to'))
+    # 1. Network (đọc 1 lần trong ScenarioInputs)
+    network = inputs.network
 
     # --- Call draw_all_zones_map here ---
-    draw_all_zones_map(network_path, zones_list, output_folder, scenario_name, nodes, links)
+    draw_all_zones_map(inputs, output_folder, scenario_name)
 
 
-    # 2. Parse Bus Links
-    bus_link_ids = set()
-    if os.path.exists(schedule_path):
-        print(f"Parsing schedule: {schedule_path}")
-        try:
-            tree_sched = etree.parse(schedule_path)
-            root_sched = tree_sched.getroot()
-            for route in root_sched.xpath('//transitRoute'):
-                mode = route.find('transportMode')
-                if mode is not None and mode.text.strip().lower() == 'bus':
-                     r_path = route.find('route')
-                     if r_path is not None:
-                         for link_ref in r_path.xpath('link'):
-                             bus_link_ids.add(link_ref.get('refId'))
-        except Exception as e:
-            print(f"Error parsing schedule: {e}")
+    # 2. Bus Links
+    bus_link_ids = inputs.bus_link_ids
     print(f"Found {len(bus_link_ids)} unique bus links.")
 
     # 3. Data Prep
-    valid_df = data_df.copy()
-    for col in ['xO', 'yO', 'xD', 'yD']:
-        if col in valid_df.columns:
-            valid_df[col] = pd.to_numeric(valid_df[col], errors='coerce')
+    valid_df = data_df
     
     # Ensure rows with valid coords
     plot_df = valid_df.dropna(subset=['xO', 'yO', 'xD', 'yD'])
     
     # Group OD
     ranking_df = valid_df[(valid_df['OZone'] != 'undefined') & (valid_df['DZone'] != 'undefined')]
-    top_od_counts = ranking_df.groupby(['OZone', 'DZone']).size().reset_index(name='count').sort_values('count', ascending=False).head(top_n)
+    top_od_counts = ranking_df.groupby(['OZone', 'DZone'], observed=True).size().reset_index(name='count').sort_values('count', ascending=False).head(top_n)
 
     if top_od_counts.empty:
         print("No valid OD pairs found.")
@@ -278,10 +236,7 @@ def draw_top_od_map(network_path: str, schedule_path: str, zones_list: list[Zone
     Z_ARROWS = 5
 
     # Layer 1: Background Network
-    base_lines = []
-    for l_id, (u, v) in links.items():
-        if u in nodes and v in nodes:
-            base_lines.append([nodes[u], nodes[v]])
+    base_lines = network.link_segments()
     lc_base = LineCollection(base_lines, colors='#cccccc', linewidths=0.5, alpha=0.3, zorder=Z_BASE)
     ax.add_collection(lc_base)
 
@@ -292,13 +247,9 @@ def draw_top_od_map(network_path: str, schedule_path: str, zones_list: list[Zone
     ax.scatter(plot_df['xD'], plot_df['yD'], c='#f03793', s=10, alpha=0.6, label='Destinations', edgecolors='none', zorder=Z_POINTS)
 
     # Layer 3: Bus Network (Red/Yellow)
-    bus_lines_coords = []
-    for l_id in bus_link_ids:
-        if l_id in links:
-            u, v = links[l_id]
-            if u in nodes and v in nodes:
-                bus_lines_coords.append([nodes[u], nodes[v]])
-    if bus_lines_coords:
+    bus_positions = network.link_positions(bus_link_ids)
+    bus_lines_coords = network.link_segments(bus_positions[bus_positions >= 0])
+    if len(bus_lines_coords):
         lc_bus = LineCollection(bus_lines_coords, colors='#f2f218', linewidths=2.5, alpha=1, zorder=Z_BUS)
         ax.add_collection(lc_bus)
 
@@ -306,7 +257,7 @@ def draw_top_od_map(network_path: str, schedule_path: str, zones_list: list[Zone
     rank_colors = ['#FF3333', '#FF9933', '#FFFF33', '#33FF33', '#33FFFF']
     
     # Map zone objects by ID
-    zone_map = {str(z.id): z for z in zones_list}
+    zone_map = {str(z.id): z for z in inputs.zones_list}
     unique_zones = set(top_od_counts['OZone'].astype(str)).union(set(top_od_counts['DZone'].astype(str)))
     
     min_x, max_x = float('inf'), float('-inf')
@@ -380,7 +331,7 @@ def draw_top_od_map(network_path: str, schedule_path: str, zones_list: list[Zone
         ax.set_ylim(min_y - pad_y, max_y + pad_y)
         
     ax.set_title(f"TOP {top_n} OD FLOW: {scenario_name}", fontsize=24, color='white', pad=20)
-    ax.text(0.02, 0.98, f"Grid: {grid_info}\nYellow: Bus Routes\nPoints: O=Light Blue, D=Medium Pink", transform=ax.transAxes, 
+    ax.text(0.02, 0.98, f"Grid: {inputs.grid_info}\nYellow: Bus Routes\nPoints: O=Light Blue, D=Medium Pink", transform=ax.transAxes, 
             color='white', fontsize=12, fontweight='bold', va='top', 
             bbox=dict(facecolor='black', alpha=0.5, edgecolor='none'))
     ax.axis('off')
@@ -415,7 +366,7 @@ def draw_top_od_map(network_path: str, schedule_path: str, zones_list: list[Zone
 
 
 
-def analyze_person_trips(people_trip_arrow_path: str, network_path: str, schedule_path: str, zones_list: list[Zone], output_folder: str, bus_hint_str: str = "bus", top_od_number: int = 5, scenario_name: str = "", grid_info="20x20"):
+def analyze_person_trips(people_trip_arrow_path: str, inputs: ScenarioInputs, output_folder: str, bus_hint_str: str = "bus", top_od_number: int = 5, scenario_name: str = ""):
     """
     Main function to analyze person trips, generating global reports, top OD reports, and top N OD map.
     """
@@ -446,7 +397,7 @@ def analyze_person_trips(people_trip_arrow_path: str, network_path: str, schedul
     # 3. Generate Top 10 OD Reports
     print("Generating Top 10 OD Reports...")
     valid_od = df[(df['OZone'] != 'undefined') & (df['DZone'] != 'undefined')]
-    od_counts = valid_od.groupby(['OZone', 'DZone']).size().reset_index(name='n').sort_values('n', ascending=False)
+    od_counts = valid_od.groupby(['OZone', 'DZone'], observed=True).size().reset_index(name='n').sort_values('n', ascending=False)
     
     for i, (_, row) in enumerate(od_counts.head(top_od_number).iterrows(), 1):
         o, d = row['OZone'], row['DZone']
@@ -466,54 +417,30 @@ def analyze_person_trips(people_trip_arrow_path: str, network_path: str, schedul
         )
 
     # 4. Generate Top OD Map
-    draw_top_od_map(network_path, schedule_path, zones_list, df, output_folder, top_n=top_od_number, scenario_name=scenario_name, grid_info=grid_info)
+    draw_top_od_map(inputs, df, output_folder, top_n=top_od_number, scenario_name=scenario_name)
     
     print("--- PERSON TRIP ANALYSIS DONE ---")
 
 
 if __name__ == "__main__":
     from src.data.load_config import load_config
-    from src.network.network import generate_nodes_and_links_dict
-    from src.network.core_class import get_boundary_nodes_of_network
-    from src.plan.core_class import get_boundary_nodes_of_plans
-    from src.plan.plan import generate_people_acts_coord_dict
-    from src.od_mask.generator import ZoneGeneratorByGrid, Point
 
     # 0. Configuration
     path = load_config(r"config/config_path.yaml")
+    param = load_config(r"config/config_param.yaml")
+    inputs = ScenarioInputs.from_config(path, param)
     
     # Paths
     people_trip_arrow_path = path.data.interim.event.people_trip 
-    network_path = path.paths.network
-    schedule_path = path.paths.transit_schedule
-    plan_path = path.paths.plan
     
     scenario_name = "BASELINE"
     output_visualize_folder = r"data/visualize/baseline/person_trip_analysis"
-    
-    # Generate Zones Locally for testing
-    print("Generating Zones...")
-    nodes_dict, links_dict = generate_nodes_and_links_dict(network_path)
-    min_p_network, max_p_network = get_boundary_nodes_of_network(nodes_dict)
-    
-    people = generate_people_acts_coord_dict(plan_path)
-    min_p_plan, max_p_plan = get_boundary_nodes_of_plans(people)
-    
-    min_p = Point(min(min_p_network.x, min_p_plan.x), min(min_p_network.y, min_p_plan.y))
-    max_p = Point(max(max_p_network.x, max_p_plan.x), max(max_p_network.y, max_p_plan.y))
-
-    ROWS, COLS = 20, 20
-    zone_gen = ZoneGeneratorByGrid(max_p=max_p, min_p=min_p, rows=ROWS, cols=COLS)
-    zones_list = zone_gen.generate()
 
     analyze_person_trips(
         people_trip_arrow_path=people_trip_arrow_path,
-        network_path=network_path,
-        schedule_path=schedule_path,
-        zones_list=zones_list,
+        inputs=inputs,
         output_folder=output_visualize_folder,
-        bus_hint_str="bus",
-        scenario_name=scenario_name,
-        grid_info=f"{ROWS}x{COLS}"
+        bus_hint_str=inputs.bus_route_hint_str,
+        scenario_name=scenario_name
     )
-    #python -m src.visualize.person_trip_analysis
\ No newline at end of file
+    #python -m src.visualize.person_trip_analysis